@@ -0,0 +1,232 @@
+"""
+Audio Mixer - In-process PCM mixing of narration, music and SFX.
+
+Every input is decoded exactly once to float32 PCM at SAMPLE_RATE through an
+ffmpeg pipe. Trimming, looping, fades, speech ducking and SFX placement are
+NumPy array operations, and the result is written once as a lossless WAV
+that the final mux encodes to AAC. No lossy intermediates, and one ffmpeg
+decode per input instead of an encode per processing step.
+"""
+
+import os
+import wave
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from scripts.ffmpeg_builder import get_ffmpeg_path
+from scripts.utils.tracing import run_command
+
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+# Ducking defaults, matched to the old sidechaincompress settings
+DUCK_THRESHOLD = 0.02      # narration RMS that counts as speech
+DUCK_LEVEL = 0.35          # music gain while speech is present
+DUCK_ATTACK = 0.2          # seconds to reach DUCK_LEVEL
+DUCK_RELEASE = 1.0         # seconds held down after speech stops
+ENVELOPE_WINDOW = 0.02     # RMS block size in seconds
+
+
+# ------------------------------------------------------
+# DECODE / ENCODE
+# ------------------------------------------------------
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """Decodes any audio file to a (frames, channels) float32 array."""
+    cmd = [
+        get_ffmpeg_path(),
+        "-v", "error",
+        "-i", path,
+        "-vn",
+        "-f", "f32le",
+        "-acodec", "pcm_f32le",
+        "-ar", str(sample_rate),
+        "-ac", str(channels),
+        "pipe:1",
+    ]
+    result = run_command(cmd, check=True, capture_output=True)
+    return np.frombuffer(result.stdout, dtype="<f4").reshape(-1, channels).copy()
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+    """Writes float PCM as 16-bit WAV (clipped to [-1, 1])."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(pcm.shape[1] if pcm.ndim > 1 else 1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return path
+
+
+def encode_audio(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE, bitrate: str = "192k") -> str:
+    """Writes samples to path; WAV is written directly, anything else is piped to ffmpeg once."""
+    if path.lower().endswith(".wav"):
+        return write_wav(path, samples, sample_rate)
+
+    channels = samples.shape[1] if samples.ndim > 1 else 1
+    cmd = [
+        get_ffmpeg_path(),
+        "-y",
+        "-v", "error",
+        "-f", "f32le",
+        "-ar", str(sample_rate),
+        "-ac", str(channels),
+        "-i", "pipe:0",
+        "-b:a", bitrate,
+        path,
+    ]
+    run_command(cmd, input=samples.astype("<f4").tobytes(), check=True, capture_output=True)
+    return path
+
+
+# ------------------------------------------------------
+# OPERATIONS
+# ------------------------------------------------------
+
+def fit_length(samples: np.ndarray, frames: int) -> np.ndarray:
+    """Trims, or loops, samples to exactly `frames` frames."""
+    if len(samples) == 0:
+        return np.zeros((frames, samples.shape[1] if samples.ndim > 1 else CHANNELS), dtype=np.float32)
+    if len(samples) >= frames:
+        return samples[:frames]
+    reps = -(-frames // len(samples))
+    return np.tile(samples, (reps, 1))[:frames]
+
+
+def pad_to(samples: np.ndarray, frames: int) -> np.ndarray:
+    """Trims, or pads with silence, samples to exactly `frames` frames."""
+    out = np.zeros((frames, samples.shape[1] if samples.ndim > 1 else CHANNELS), dtype=np.float32)
+    clipped = samples[:frames]
+    out[:len(clipped)] = clipped
+    return out
+
+
+def apply_fades(samples: np.ndarray, fade_in: float, fade_out: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linear fade in/out, in place."""
+    n = len(samples)
+    fin = min(n, int(fade_in * sample_rate))
+    fout = min(n, int(fade_out * sample_rate))
+    if fin:
+        samples[:fin] *= np.linspace(0.0, 1.0, fin, dtype=np.float32)[:, None]
+    if fout:
+        samples[n - fout:] *= np.linspace(1.0, 0.0, fout, dtype=np.float32)[:, None]
+    return samples
+
+
+def speech_envelope(
+    narration: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    threshold: float = DUCK_THRESHOLD,
+    attack: float = DUCK_ATTACK,
+    release: float = DUCK_RELEASE,
+    window: float = ENVELOPE_WINDOW,
+) -> np.ndarray:
+    """
+    Returns a per-frame speech activity curve in [0, 1].
+
+    Activity is block RMS above threshold, held for `release` seconds after
+    speech stops and smoothed over `attack` seconds, so the music dips
+    slightly ahead of each phrase and recovers slowly after it.
+    """
+    n = len(narration)
+    block = max(1, int(window * sample_rate))
+    blocks = -(-n // block)
+
+    mono = narration.mean(axis=1) if narration.ndim > 1 else narration
+    padded = np.zeros(blocks * block, dtype=np.float32)
+    padded[:n] = mono
+    rms = np.sqrt(np.mean(padded.reshape(blocks, block) ** 2, axis=1))
+    active = (rms > threshold).astype(np.float32)
+
+    # Hold: extend every active block forward by the release time
+    hold = max(1, int(release / window))
+    held = np.minimum(1.0, np.convolve(active, np.ones(hold, dtype=np.float32))[:blocks])
+
+    # Smooth with a centered moving average so the dip starts before speech
+    ramp = max(1, int(attack / window))
+    kernel = np.ones(ramp, dtype=np.float32) / ramp
+    smooth = np.convolve(held, kernel, mode="same")
+
+    # Back to per-frame resolution
+    block_centers = (np.arange(blocks) + 0.5) * block
+    return np.interp(np.arange(n), block_centers, smooth).astype(np.float32)
+
+
+def duck(music: np.ndarray, envelope: np.ndarray, duck_level: float = DUCK_LEVEL) -> np.ndarray:
+    """Scales music down to duck_level wherever the envelope shows speech."""
+    gain = 1.0 - (1.0 - duck_level) * envelope
+    return music * gain[:, None]
+
+
+def mix_sfx(out: np.ndarray, hits: List[Dict], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Adds SFX samples in place.
+    hits: [{"samples": ndarray, "time": float, "volume": float}]
+    """
+    n = len(out)
+    for hit in hits:
+        start = int(round(hit["time"] * sample_rate))
+        if start >= n:
+            continue
+        samples = hit["samples"][: n - start]
+        out[start:start + len(samples)] += samples * hit.get("volume", 1.0)
+    return out
+
+
+# ------------------------------------------------------
+# MAIN MIX
+# ------------------------------------------------------
+
+def mix_narration(
+    narration_path: str,
+    duration: float,
+    output_path: str,
+    music_path: Optional[str] = None,
+    sfx_hits: Optional[List[Dict]] = None,
+    music_volume: float = 0.25,
+    fade_duration: float = 2.0,
+    duck_level: float = DUCK_LEVEL,
+    music_samples: Optional[np.ndarray] = None,
+    music_gain: float = 1.0,
+    sfx_layer: Optional[np.ndarray] = None,
+) -> str:
+    """
+    Mixes narration, looped/faded/ducked music and SFX into one WAV of
+    exactly `duration` seconds.
+
+    sfx_hits: [{"path": str, "time": float, "volume": float}]
+    music_samples: already decoded music (e.g. a music index stem); used
+        instead of decoding music_path
+    music_gain: loudness-normalizing gain applied on top of music_volume
+    sfx_layer: pre-layered SFX track (from audio.sfx_engine), added as is
+    """
+    frames = int(round(duration * SAMPLE_RATE))
+    # Narration shorter than duration is padded with silence, not looped
+    out = pad_to(decode_audio(narration_path), frames)
+
+    if music_samples is None and music_path:
+        music_samples = decode_audio(music_path)
+
+    if music_samples is not None:
+        music = fit_length(music_samples, frames) * (music_volume * music_gain)
+        apply_fades(music, fade_duration, fade_duration)
+        # out holds only the narration at this point
+        out += duck(music, speech_envelope(out), duck_level)
+
+    if sfx_layer is not None:
+        out += pad_to(sfx_layer, frames)
+
+    if sfx_hits:
+        decoded = {}
+        for hit in sfx_hits:
+            if hit["path"] not in decoded:
+                decoded[hit["path"]] = decode_audio(hit["path"])
+        mix_sfx(out, [{**hit, "samples": decoded[hit["path"]]} for hit in sfx_hits])
+
+    write_wav(output_path, out)
+    print(f"Audio mixed: {output_path} ({duration:.2f}s)")
+    return output_path
@@ -0,0 +1,324 @@
+"""
+Music Index - Precomputed metadata and decoded stems for the music library.
+
+Every track under assets/music is analysed once: duration, source sample
+rate and EBU R128 integrated loudness are stored in SQLite (keyed by file
+name, size and mtime), together with a loudness-normalizing gain toward
+`audio.loudness_target` from config/settings.yaml and a cached decode at the
+mixer's sample rate (.npy). Picking a track is an in-memory lookup and
+loudness normalization is a precomputed gain, not a loudnorm pass.
+
+A track's tone comes from its folder (assets/music/<tone>/) or, for files
+directly in assets/music, from its mood_category in music_library.
+
+    python -m scripts.audio.music_index
+"""
+
+import os
+import re
+import sys
+import random
+import hashlib
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from scripts.utils.settings import get_setting
+from scripts.utils.sheets_cache import get_table
+from scripts.utils.media_probe import probe
+from scripts.utils.tracing import run_command
+
+
+MUSIC_FOLDER = "assets/music"
+INDEX_FILENAME = ".music_index.sqlite"
+STEM_DIR = "cache/music"
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".aac")
+TONES = ("dark", "fun", "warm", "neutral")
+
+# music_library mood_category -> story tone
+MOOD_TONES = {
+    "scary": "dark",
+    "funny": "fun",
+    "meme": "fun",
+    "wholesome": "warm",
+    "sad": "warm",
+}
+
+
+# ------------------------------------------------------
+# DATA
+# ------------------------------------------------------
+
+@dataclass
+class MusicTrack:
+    path: str
+    tone: str
+    duration: float
+    sample_rate: int
+    loudness: Optional[float]    # integrated LUFS, None if unmeasurable
+    gain: float                  # linear gain toward the loudness target
+    track_id: str = ""
+
+
+# ------------------------------------------------------
+# ANALYSIS
+# ------------------------------------------------------
+
+def _source_sample_rate(path: str) -> int:
+    audio = probe(path).audio
+    return audio.sample_rate if audio else 0
+
+
+def measure_loudness(path: str) -> Optional[float]:
+    """Integrated loudness (LUFS) from ffmpeg's ebur128 filter."""
+    from scripts.ffmpeg_builder import get_ffmpeg_path
+
+    cmd = [
+        get_ffmpeg_path(),
+        "-hide_banner",
+        "-nostats",
+        "-i", path,
+        "-af", "ebur128=framelog=quiet",
+        "-f", "null",
+        "-",
+    ]
+    result = run_command(cmd, capture_output=True, text=True)
+    # The summary block at the end holds "I:  -16.3 LUFS"
+    matches = re.findall(r"I:\s+(-?[\d.]+) LUFS", result.stderr or "")
+    if not matches:
+        return None
+    value = float(matches[-1])
+    # Digital silence reports -70 (the gate floor); don't boost it
+    return value if value > -70.0 else None
+
+
+def _stem_path(name: str, size: int, mtime: float, sample_rate: int) -> str:
+    key = hashlib.sha1(f"{name}|{size}|{mtime}|{sample_rate}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(STEM_DIR, f"{key}.npy")
+
+
+# ------------------------------------------------------
+# INDEX
+# ------------------------------------------------------
+
+class MusicIndex:
+    """
+    On-disk index of a music folder, mirrored in memory as {tone: [MusicTrack]}.
+    """
+
+    def __init__(self, folder: str = MUSIC_FOLDER, db_path: Optional[str] = None):
+        self.folder = folder
+        self.db_path = db_path or os.path.join(folder, INDEX_FILENAME)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tracks (
+                name        TEXT PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime       REAL NOT NULL,
+                tone        TEXT NOT NULL,
+                track_id    TEXT NOT NULL,
+                duration    REAL NOT NULL,
+                sample_rate INTEGER NOT NULL,
+                loudness    REAL,
+                stem        TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+        self.by_tone: Dict[str, List[MusicTrack]] = {}
+        self.stems: Dict[str, str] = {}
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def _library(self) -> Dict[str, Dict]:
+        """music_library rows keyed by lowercased file name."""
+        try:
+            rows = get_table("music_library")
+        except RuntimeError as e:
+            print("Music library sheet unavailable:", e)
+            return {}
+        return {
+            str(r.get("file_name", "")).strip().lower(): r
+            for r in rows
+            if str(r.get("file_name", "")).strip()
+        }
+
+    def _tone_for(self, name: str, library: Dict[str, Dict]) -> str:
+        folder = name.split("/", 1)[0].lower() if "/" in name else ""
+        if folder in TONES:
+            return folder
+        row = library.get(os.path.basename(name).lower(), {})
+        return MOOD_TONES.get(str(row.get("mood_category", "")).strip().lower(), "neutral")
+
+    def _scan(self) -> Dict[str, tuple]:
+        on_disk = {}
+        for root, _, files in os.walk(self.folder):
+            for f in files:
+                if f.lower().endswith(AUDIO_EXTENSIONS):
+                    full = os.path.join(root, f)
+                    st = os.stat(full)
+                    name = os.path.relpath(full, self.folder).replace("\\", "/")
+                    on_disk[name] = (st.st_size, st.st_mtime)
+        return on_disk
+
+    def _analyse(self, name: str, size: int, mtime: float, library: Dict[str, Dict]) -> tuple:
+        from scripts.audio import mixer
+        import numpy as np
+
+        path = self._path(name)
+        samples = mixer.decode_audio(path)
+        stem = _stem_path(name, size, mtime, mixer.SAMPLE_RATE)
+        os.makedirs(STEM_DIR, exist_ok=True)
+        np.save(stem, samples)
+
+        row = library.get(os.path.basename(name).lower(), {})
+        return (
+            name, size, mtime,
+            self._tone_for(name, library),
+            str(row.get("track_id", "")),
+            len(samples) / float(mixer.SAMPLE_RATE),
+            _source_sample_rate(path),
+            measure_loudness(path),
+            stem,
+        )
+
+    def refresh(self) -> int:
+        """
+        Analyses new or modified tracks and drops deleted ones.
+        Returns the number of tracks analysed.
+        """
+        if not os.path.isdir(self.folder):
+            return 0
+
+        known = {
+            name: (size, mtime)
+            for name, size, mtime in self.conn.execute("SELECT name, size, mtime FROM tracks")
+        }
+        on_disk = self._scan()
+
+        changed = [name for name, sig in on_disk.items() if known.get(name) != sig]
+        removed = [name for name in known if name not in on_disk]
+
+        rows = []
+        if changed:
+            library = self._library()
+            for name in changed:
+                print("Indexing music:", name)
+                try:
+                    rows.append(self._analyse(name, *on_disk[name], library))
+                except Exception as e:
+                    print(f"Music analysis failed for {name}: {e}")
+
+        with self.conn:
+            if removed:
+                self.conn.executemany("DELETE FROM tracks WHERE name = ?", [(n,) for n in removed])
+            if rows:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+        if changed or removed:
+            print(f"Music index refreshed: {len(rows)} analysed, {len(removed)} removed")
+            self._load()
+        return len(rows)
+
+    def _load(self):
+        target = float(get_setting("audio.loudness_target", -14))
+        normalize = bool(get_setting("audio.normalize", True))
+
+        self.by_tone = {}
+        self.stems = {}
+        for name, tone, track_id, duration, sample_rate, loudness, stem in self.conn.execute(
+            "SELECT name, tone, track_id, duration, sample_rate, loudness, stem FROM tracks ORDER BY name"
+        ):
+            gain = 10 ** ((target - loudness) / 20.0) if (normalize and loudness is not None) else 1.0
+            track = MusicTrack(
+                path=self._path(name),
+                tone=tone,
+                duration=duration,
+                sample_rate=sample_rate,
+                loudness=loudness,
+                gain=gain,
+                track_id=track_id,
+            )
+            self.by_tone.setdefault(tone, []).append(track)
+            self.stems[track.path] = stem
+
+    def find(self, path: str) -> Optional[MusicTrack]:
+        """The indexed track at path, if any."""
+        for tracks in self.by_tone.values():
+            for t in tracks:
+                if t.path == path:
+                    return t
+        return None
+
+    def tracks(self, tone: str) -> List[MusicTrack]:
+        return list(self.by_tone.get(tone, []))
+
+    def choose(self, tone: str, rng=random) -> MusicTrack:
+        """Random track for a tone, falling back to neutral."""
+        candidates = self.by_tone.get(tone)
+        if not candidates:
+            print(f"Warning: no '{tone}' music indexed. Trying neutral...")
+            candidates = self.by_tone.get("neutral")
+        if not candidates:
+            raise RuntimeError(
+                f"No music files found. Please add music files to {self.folder}/[dark|fun|warm|neutral]/"
+            )
+        return rng.choice(candidates)
+
+    def load_stem(self, track: MusicTrack):
+        """
+        Decoded samples at the mixer's sample rate, memory-mapped from the
+        stem cache (decoded again if the cache file was removed).
+        """
+        import numpy as np
+
+        stem = self.stems.get(track.path)
+        if stem and os.path.isfile(stem):
+            return np.load(stem, mmap_mode="r")
+
+        from scripts.audio import mixer
+        return mixer.decode_audio(track.path)
+
+    def close(self):
+        self.conn.close()
+
+
+_indexes: Dict[str, MusicIndex] = {}
+
+
+def get_music_index(folder: str = MUSIC_FOLDER, refresh: bool = False) -> MusicIndex:
+    """
+    Returns the process-wide index for a folder, refreshing it the first
+    time it is opened (or every call when refresh=True).
+    """
+    key = os.path.abspath(folder)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = MusicIndex(folder)
+        index.refresh()
+    elif refresh:
+        index.refresh()
+    return index
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else MUSIC_FOLDER
+    index = MusicIndex(folder)
+    analysed = index.refresh()
+    for tone in TONES:
+        for t in index.tracks(tone):
+            loud = f"{t.loudness:6.1f} LUFS" if t.loudness is not None else "   n/a    "
+            print(f"  {tone:<8} {t.duration:7.1f}s {t.sample_rate:>6}Hz {loud} gain x{t.gain:.2f}  {t.path}")
+    print(f"Music index: {index.db_path} ({analysed} analysed)")
@@ -0,0 +1,321 @@
+"""
+SFX Engine - Preloaded sample bank and one-pass layering of timed hits.
+
+Stories can carry `[TAG]` markers (e.g. "...at 6:03 AM [SUS]."). A marker is
+resolved against the sfx_library sheet:
+- an effect's own name      [AMONG_US_SUSPECT]
+- a tag used in its examples [SUS]  (from the level_N_impact columns)
+- a category                [IMPACT] (prefers "used most" effects)
+
+Markers are timed like the captions (word position / word count * narration
+length) and stripped from the text before TTS and captions.
+
+All effects are decoded once into a single float32 array at the mixer's
+sample rate and cached in cache/sfx/, so a render memory-maps one file.
+Every hit is then layered into one track with a single bincount per
+channel, no matter how many hits a story has.
+
+    python -m scripts.audio.sfx_engine      # (re)build the sample bank
+"""
+
+import os
+import re
+import json
+import random
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List
+
+from scripts.utils.sheets_cache import get_table
+
+
+SFX_FOLDER = "assets/sfx"
+BANK_DIR = "cache/sfx"
+
+MARKER_RE = re.compile(r"\[([A-Za-z][A-Za-z0-9_ ]*)\]")
+PREFERRED_WEIGHT = 3.0   # pick weight of "used most" effects within a tag
+
+
+# ------------------------------------------------------
+# LIBRARY
+# ------------------------------------------------------
+
+@dataclass
+class SfxEffect:
+    sfx_id: str
+    path: str
+    category: str
+    name: str
+    lead: float = 0.0        # script_delay: seconds from sample start to its impact
+    preferred: bool = False  # impact_level "used most"
+
+
+def _tag(text: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", "_", text.upper()).strip("_")
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def load_effects(folder: str = SFX_FOLDER) -> List[SfxEffect]:
+    """sfx_library rows whose file exists under folder."""
+    effects = []
+    for row in get_table("sfx_library"):
+        file_name = str(row.get("file_name") or "").strip()
+        path = os.path.join(folder, file_name)
+        if not file_name or not os.path.isfile(path):
+            continue
+        # "Original File Name" is a slug, sometimes followed by a note in parentheses
+        original = str(row.get("Original File Name") or "").split("(")[0].strip()
+        effects.append(SfxEffect(
+            sfx_id=str(row.get("sfx_id", "")).strip(),
+            path=path,
+            category=_tag(str(row.get("category") or "")),
+            name=_tag(original),
+            lead=_float(row.get("script_delay")),
+            preferred="used most" in str(row.get("impact_level") or "").lower(),
+        ))
+    return effects
+
+
+def _example_tags() -> Dict[str, set]:
+    """{sfx_id: {tags used in its level_N_impact example scripts}}"""
+    out = {}
+    for row in get_table("sfx_library"):
+        tags = set()
+        for key, value in row.items():
+            if key and key.startswith("level_") and value:
+                tags.update(_tag(t) for t in MARKER_RE.findall(str(value)))
+        if tags:
+            out[str(row.get("sfx_id", "")).strip()] = tags
+    return out
+
+
+def build_tag_map(effects: List[SfxEffect]) -> Dict[str, List[SfxEffect]]:
+    """Tag -> candidate effects. Names win over example tags over categories."""
+    examples = _example_tags()
+    by_name, by_example, by_category = {}, {}, {}
+    for e in effects:
+        if e.name:
+            by_name.setdefault(e.name, []).append(e)
+        for t in examples.get(e.sfx_id, ()):
+            by_example.setdefault(t, []).append(e)
+        if e.category:
+            by_category.setdefault(e.category, []).append(e)
+
+    tags = dict(by_category)
+    tags.update(by_example)
+    tags.update(by_name)
+    return tags
+
+
+# ------------------------------------------------------
+# SAMPLE BANK
+# ------------------------------------------------------
+
+class SampleBank:
+    """
+    Every effect decoded into one (frames, channels) array; offsets[i] and
+    lengths[i] locate effect i. Built once and cached on disk.
+    """
+
+    def __init__(self, effects: List[SfxEffect]):
+        from scripts.audio import mixer
+
+        self.effects = effects
+        self.index = {e.sfx_id: i for i, e in enumerate(effects)}
+        self.sample_rate = mixer.SAMPLE_RATE
+        self.samples, self.offsets, self.lengths = self._load_or_build()
+
+    def _cache_key(self) -> str:
+        parts = [str(self.sample_rate)]
+        for e in self.effects:
+            st = os.stat(e.path)
+            parts.append(f"{e.path}|{st.st_size}|{st.st_mtime}")
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def _load_or_build(self):
+        import numpy as np
+        from scripts.audio import mixer
+
+        key = self._cache_key()
+        data_path = os.path.join(BANK_DIR, f"bank_{key}.npy")
+        meta_path = os.path.join(BANK_DIR, f"bank_{key}.json")
+
+        if os.path.isfile(data_path) and os.path.isfile(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            return np.load(data_path, mmap_mode="r"), meta["offsets"], meta["lengths"]
+
+        print(f"Building SFX sample bank ({len(self.effects)} effects)...")
+        decoded = []
+        for e in self.effects:
+            try:
+                decoded.append(mixer.decode_audio(e.path))
+            except Exception as ex:
+                print(f"SFX decode failed for {e.path}: {ex}")
+                decoded.append(np.zeros((0, mixer.CHANNELS), dtype=np.float32))
+
+        lengths = [len(d) for d in decoded]
+        offsets = [0]
+        for n in lengths[:-1]:
+            offsets.append(offsets[-1] + n)
+        samples = np.concatenate(decoded) if decoded else np.zeros((0, mixer.CHANNELS), dtype=np.float32)
+
+        os.makedirs(BANK_DIR, exist_ok=True)
+        np.save(data_path, samples)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"offsets": offsets, "lengths": lengths}, f)
+        return samples, offsets, lengths
+
+
+_banks: Dict[str, SampleBank] = {}
+
+
+def get_sample_bank(folder: str = SFX_FOLDER) -> SampleBank:
+    """Process-wide bank for a folder."""
+    key = os.path.abspath(folder)
+    if key not in _banks:
+        _banks[key] = SampleBank(load_effects(folder))
+    return _banks[key]
+
+
+# ------------------------------------------------------
+# MARKERS
+# ------------------------------------------------------
+
+def strip_markers(text: str) -> str:
+    """Removes [TAG] markers so they are neither spoken nor captioned."""
+    text = MARKER_RE.sub("", text)
+    text = re.sub(r"[ \t]+([.,!?;:])", r"\1", text)
+    return re.sub(r"[ \t]{2,}", " ", text).strip()
+
+
+def find_markers(text: str, duration: float) -> List[Dict]:
+    """
+    Returns [{"tag", "time"}] for every marker. Time assumes an even
+    speaking rate, the same model the captions use.
+    """
+    clean_words = len(strip_markers(text).split())
+    if not clean_words or duration <= 0:
+        return []
+
+    markers = []
+    for m in MARKER_RE.finditer(text):
+        words_before = len(strip_markers(text[:m.start()]).split())
+        markers.append({
+            "tag": _tag(m.group(1)),
+            "time": duration * words_before / clean_words,
+        })
+    return markers
+
+
+def plan_hits(
+    text: str,
+    duration: float,
+    tag_map: Dict[str, List[SfxEffect]],
+    volume: float = 0.8,
+    rng=random,
+) -> List[Dict]:
+    """
+    Resolves markers to effects.
+    Returns [{"sfx_id", "time", "volume"}]; unknown tags are skipped.
+    """
+    hits = []
+    unknown = set()
+    for marker in find_markers(text, duration):
+        candidates = tag_map.get(marker["tag"])
+        if not candidates:
+            unknown.add(marker["tag"])
+            continue
+        weights = [PREFERRED_WEIGHT if e.preferred else 1.0 for e in candidates]
+        effect = rng.choices(candidates, weights=weights)[0]
+        hits.append({
+            "sfx_id": effect.sfx_id,
+            # Start early by the effect's lead so its impact lands on the marker
+            "time": max(0.0, marker["time"] - effect.lead),
+            "volume": volume,
+        })
+
+    if unknown:
+        print("SFX: no effect for", ", ".join(f"[{t}]" for t in sorted(unknown)))
+    return hits
+
+
+# ------------------------------------------------------
+# LAYERING
+# ------------------------------------------------------
+
+def layer_hits(bank: SampleBank, hits: List[Dict], frames: int):
+    """
+    Renders every hit into one (frames, channels) float32 track.
+
+    The destination/source frame indices of all hits are built with
+    repeat/arange and summed with one bincount per channel, so overlapping
+    hits add up and the cost is independent of the number of hits.
+    """
+    import numpy as np
+
+    channels = bank.samples.shape[1] if bank.samples.ndim > 1 else 1
+    out = np.zeros((frames, channels), dtype=np.float32)
+
+    starts, offsets, lengths, volumes = [], [], [], []
+    for hit in hits:
+        i = bank.index.get(hit["sfx_id"])
+        if i is None:
+            continue
+        start = int(round(hit["time"] * bank.sample_rate))
+        length = min(bank.lengths[i], frames - start)
+        if length <= 0:
+            continue
+        starts.append(start)
+        offsets.append(bank.offsets[i])
+        lengths.append(length)
+        volumes.append(hit.get("volume", 1.0))
+
+    if not lengths:
+        return out
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    within = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dest = np.repeat(np.asarray(starts, dtype=np.int64), lengths) + within
+    src = np.repeat(np.asarray(offsets, dtype=np.int64), lengths) + within
+    gain = np.repeat(np.asarray(volumes, dtype=np.float32), lengths)
+
+    for c in range(channels):
+        out[:, c] = np.bincount(dest, weights=bank.samples[src, c] * gain, minlength=frames)
+    return out
+
+
+def build_sfx_layer(text: str, duration: float, folder: str = SFX_FOLDER, volume: float = 0.8):
+    """
+    Plans and layers the SFX for a story with markers.
+    Returns (layer, hits), or (None, []) when there is nothing to add.
+    """
+    if not MARKER_RE.search(text):
+        return None, []
+
+    bank = get_sample_bank(folder)
+    hits = plan_hits(text, duration, build_tag_map(bank.effects), volume=volume)
+    if not hits:
+        return None, []
+
+    frames = int(round(duration * bank.sample_rate))
+    print(f"SFX: {len(hits)} hits")
+    return layer_hits(bank, hits, frames), hits
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    bank = get_sample_bank()
+    tags = build_tag_map(bank.effects)
+    print(f"SFX bank: {len(bank.effects)} effects, {len(bank.samples) / bank.sample_rate:.1f}s of audio")
+    print("Tags:", ", ".join(sorted(tags)))
@@ -0,0 +1,200 @@
+"""
+TTS Engine - Cached and chunked OpenAI speech synthesis.
+
+Every synthesis is cached on disk under a hash of (text, voice, instructions,
+model, speed), so re-running a failed render never pays for the same audio
+twice. Long stories can be split at sentence boundaries and the chunks
+synthesized concurrently as raw PCM; the PCM is concatenated sample-exactly
+and encoded to MP3 once, so there are no codec gaps between chunks.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from scripts.ffmpeg_builder import get_ffmpeg_path
+from scripts.utils.env import get_openai_client
+from scripts.utils.tracing import run_command
+
+
+CACHE_DIR = "cache/tts"
+
+# OpenAI "pcm" output: 24 kHz, 16-bit signed little-endian, mono
+PCM_SAMPLE_RATE = 24000
+
+MAX_CHUNK_CHARS = 4000      # API input limit is 4096 characters
+MIN_CHUNK_CHARS = 400       # below this, per-request latency dominates
+DEFAULT_WORKERS = 4
+RETRIES = 3
+
+
+# ------------------------------------------------------
+# CACHE
+# ------------------------------------------------------
+
+def cache_key(text: str, voice: str, instructions: str, model: str, speed: float, fmt: str) -> str:
+    blob = json.dumps(
+        {
+            "text": text,
+            "voice": voice,
+            "instructions": instructions,
+            "model": model,
+            "speed": speed,
+            "format": fmt,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _cache_path(key: str, ext: str) -> str:
+    # Two-level fan-out keeps directories small on long-running boxes
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.{ext}")
+
+
+def _publish(tmp_path: str, final_path: str):
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+
+
+# ------------------------------------------------------
+# SYNTHESIS
+# ------------------------------------------------------
+
+def split_into_chunks(text: str, max_chunks: int = DEFAULT_WORKERS) -> List[str]:
+    """
+    Splits text at sentence boundaries into at most ~max_chunks pieces of
+    similar length (never above MAX_CHUNK_CHARS).
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    target = max(MIN_CHUNK_CHARS, -(-len(text) // max(1, max_chunks)))
+    target = min(target, MAX_CHUNK_CHARS)
+
+    chunks, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + 1 + len(sentence) > target:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        # Fold a short tail into the previous chunk instead of paying for
+        # an extra request
+        if chunks and len(current) < target // 2 and len(chunks[-1]) + 1 + len(current) <= MAX_CHUNK_CHARS:
+            chunks[-1] = f"{chunks[-1]} {current}"
+        else:
+            chunks.append(current)
+
+    return chunks
+
+
+def _synthesize_to_file(text, voice, instructions, model, speed, fmt, out_path):
+    """One API request, streamed to a cache file, retried with backoff."""
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.part"
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    for attempt in range(1, RETRIES + 1):
+        try:
+            client = get_openai_client()
+            with client.audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=text,
+                speed=speed,
+                instructions=instructions,
+                response_format=fmt,
+            ) as response:
+                response.stream_to_file(tmp_path)
+            _publish(tmp_path, out_path)
+            return out_path
+        except Exception as e:
+            if attempt == RETRIES:
+                raise
+            print(f"TTS request failed ({e}), retry {attempt}/{RETRIES - 1}...")
+            time.sleep(2 ** attempt)
+
+
+def _synthesize_pcm_chunk(chunk, voice, instructions, model, speed) -> str:
+    key = cache_key(chunk, voice, instructions, model, speed, "pcm")
+    path = _cache_path(key, "pcm")
+    if not os.path.isfile(path):
+        _synthesize_to_file(chunk, voice, instructions, model, speed, "pcm", path)
+    return path
+
+
+def _encode_pcm_to_mp3(pcm_paths: List[str], mp3_path: str):
+    """Concatenates raw PCM chunks and encodes them to MP3 in one pass."""
+    joined = f"{mp3_path}.pcm"
+    with open(joined, "wb") as out:
+        for p in pcm_paths:
+            with open(p, "rb") as f:
+                shutil.copyfileobj(f, out)
+
+    cmd = [
+        get_ffmpeg_path(),
+        "-y",
+        "-f", "s16le",
+        "-ar", str(PCM_SAMPLE_RATE),
+        "-ac", "1",
+        "-i", joined,
+        "-c:a", "libmp3lame",
+        "-b:a", "192k",
+        mp3_path,
+    ]
+    try:
+        run_command(cmd, check=True, capture_output=True)
+    finally:
+        os.remove(joined)
+
+
+def synthesize_speech(
+    text: str,
+    mp3_path: str,
+    voice: str,
+    instructions: str,
+    model: str,
+    speed: float,
+    chunked: bool = True,
+    workers: int = DEFAULT_WORKERS,
+) -> str:
+    """
+    Writes narration for text to mp3_path, reusing cached audio when the
+    same (text, voice, instructions, model, speed) was synthesized before.
+
+    chunked: split long text at sentence boundaries and synthesize the
+        chunks concurrently; individual chunks are cached too, so a retry
+        after a partial failure only requests the missing ones.
+    """
+    key = cache_key(text, voice, instructions, model, speed, "mp3")
+    cached = _cache_path(key, "mp3")
+
+    if os.path.isfile(cached):
+        shutil.copyfile(cached, mp3_path)
+        print("TTS cache hit:", key[:12])
+        return mp3_path
+
+    chunks = split_into_chunks(text, workers) if chunked else [text]
+
+    if len(chunks) == 1:
+        _synthesize_to_file(text, voice, instructions, model, speed, "mp3", cached)
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            pcm_paths = list(pool.map(
+                lambda c: _synthesize_pcm_chunk(c, voice, instructions, model, speed),
+                chunks,
+            ))
+        tmp_mp3 = f"{cached}.{os.getpid()}.tmp.mp3"
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        _encode_pcm_to_mp3(pcm_paths, tmp_mp3)
+        _publish(tmp_mp3, cached)
+
+    shutil.copyfile(cached, mp3_path)
+    print(f"TTS synthesized: {len(chunks)} chunk(s), cached as {key[:12]}")
+    return mp3_path
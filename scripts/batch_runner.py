@@ -0,0 +1,167 @@
+"""
+Batch Runner - Produce many videos per invocation with stage-aware concurrency.
+
+Network-bound stages (story LLM calls, TTS) run concurrently on the asyncio
+event loop, bounded by --api-concurrency. CPU-bound stages (scheduling and the
+ffmpeg encode) go to a bounded process pool, so the cores stay busy encoding
+one video while the next stories are still being written.
+
+    python -m scripts.batch_runner --all --count 3
+    python -m scripts.batch_runner reddit_karma_files:5 askreddit_unfiltered
+"""
+
+import os
+import sys
+import csv
+import time
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from scripts.generate_full_video import (
+    new_run_prefix,
+    story_stage,
+    narration_stage,
+    render_stage,
+)
+from scripts.utils.tracing import trace_run
+
+
+CHANNELS_CSV = "data/sheets_backup/channels.csv"
+
+
+# ------------------------------------------------------
+# JOB LIST
+# ------------------------------------------------------
+
+def load_channel_ids(path: str = CHANNELS_CSV) -> List[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [r["channel_id"].strip() for r in csv.DictReader(f) if r.get("channel_id", "").strip()]
+
+
+def parse_channel_specs(specs: List[str], default_count: int = 1) -> List[Tuple[str, int]]:
+    """Parses 'channel_id' or 'channel_id:count' arguments."""
+    out = []
+    for spec in specs:
+        channel_id, _, count = spec.partition(":")
+        out.append((channel_id.strip(), int(count) if count else default_count))
+    return out
+
+
+def default_render_workers() -> int:
+    # Each x264 encode already spreads over several threads, so a few
+    # concurrent encodes are enough to saturate the machine
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+# ------------------------------------------------------
+# RUNNER
+# ------------------------------------------------------
+
+async def produce_video(channel_id, run_prefix, api_slots, render_pool, use_segment_pool=False, draft=False):
+    loop = asyncio.get_running_loop()
+
+    async with api_slots:
+        # Each task runs in its own context, and to_thread copies it, so
+        # the stages below record into this video's trace; the render
+        # worker continues the same trace file
+        with trace_run(run_prefix):
+            result = await asyncio.to_thread(story_stage, channel_id, run_prefix)
+            story = result["story"]
+            audio_path, duration = await asyncio.to_thread(
+                narration_stage, story, run_prefix, channel_id
+            )
+
+    # The API slot is released before encoding so the next story can start
+    return await loop.run_in_executor(
+        render_pool,
+        render_stage,
+        channel_id,
+        story,
+        audio_path,
+        duration,
+        run_prefix,
+        use_segment_pool,
+        draft,
+    )
+
+
+async def run_batch(jobs, api_concurrency=4, render_workers=None, use_segment_pool=False, draft=False):
+    """
+    jobs: [(channel_id, count)]
+    Returns [(channel_id, run_prefix, final_path_or_exception)].
+    """
+    os.makedirs("output", exist_ok=True)
+
+    api_slots = asyncio.Semaphore(api_concurrency)
+    render_workers = render_workers or default_render_workers()
+
+    runs = []
+    for channel_id, count in jobs:
+        base = new_run_prefix(channel_id)
+        for n in range(count):
+            runs.append((channel_id, f"{base}_{n + 1:02d}"))
+
+    print(f"Batch: {len(runs)} videos, api_concurrency={api_concurrency}, render_workers={render_workers}")
+
+    # spawn keeps worker processes independent of the event loop's threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=render_workers, mp_context=ctx) as render_pool:
+        results = await asyncio.gather(
+            *[
+                produce_video(channel_id, prefix, api_slots, render_pool, use_segment_pool, draft)
+                for channel_id, prefix in runs
+            ],
+            return_exceptions=True,
+        )
+
+    return [(channel_id, prefix, res) for (channel_id, prefix), res in zip(runs, results)]
+
+
+def print_summary(results, wall_seconds):
+    failed = [r for r in results if isinstance(r[2], BaseException)]
+
+    print("\n=== BATCH SUMMARY ===")
+    for channel_id, prefix, res in results:
+        if isinstance(res, BaseException):
+            print(f"  FAILED  {prefix}: {type(res).__name__}: {res}")
+        else:
+            print(f"  OK      {res}")
+    print(f"{len(results) - len(failed)}/{len(results)} videos in {wall_seconds:.1f}s")
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scripts.batch_runner")
+    parser.add_argument("channels", nargs="*", help="channel_id or channel_id:count")
+    parser.add_argument("--all", action="store_true", help=f"every channel in {CHANNELS_CSV}")
+    parser.add_argument("--count", type=int, default=1, help="videos per channel (default 1)")
+    parser.add_argument("--api-concurrency", type=int, default=4, help="concurrent story/TTS pipelines")
+    parser.add_argument("--render-workers", type=int, default=None, help="parallel ffmpeg render processes")
+    parser.add_argument("--segment-pool", action="store_true", help="stream-copy backgrounds from the segment pool")
+    parser.add_argument("--draft", action="store_true", help="render 540x960 review proxies")
+    args = parser.parse_args()
+
+    specs = list(args.channels)
+    if args.all:
+        specs += load_channel_ids()
+    if not specs:
+        parser.error("give at least one channel_id or --all")
+
+    started = time.perf_counter()
+    results = asyncio.run(
+        run_batch(
+            parse_channel_specs(specs, args.count),
+            api_concurrency=args.api_concurrency,
+            render_workers=args.render_workers,
+            use_segment_pool=args.segment_pool,
+            draft=args.draft,
+        )
+    )
+    print_summary(results, time.perf_counter() - started)
+    sys.exit(1 if any(isinstance(r[2], BaseException) for r in results) else 0)
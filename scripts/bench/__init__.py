@@ -0,0 +1 @@
+# Benchmarks and performance budgets
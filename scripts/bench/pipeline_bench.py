@@ -0,0 +1,293 @@
+"""
+Pipeline Benchmark - End-to-end stage timings on synthetic media.
+
+Generates gameplay clips, narration and music locally with ffmpeg lavfi
+sources (testsrc2, sine), then runs each pipeline stage at several target
+lengths and segment-length settings. Every stage runs in its own forked
+process so wall time, CPU time (self + ffmpeg children), peak RSS and bytes
+written are attributed to that stage alone.
+
+    python -m scripts.bench.pipeline_bench --out bench.json
+    python -m scripts.bench.pipeline_bench --lengths 30 60 --baseline bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from typing import Callable, Dict, List
+
+from scripts.ffmpeg_builder import get_ffmpeg_path, render_background
+from scripts.clip_catalog import ClipCatalog
+from scripts.clip_scheduler import build_clip_schedule, SchedulerConfig
+from scripts.captions.srt_builder import generate_srt_file
+from scripts.captions.captions_engine import burn_captions_into_video
+from scripts.audio.music_engine import normalize_music_length, duck_music_for_speech
+from scripts.pipeline.video_assembler import compose_final_video
+
+
+DEFAULT_LENGTHS = [30, 60, 180, 600]
+DEFAULT_SEGMENTS = ["5-7", "9-11"]
+CLIP_COUNT = 6
+CLIP_SECONDS = 40
+WORDS = (
+    "so my neighbor knocked on the door at midnight and I honestly thought "
+    "it was a prank until she handed me a box with my name written on it"
+).split()
+
+
+# ------------------------------------------------------
+# SYNTHETIC MEDIA
+# ------------------------------------------------------
+
+def _ffmpeg(*args):
+    cmd = [get_ffmpeg_path(), "-y", "-v", "error", *args]
+    subprocess.run(cmd, check=True)
+
+
+def make_clips(folder: str, count: int = CLIP_COUNT, seconds: int = CLIP_SECONDS) -> List[str]:
+    os.makedirs(folder, exist_ok=True)
+    clips = []
+    for i in range(count):
+        path = os.path.join(folder, f"bench_{i:03d}.mp4")
+        _ffmpeg(
+            "-f", "lavfi", "-i", f"testsrc2=size=1080x1920:rate=30:duration={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            path,
+        )
+        clips.append(path)
+    return clips
+
+
+def make_tone(path: str, seconds: float, freq: int):
+    _ffmpeg(
+        "-f", "lavfi", "-i", f"sine=frequency={freq}:sample_rate=44100:duration={seconds}",
+        "-c:a", "libmp3lame", "-b:a", "128k",
+        path,
+    )
+    return path
+
+
+def make_story(seconds: float) -> str:
+    # ~4 words per second matches TTS at speed 1.7
+    rng = random.Random(int(seconds))
+    words = [rng.choice(WORDS) for _ in range(int(seconds * 4))]
+    return ". ".join(" ".join(words[i:i + 12]) for i in range(0, len(words), 12)) + "."
+
+
+# ------------------------------------------------------
+# MEASUREMENT
+# ------------------------------------------------------
+
+def _stage_child(fn: Callable, queue):
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    child_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    error = None
+    outputs = []
+    try:
+        outputs = fn() or []
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    child_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu = (
+        (self_after.ru_utime - self_before.ru_utime)
+        + (self_after.ru_stime - self_before.ru_stime)
+        + (child_after.ru_utime - child_before.ru_utime)
+        + (child_after.ru_stime - child_before.ru_stime)
+    )
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak_rss = max(self_after.ru_maxrss, child_after.ru_maxrss) * scale
+
+    queue.put({
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": round(peak_rss / (1 << 20), 1),
+        "bytes_written": sum(os.path.getsize(p) for p in outputs if os.path.isfile(p)),
+        "error": error,
+    })
+
+
+def measure_stage(fn: Callable[[], List[str]]) -> Dict:
+    """
+    Runs fn in a forked process. fn returns the paths it wrote.
+    Peak RSS is the max of the stage process and any ffmpeg it spawned.
+    """
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_stage_child, args=(fn, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+# ------------------------------------------------------
+# STAGES
+# ------------------------------------------------------
+
+def run_case(workdir: str, clips: List[str], length: int, min_seg: int, max_seg: int) -> List[Dict]:
+    case_dir = os.path.join(workdir, f"len{length}_seg{min_seg}-{max_seg}")
+    os.makedirs(case_dir, exist_ok=True)
+
+    narration = make_tone(os.path.join(case_dir, "narration.mp3"), length, 220)
+    music = make_tone(os.path.join(case_dir, "music.mp3"), 45, 440)
+    story = make_story(length)
+
+    catalog = ClipCatalog(os.path.dirname(clips[0]))
+    catalog.refresh()
+    config = SchedulerConfig(min_seg=min_seg, max_seg=max_seg)
+
+    random.seed(length * 100 + min_seg)
+    schedule = build_clip_schedule(list(clips), length, config, catalog=catalog)
+
+    p = lambda name: os.path.join(case_dir, name)
+
+    def schedule_stage():
+        random.seed(length)
+        build_clip_schedule(list(clips), length, config, catalog=ClipCatalog(catalog.folder))
+        return []
+
+    def background_stage():
+        return [render_background(schedule, p("bg.mp4"))]
+
+    def captions_stage():
+        generate_srt_file(story, length, p("captions.srt"))
+        burn_captions_into_video(p("bg.mp4"), p("captions.srt"), p("captioned.mp4"))
+        return [p("captions.srt"), p("captioned.mp4")]
+
+    def music_stage():
+        normalize_music_length(music, length, p("music_norm.mp3"))
+        duck_music_for_speech(p("music_norm.mp3"), narration, p("music_ducked.mp3"))
+        return [p("music_norm.mp3"), p("music_ducked.mp3")]
+
+    def mix_stage():
+        from scripts.audio.mixer import mix_narration
+        mix_narration(narration, length, p("mix.wav"), music_path=music)
+        return [p("mix.wav")]
+
+    def mux_stage():
+        from scripts.generate_full_video import mux_audio_video
+        mux_audio_video(p("captioned.mp4"), narration, p("final_legacy.mp4"))
+        return [p("final_legacy.mp4")]
+
+    def compose_stage():
+        generate_srt_file(story, length, p("captions.srt"))
+        compose_final_video(
+            schedule, narration, p("final_composed.mp4"), length,
+            srt_path=p("captions.srt"), music_path=music,
+        )
+        return [p("final_composed.mp4")]
+
+    stages = [
+        ("schedule", schedule_stage),
+        ("render_background", background_stage),
+        ("captions", captions_stage),
+        ("music", music_stage),
+        ("mix_pcm", mix_stage),
+        ("mux", mux_stage),
+        ("compose_single_pass", compose_stage),
+    ]
+
+    rows = []
+    for name, fn in stages:
+        r = measure_stage(fn)
+        r.update({"length": length, "segments": f"{min_seg}-{max_seg}", "stage": name})
+        rows.append(r)
+        status = "ERR " + r["error"] if r["error"] else ""
+        print(
+            f"  {name:<20} wall={r['wall_s']:8.2f}s cpu={r['cpu_s']:8.2f}s "
+            f"rss={r['peak_rss_mb']:7.1f}MB out={r['bytes_written'] / 1e6:8.1f}MB {status}"
+        )
+    return rows
+
+
+# ------------------------------------------------------
+# BASELINE COMPARISON
+# ------------------------------------------------------
+
+def compare_to_baseline(results: List[Dict], baseline_path: str, max_regression: float) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    key = lambda r: (r["length"], r["segments"], r["stage"])
+    base = {key(r): r for r in baseline.get("results", [])}
+
+    regressions = []
+    print("\n=== VS BASELINE (wall time) ===")
+    for r in results:
+        b = base.get(key(r))
+        if not b or not b["wall_s"] or r["error"]:
+            continue
+        ratio = r["wall_s"] / b["wall_s"]
+        flag = ""
+        # Ignore sub-50ms stages; their noise dominates the ratio
+        if ratio > 1 + max_regression and r["wall_s"] > 0.05:
+            flag = "  <-- REGRESSION"
+            regressions.append(f"{key(r)}: {b['wall_s']:.2f}s -> {r['wall_s']:.2f}s")
+        print(f"  {r['length']:>5}s {r['segments']:>6} {r['stage']:<20} x{ratio:5.2f}{flag}")
+    return regressions
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scripts.bench.pipeline_bench")
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS, help="target video lengths (s)")
+    parser.add_argument("--segments", nargs="+", default=DEFAULT_SEGMENTS, help="min-max segment lengths, e.g. 5-7")
+    parser.add_argument("--out", default="output/bench/pipeline_bench.json", help="where to write results JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed wall-time slowdown (0.15 = 15%%)")
+    parser.add_argument("--workdir", help="keep synthetic media here instead of a temp dir")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pipeline_bench_")
+    try:
+        print("Generating synthetic clips...")
+        clips = make_clips(os.path.join(workdir, "clips"))
+
+        results = []
+        for length in args.lengths:
+            for seg in args.segments:
+                min_seg, max_seg = (int(x) for x in seg.split("-"))
+                print(f"\n=== {length}s, segments {min_seg}-{max_seg} ===")
+                results += run_case(workdir, clips, length, min_seg, max_seg)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("\nResults written:", args.out)
+
+    failures = [r for r in results if r["error"]]
+    regressions = compare_to_baseline(results, args.baseline, args.max_regression) if args.baseline else []
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print("  -", line)
+    sys.exit(1 if failures or regressions else 0)
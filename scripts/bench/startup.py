@@ -0,0 +1,114 @@
+"""
+Startup Benchmark - Import-time budget check using `python -X importtime`.
+
+Each module is imported in a fresh interpreter; the cumulative import time
+reported by -X importtime is compared to its budget. The check also fails if
+a lightweight module pulls in an SDK that should only be imported lazily.
+
+    python -m scripts.bench.startup            # exit 1 on regression
+    python -m scripts.bench.startup --top 15   # also list slowest imports
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+
+# Cumulative import time budgets in milliseconds (best of --runs)
+BUDGETS_MS = {
+    "scripts.clip_scheduler": 100,
+    "scripts.clip_catalog": 100,
+    "scripts.ffmpeg_builder": 100,
+    "scripts.normalize_gameplay": 150,
+    "scripts.segment_pool": 120,
+    "scripts.generate_full_video": 250,
+    "scripts.batch_runner": 300,
+}
+
+# SDKs that must only be imported when a client is actually needed
+LAZY_ONLY = ("openai", "gspread", "oauth2client", "dotenv", "httpx", "numpy")
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Imports module in a fresh interpreter.
+    Returns (cumulative_ms, [(imported_module, self_ms), ...]).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    entries = []
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        name = name.rstrip()
+        entries.append((name.strip(), self_us / 1000.0))
+        if name.strip() == module:
+            total_us = cumulative_us
+
+    return total_us / 1000.0, entries
+
+
+def check_budgets(budgets: Dict[str, float], runs: int = 3, top: int = 0) -> List[str]:
+    failures = []
+
+    for module, budget in budgets.items():
+        best = None
+        entries = []
+        for _ in range(runs):
+            ms, e = measure_import(module)
+            if best is None or ms < best:
+                best, entries = ms, e
+
+        imported = {name.split(".")[0] for name, _ in entries}
+        leaked = sorted(imported.intersection(LAZY_ONLY))
+
+        status = "OK" if best <= budget and not leaked else "FAIL"
+        print(f"{status:<5} {module:<32} {best:8.1f} ms  (budget {budget} ms)")
+
+        if best > budget:
+            failures.append(f"{module}: {best:.1f} ms > {budget} ms")
+        if leaked:
+            failures.append(f"{module}: eagerly imports {', '.join(leaked)}")
+            print(f"      eager SDK imports: {', '.join(leaked)}")
+
+        if top:
+            for name, self_ms in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+                print(f"      {self_ms:8.2f} ms  {name}")
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scripts.bench.startup")
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; best run counts")
+    parser.add_argument("--top", type=int, default=0, help="show the N slowest imports per module")
+    parser.add_argument("--budgets", help="JSON file of {module: ms} overriding the defaults")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS_MS)
+    if args.budgets:
+        with open(args.budgets, "r", encoding="utf-8") as f:
+            budgets.update(json.load(f))
+
+    failures = check_budgets(budgets, runs=args.runs, top=args.top)
+    if failures:
+        print("\nImport-time budget exceeded:")
+        for f in failures:
+            print("  -", f)
+        sys.exit(1)
+    print("\nAll modules within import-time budget.")
@@ -4,7 +4,31 @@ Captions Engine - Burn animated captions into video using FFmpeg.
 
 import os
 import subprocess
+from scripts.encoder_profiles import get_profile
 from scripts.captions.srt_builder import generate_srt_file
+from scripts.utils.tracing import run_command
+
+
+def build_subtitles_filter(srt_path: str, font_size: int = 42, border_width: int = 3) -> str:
+    """
+    Build the styled FFmpeg subtitles filter for an .srt file.
+    Shared by burn_captions_into_video and the single-pass video assembler.
+    """
+    # Escape path for FFmpeg filter
+    srt_escaped = srt_path.replace('\\', '/').replace(':', '\\\\:')
+
+    # FFmpeg subtitles filter with custom styling
+    return (
+        f"subtitles={srt_escaped}:"
+        f"force_style='FontSize={font_size},"
+        f"PrimaryColour=&H00FFFFFF,"  # White text (ABGR format)
+        f"OutlineColour=&H00000000,"  # Black outline
+        f"BorderStyle=3,"  # Opaque box behind text
+        f"Outline={border_width},"
+        f"Shadow=0,"
+        f"Alignment=2,"  # Bottom center
+        f"MarginV=80'"  # Margin from bottom
+    )
 
 
 def burn_captions_into_video(
@@ -33,44 +57,27 @@ def burn_captions_into_video(
         border_color: Caption border/stroke color
         border_width: Border thickness
     """
-    # Escape path for FFmpeg filter
-    srt_escaped = srt_path.replace('\\', '/').replace(':', '\\\\:')
-
-    # Build subtitles filter
-    # FFmpeg subtitles filter with custom styling
-    subtitles_filter = (
-        f"subtitles={srt_escaped}:"
-        f"force_style='FontSize={font_size},"
-        f"PrimaryColour=&H00FFFFFF,"  # White text (ABGR format)
-        f"OutlineColour=&H00000000,"  # Black outline
-        f"BorderStyle=3,"  # Opaque box behind text
-        f"Outline={border_width},"
-        f"Shadow=0,"
-        f"Alignment=2,"  # Bottom center
-        f"MarginV=80'"  # Margin from bottom
-    )
+    subtitles_filter = build_subtitles_filter(srt_path, font_size, border_width)
 
     cmd = [
         "ffmpeg",
         "-y",
         "-i", video_path,
         "-vf", subtitles_filter,
-        "-codec:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",
+        *get_profile("captions").args(),
         "-codec:a", "copy",
         output_path
     ]
 
     try:
-        subprocess.run(cmd, check=True)
+        run_command(cmd, check=True)
         print(f"✅ Captions burned into video: {output_path}")
         return output_path
     except subprocess.CalledProcessError as e:
         print(f"❌ Error burning captions: {e}")
         # Fallback: copy video without captions
         print("Falling back to video without captions...")
-        subprocess.run(["ffmpeg", "-y", "-i", video_path, "-codec", "copy", output_path], check=True)
+        run_command(["ffmpeg", "-y", "-i", video_path, "-codec", "copy", output_path], check=True)
         return output_path
 
 
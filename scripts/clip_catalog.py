@@ -0,0 +1,230 @@
+"""
+Clip Catalog - Persistent SQLite index of normalized gameplay clips.
+
+Every clip in assets/gameplay_normalized is probed once and its duration,
+fps, resolution, codec and keyframe timestamps are stored on disk, keyed by
+file name, size and mtime. Refreshing only re-probes files that changed, so
+scheduling a video is a handful of SQLite lookups instead of one ffprobe
+process per segment.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from scripts.utils.media_probe import probe
+
+
+CLIP_FOLDER = "assets/gameplay_normalized"
+CATALOG_FILENAME = ".clip_catalog.sqlite"
+VIDEO_EXTENSIONS = (".mp4",)
+
+
+# ------------------------------------------------------
+# DATA
+# ------------------------------------------------------
+
+@dataclass
+class ClipInfo:
+    path: str
+    duration: float
+    fps: float = 0.0
+    width: int = 0
+    height: int = 0
+    codec: str = ""
+    keyframes: List[float] = field(default_factory=list)
+
+
+# ------------------------------------------------------
+# PROBING
+# ------------------------------------------------------
+
+def probe_clip(path: str) -> ClipInfo:
+    """
+    Reads stream info and keyframe timestamps of a clip. MP4 headers are
+    parsed in process (moov/stss); other containers go through ffprobe.
+    """
+    info = probe(path, keyframes=True)
+    video = info.video
+    if video is None:
+        return ClipInfo(path=path, duration=0.0)
+
+    return ClipInfo(
+        path=path,
+        duration=video.duration or info.duration,
+        fps=video.fps,
+        width=video.width,
+        height=video.height,
+        codec=video.codec,
+        keyframes=sorted(round(t, 3) for t in video.keyframes),
+    )
+
+
+# ------------------------------------------------------
+# CATALOG
+# ------------------------------------------------------
+
+class ClipCatalog:
+    """
+    On-disk catalog of the clips in one folder.
+
+    Paths handed in and out are the same `os.path.join(folder, name)` strings
+    that list_clips_for_game has always returned.
+    """
+
+    def __init__(self, folder: str = CLIP_FOLDER, db_path: Optional[str] = None):
+        self.folder = folder
+        self.db_path = db_path or os.path.join(folder, CATALOG_FILENAME)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clips (
+                name      TEXT PRIMARY KEY,
+                size      INTEGER NOT NULL,
+                mtime     REAL NOT NULL,
+                duration  REAL NOT NULL,
+                fps       REAL NOT NULL,
+                width     INTEGER NOT NULL,
+                height    INTEGER NOT NULL,
+                codec     TEXT NOT NULL,
+                keyframes TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _name(self, path: str) -> str:
+        return os.path.relpath(path, self.folder).replace("\\", "/")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def refresh(self) -> int:
+        """
+        Syncs the catalog with the folder: probes new or modified clips and
+        drops rows for deleted or unreadable ones. Returns the number of
+        clips probed.
+        """
+        if not os.path.isdir(self.folder):
+            return 0
+
+        known = {
+            name: (size, mtime)
+            for name, size, mtime in self.conn.execute("SELECT name, size, mtime FROM clips")
+        }
+
+        on_disk = {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                st = entry.stat()
+                on_disk[entry.name] = (st.st_size, st.st_mtime)
+
+        changed = [name for name, sig in on_disk.items() if known.get(name) != sig]
+        removed = [name for name in known if name not in on_disk]
+
+        rows = []
+        for name in changed:
+            try:
+                info = probe_clip(self._path(name))
+            except (OSError, ValueError) as e:
+                # Unreadable (or deleted mid-scan): keep it out of the catalog
+                print(f"Skipping clip {name}: {e}")
+                if name in known:
+                    removed.append(name)
+                continue
+            size, mtime = on_disk[name]
+            rows.append((
+                name, size, mtime, info.duration, info.fps,
+                info.width, info.height, info.codec, json.dumps(info.keyframes),
+            ))
+
+        with self.conn:
+            if removed:
+                self.conn.executemany("DELETE FROM clips WHERE name = ?", [(n,) for n in removed])
+            if rows:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+
+        if changed or removed:
+            print(f"Clip catalog refreshed: {len(rows)} probed, {len(removed)} removed")
+        return len(rows)
+
+    def get(self, path: str) -> Optional[ClipInfo]:
+        row = self.conn.execute(
+            "SELECT name, duration, fps, width, height, codec, keyframes FROM clips WHERE name = ?",
+            (self._name(path),),
+        ).fetchone()
+        if row is None:
+            return None
+
+        name, duration, fps, width, height, codec, keyframes = row
+        return ClipInfo(
+            path=self._path(name),
+            duration=duration,
+            fps=fps,
+            width=width,
+            height=height,
+            codec=codec,
+            keyframes=json.loads(keyframes),
+        )
+
+    def durations(self, paths: List[str]) -> Dict[str, float]:
+        """Returns {path: duration} for every path that is in the catalog."""
+        by_name = {self._name(p): p for p in paths}
+        out = {}
+        names = list(by_name)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(names), 500):
+            batch = names[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            for name, duration in self.conn.execute(
+                f"SELECT name, duration FROM clips WHERE name IN ({marks})", batch
+            ):
+                out[by_name[name]] = duration
+        return out
+
+    def list_clips(self, prefix: str = "") -> List[str]:
+        """Returns sorted paths of catalogued clips whose name starts with prefix."""
+        prefix = prefix.lower()
+        names = [name for (name,) in self.conn.execute("SELECT name FROM clips")]
+        return sorted(self._path(n) for n in names if n.lower().startswith(prefix))
+
+    def close(self):
+        self.conn.close()
+
+
+_catalogs: Dict[str, ClipCatalog] = {}
+
+
+def get_catalog(folder: str = CLIP_FOLDER, refresh: bool = True) -> ClipCatalog:
+    """
+    Returns the process-wide catalog for a folder, refreshing it the first
+    time it is opened (or every call when refresh=True).
+    """
+    key = os.path.abspath(folder)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        catalog = _catalogs[key] = ClipCatalog(folder)
+        catalog.refresh()
+    elif refresh:
+        catalog.refresh()
+    return catalog
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else CLIP_FOLDER
+    catalog = ClipCatalog(folder)
+    probed = catalog.refresh()
+    total = len(catalog.list_clips())
+    print(f"Catalog: {catalog.db_path} ({total} clips, {probed} probed)")
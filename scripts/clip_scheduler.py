@@ -1,8 +1,9 @@
 import random
-import subprocess
-import json
 from dataclasses import dataclass
 
+from scripts.clip_catalog import get_catalog
+from scripts.utils.media_probe import probe
+
 
 # ------------------------------------------------------
 # CONFIG
@@ -21,27 +22,31 @@ class SchedulerConfig:
 # ------------------------------------------------------
 
 def get_clip_duration(path):
-    \"\"\"Reads duration of a video clip via ffprobe.\"\"\"
-    cmd = [
-        "ffprobe",
-        "-v", "quiet",
-        "-print_format", "json",
-        "-show_streams",
-        path,
-    ]
+    """
+    Duration of a clip's video stream, read from its headers. 0.0 for a
+    missing or unreadable clip, which the scheduler then skips.
+    """
+    try:
+        video = probe(path).video
+    except (OSError, ValueError):
+        return 0.0
+    return video.duration if video else 0.0
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    info = json.loads(result.stdout or "{}")
 
-    streams = info.get("streams", [])
-    for s in streams:
-        if s.get("codec_type") == "video":
-            try:
-                return float(s.get("duration", 0.0))
-            except:
-                return 0.0
+def lookup_clip_durations(clips, catalog=None):
+    """
+    Returns {clip: duration} for the given clips.
+    Durations come from the clip catalog; anything it doesn't know about
+    (clips outside the catalogued folder) is probed once, never per segment.
+    """
+    if catalog is None:
+        catalog = get_catalog(refresh=False)
 
-    return 0.0
+    durations = catalog.durations(clips)
+    for clip in set(clips) - durations.keys():
+        durations[clip] = get_clip_duration(clip)
+
+    return durations
 
 
 # ------------------------------------------------------
@@ -49,12 +54,12 @@ def get_clip_duration(path):
 # ------------------------------------------------------
 
 def pick_segment_start(clip_duration, seg_len):
-    \"\"\"
+    """
     Returns the selected start time based on rules:
       25% start of clip
       25% end of clip
       50% random position
-    \"\"\"
+    """
 
     if clip_duration <= seg_len:
         return 0.0
@@ -74,8 +79,8 @@ def pick_segment_start(clip_duration, seg_len):
         return random.uniform(0.0, clip_duration - seg_len)
 
 
-def build_clip_schedule(clips, target_length, config: SchedulerConfig):
-    \"\"\"
+def build_clip_schedule(clips, target_length, config: SchedulerConfig, catalog=None):
+    """
     Generates:
     [
       {
@@ -86,7 +91,7 @@ def build_clip_schedule(clips, target_length, config: SchedulerConfig):
         "timeline_start": float
       }
     ]
-    \"\"\"
+    """
 
     if config.shuffle_clips:
         random.shuffle(clips)
@@ -99,9 +104,13 @@ def build_clip_schedule(clips, target_length, config: SchedulerConfig):
     if not clips:
         raise RuntimeError("No gameplay clips available.")
 
+    durations = lookup_clip_durations(clips, catalog)
+    if not any(d > 0 for d in durations.values()):
+        raise RuntimeError("No readable gameplay clips available.")
+
     while total_time < target_length:
         clip = clips[clip_i % len(clips)]
-        duration = get_clip_duration(clip)
+        duration = durations[clip]
 
         # if video cannot be read, skip
         if duration <= 0:
@@ -125,3 +134,54 @@ def build_clip_schedule(clips, target_length, config: SchedulerConfig):
         clip_i += 1
 
     return schedule
+
+
+def build_segment_schedule(clips, target_length, config: SchedulerConfig, pool):
+    """
+    Same pacing rules as build_clip_schedule, but every segment is a run of
+    pre-cut, keyframe-aligned pool segments, so the background can be joined
+    with stream copy. Start points and lengths snap to the pool's grid.
+
+    Each entry carries the regular schedule keys plus:
+        "segments": [str]   # pool segment files, in playback order
+    """
+
+    if config.shuffle_clips:
+        random.shuffle(clips)
+
+    runs = {clip: pool.segments_for(clip) for clip in clips}
+    clips = [c for c in clips if runs[c]]
+
+    if not clips:
+        raise RuntimeError("No segmented gameplay clips available.")
+
+    grid = pool.seg_seconds
+    schedule = []
+    total_time = 0.0
+    clip_i = 0
+
+    while total_time < target_length:
+        clip = clips[clip_i % len(clips)]
+        available = runs[clip]
+
+        seg_count = max(1, random.randint(config.min_seg, config.max_seg) // grid)
+        seg_count = min(seg_count, len(available))
+
+        first = int(round(pick_segment_start(len(available), seg_count)))
+        first = min(first, len(available) - seg_count)
+        seg_len = seg_count * grid
+        seg_start = first * grid
+
+        schedule.append({
+            "clip": clip,
+            "in": float(seg_start),
+            "out": float(seg_start + seg_len),
+            "duration": seg_len,
+            "timeline_start": total_time,
+            "segments": available[first:first + seg_count],
+        })
+
+        total_time += seg_len
+        clip_i += 1
+
+    return schedule
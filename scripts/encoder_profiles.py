@@ -0,0 +1,295 @@
+"""
+Encoder Profiles - Named x264 settings shared by every ffmpeg encode.
+
+Each encode site asks for a role ("final", "draft", "captions", "normalize",
+"segments", "intermediate") and gets the profile configured for it under `encoder:` in
+config/settings.yaml, or the built-in default below. A role can also be set
+to "calibrated", which uses the profile picked by the calibration command:
+
+    python -m scripts.encoder_profiles calibrate --min-ssim 0.97
+
+Calibration encodes a sample of real gameplay (scaled/cropped to 1080x1920
+and stored losslessly as the reference) with every candidate profile,
+measures encode fps and SSIM/PSNR against the reference with ffmpeg's ssim
+and psnr filters, and keeps the fastest profile that meets the quality floor.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from scripts.utils.settings import get_setting
+
+
+CALIBRATION_PATH = "cache/encoder_calibration.json"
+DEFAULT_MIN_SSIM = 0.97
+
+
+# ------------------------------------------------------
+# PROFILES
+# ------------------------------------------------------
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    name: str
+    preset: str
+    crf: Optional[int] = None       # None keeps x264's default (23)
+    tune: Optional[str] = None
+    threads: int = 0                # 0 lets ffmpeg decide
+    gop: Optional[int] = None       # keyframe interval in frames
+    codec: str = "libx264"
+    pix_fmt: str = "yuv420p"
+
+    def params(self) -> Dict[str, object]:
+        """The settings that change the output bytes (threads does not)."""
+        out = {"c:v": self.codec, "preset": self.preset, "pix_fmt": self.pix_fmt}
+        if self.crf is not None:
+            out["crf"] = self.crf
+        if self.tune:
+            out["tune"] = self.tune
+        if self.gop:
+            out["g"] = self.gop
+        return out
+
+    def args(self, threads: Optional[int] = None) -> List[str]:
+        """ffmpeg output arguments. threads overrides the profile's value."""
+        cmd = ["-c:v", self.codec, "-preset", self.preset]
+        if self.crf is not None:
+            cmd += ["-crf", str(self.crf)]
+        if self.tune:
+            cmd += ["-tune", self.tune]
+        if self.gop:
+            cmd += ["-g", str(self.gop)]
+        cmd += ["-pix_fmt", self.pix_fmt]
+
+        threads = self.threads if threads is None else threads
+        if threads:
+            cmd += ["-threads", str(threads)]
+        return cmd
+
+
+PROFILES: Dict[str, EncoderProfile] = {
+    p.name: p
+    for p in (
+        EncoderProfile("quality", "medium", crf=18),
+        EncoderProfile("balanced", "fast", crf=20),
+        EncoderProfile("fast", "veryfast", crf=20),
+        EncoderProfile("faster", "superfast", crf=21),
+        EncoderProfile("captions", "fast", crf=23),
+        EncoderProfile("normalize", "veryfast"),
+        EncoderProfile("draft", "ultrafast", crf=30),
+        EncoderProfile("lossless", "ultrafast", crf=0),
+    )
+}
+
+# Profile used by each encode site unless settings.yaml says otherwise
+DEFAULT_ROLES = {
+    "final": "quality",        # background render and final compose
+    "draft": "draft",          # QA proxies
+    "captions": "captions",    # legacy burn_captions_into_video
+    "normalize": "normalize",  # normalize_gameplay
+    "segments": "normalize",   # segment_pool cuts
+    "intermediate": "lossless",  # prerendered backgrounds for long videos
+}
+
+
+def load_calibration(path: str = CALIBRATION_PATH) -> Optional[EncoderProfile]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        chosen = json.load(f).get("chosen")
+    return EncoderProfile(**chosen) if chosen else None
+
+
+def get_profile(role: str) -> EncoderProfile:
+    """The profile for an encode site, honoring settings and calibration."""
+    name = str(get_setting(f"encoder.{role}", DEFAULT_ROLES.get(role, "quality")))
+
+    if name == "calibrated":
+        profile = load_calibration()
+        if profile is not None:
+            return profile
+        print(f"No encoder calibration found; '{role}' uses its default profile")
+        name = DEFAULT_ROLES.get(role, "quality")
+
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoder profile '{name}' for '{role}'")
+    return PROFILES[name]
+
+
+# ------------------------------------------------------
+# CALIBRATION
+# ------------------------------------------------------
+
+# Presets x CRFs tried by calibrate; the fastest passing one wins
+CANDIDATE_PRESETS = ["medium", "fast", "faster", "veryfast", "superfast", "ultrafast"]
+CANDIDATE_CRFS = [18, 20, 23]
+
+
+def candidate_profiles() -> List[EncoderProfile]:
+    return [
+        EncoderProfile(f"{preset}-crf{crf}", preset, crf=crf)
+        for preset in CANDIDATE_PRESETS
+        for crf in CANDIDATE_CRFS
+    ]
+
+
+def make_reference(clips: List[str], out_path: str, seconds: float = 4.0, count: int = 5, seed: int = 7) -> str:
+    """
+    Cuts `count` windows from random clips, scales/crops them to the final
+    frame and stores them losslessly as one reference file.
+    """
+    from scripts.ffmpeg_builder import get_ffmpeg_path, scale_filter
+    from scripts.clip_catalog import get_catalog
+    from scripts.utils.tracing import run_command
+
+    rng = random.Random(seed)
+    picks = [rng.choice(clips) for _ in range(count)]
+    durations = get_catalog().durations(picks)
+
+    input_args = []
+    chains = []
+    for i, clip in enumerate(picks):
+        length = durations.get(clip, seconds)
+        start = rng.uniform(0, max(0.0, length - seconds))
+        input_args += ["-ss", f"{start:.3f}", "-t", str(seconds), "-i", clip]
+        chains.append(f"[{i}:v]{scale_filter()},fps=30[v{i}]")
+
+    graph = ";".join(chains) + ";" + "".join(f"[v{i}]" for i in range(count)) + f"concat=n={count}:v=1[out]"
+    cmd = [
+        get_ffmpeg_path(), "-y", *input_args,
+        "-filter_complex", graph,
+        "-map", "[out]",
+        "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-pix_fmt", "yuv420p",
+        out_path,
+    ]
+    run_command(cmd, check=True, capture_output=True)
+    return out_path
+
+
+def encode_fps(profile: EncoderProfile, reference: str, out_path: str) -> float:
+    """Encodes the reference with a profile and returns frames per second."""
+    from scripts.ffmpeg_builder import get_ffmpeg_path
+    from scripts.utils.tracing import run_command
+
+    cmd = [get_ffmpeg_path(), "-y", "-i", reference, "-an", *profile.args(), out_path]
+    started = time.perf_counter()
+    result = run_command(cmd, check=True, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+
+    frames = re.findall(r"frame=\s*(\d+)", result.stderr or "")
+    return int(frames[-1]) / seconds if frames and seconds > 0 else 0.0
+
+
+def measure_quality(encoded: str, reference: str) -> Dict[str, float]:
+    """Average SSIM (All) and PSNR of encoded against reference."""
+    from scripts.ffmpeg_builder import get_ffmpeg_path
+    from scripts.utils.tracing import run_command
+
+    cmd = [
+        get_ffmpeg_path(), "-hide_banner",
+        "-i", encoded,
+        "-i", reference,
+        "-lavfi", "[0:v]split[a][b];[1:v]split[c][d];[a][c]ssim;[b][d]psnr",
+        "-f", "null", "-",
+    ]
+    result = run_command(cmd, check=True, capture_output=True, text=True)
+    ssim = re.findall(r"All:([\d.]+)", result.stderr or "")
+    psnr = re.findall(r"average:([\d.]+|inf)", result.stderr or "")
+    return {
+        "ssim": float(ssim[-1]) if ssim else 0.0,
+        "psnr": float(psnr[-1]) if psnr else 0.0,
+    }
+
+
+def calibrate(
+    clips: List[str],
+    min_ssim: float = DEFAULT_MIN_SSIM,
+    min_psnr: float = 0.0,
+    candidates: Optional[List[EncoderProfile]] = None,
+    out_path: str = CALIBRATION_PATH,
+) -> Dict:
+    """
+    Benchmarks every candidate on a gameplay sample and writes the results
+    plus the chosen profile (fastest that meets the floors) to out_path.
+    """
+    if not clips:
+        raise RuntimeError("No gameplay clips to calibrate on.")
+
+    candidates = candidates or candidate_profiles()
+    work = tempfile.mkdtemp(prefix="encoder_calibration_")
+    results = []
+    try:
+        reference = make_reference(clips, os.path.join(work, "reference.mkv"))
+        print(f"Reference sample: {reference}")
+
+        for profile in candidates:
+            encoded = os.path.join(work, f"{profile.name}.mp4")
+            fps = encode_fps(profile, reference, encoded)
+            quality = measure_quality(encoded, reference)
+            size = os.path.getsize(encoded)
+            os.remove(encoded)
+
+            passed = quality["ssim"] >= min_ssim and quality["psnr"] >= min_psnr
+            results.append({"profile": asdict(profile), "fps": round(fps, 2), "bytes": size, "passed": passed, **quality})
+            print(
+                f"  {profile.name:<18} {fps:7.1f} fps  SSIM {quality['ssim']:.4f}  "
+                f"PSNR {quality['psnr']:5.2f} dB  {size / 1e6:6.2f} MB  {'ok' if passed else 'below floor'}"
+            )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    passing = [r for r in results if r["passed"]]
+    chosen = max(passing, key=lambda r: r["fps"])["profile"] if passing else None
+    report = {
+        "created": time.time(),
+        "min_ssim": min_ssim,
+        "min_psnr": min_psnr,
+        "chosen": chosen,
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if chosen:
+        print(f"Chosen profile: {chosen['name']} -> {out_path}")
+        print("Set a role to 'calibrated' under encoder: in config/settings.yaml to use it.")
+    else:
+        print(f"No candidate met SSIM >= {min_ssim}; nothing chosen")
+    return report
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scripts.encoder_profiles")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("list", help="show profiles and the profile used by each role")
+    cal = sub.add_parser("calibrate", help="pick the fastest profile that meets a quality floor")
+    cal.add_argument("--min-ssim", type=float, default=DEFAULT_MIN_SSIM)
+    cal.add_argument("--min-psnr", type=float, default=0.0)
+    cal.add_argument("--game", default="", help="only sample clips whose name starts with this game_id")
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        from scripts.clip_catalog import get_catalog
+        clips = get_catalog().list_clips(prefix=args.game)
+        report = calibrate(clips, min_ssim=args.min_ssim, min_psnr=args.min_psnr)
+        sys.exit(0 if report["chosen"] else 1)
+
+    for name, profile in PROFILES.items():
+        print(f"  {name:<10} {' '.join(profile.args())}")
+    for role in DEFAULT_ROLES:
+        print(f"  {role:<10} -> {get_profile(role).name}")
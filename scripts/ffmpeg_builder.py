@@ -1,19 +1,96 @@
 import os
-import subprocess
-import random
+import math
+import shutil
+import contextvars
+from dataclasses import dataclass
+from typing import Optional
+
+from scripts.encoder_profiles import get_profile
+from scripts.utils.env import load_env
+from scripts.utils.settings import get_setting
+from scripts.utils.tracing import run_command
+
+
+# ------------------------------------------------------
+# RENDER MODES
+# ------------------------------------------------------
+
+@dataclass(frozen=True)
+class RenderMode:
+    """
+    Output size and audio settings for one kind of render. The video
+    encoder settings are the encoder profile of the same name.
+    """
+    name: str
+    width: int
+    height: int
+    fps: Optional[int]        # None keeps the source frame rate
+    audio_bitrate: str
+    audio_channels: int = 2
+
+
+# Publishable output
+FINAL = RenderMode("final", 1080, 1920, None, "192k")
+
+# Quick QA proxy: same schedule and soundtrack, a quarter of the pixels,
+# fewer frames and the cheapest encoder settings
+DRAFT = RenderMode("draft", 540, 960, 15, "64k", audio_channels=1)
+
+RENDER_MODES = {m.name: m for m in (FINAL, DRAFT)}
+
+# Segment inputs (one decoder each) a single ffmpeg process may open;
+# `render.max_open_inputs` in config/settings.yaml overrides it. A Short
+# (up to ~210 s of narration at 5-11 s per segment) stays under it and
+# composes in one pass; longer schedules are rendered in groups and
+# stitched with stream copy.
+MAX_OPEN_INPUTS = 48
+
+# Shared by grouped pieces so the concat demuxer can join them
+TRACK_TIMESCALE = 15360
+
+
+def max_open_inputs() -> int:
+    return max(1, int(get_setting("render.max_open_inputs", MAX_OPEN_INPUTS)))
+
+
+def scale_filter(mode: RenderMode = FINAL) -> str:
+    """Scale/crop (and fps, if the mode sets one) to the mode's frame."""
+    chain = (
+        f"scale={mode.width}:-1:force_original_aspect_ratio=increase,"
+        f"crop={mode.width}:{mode.height},"
+        f"setsar=1"
+    )
+    if mode.fps:
+        chain += f",fps={mode.fps}"
+    return chain
+
+
+def video_encode_args(mode: RenderMode = FINAL):
+    return get_profile(mode.name).args()
+
+
+def audio_encode_args(mode: RenderMode = FINAL):
+    return [
+        "-c:a", "aac",
+        "-b:a", mode.audio_bitrate,
+        "-ac", str(mode.audio_channels),
+    ]
 
 
 def get_ffmpeg_path():
+    load_env()
     ffmpeg = os.getenv("FFMPEG_PATH", "")
     return ffmpeg.strip() or "ffmpeg"
 
 
-def render_background(schedule, output_path):
-    if not schedule:
-        raise RuntimeError("Schedule empty.")
-
-    ffmpeg = get_ffmpeg_path()
+def build_segment_graph(schedule, out_label="outv", mode: RenderMode = FINAL):
+    """
+    Builds the per-segment inputs and the scale/crop/concat filter chain.
+    Segment inputs are numbered from 0, so extra inputs (narration, music)
+    must be appended after these.
 
+    Returns (input_args, filter_string).
+    """
     input_args = []
     filter_parts = []
     concat_nodes = []
@@ -26,32 +103,211 @@ def render_background(schedule, output_path):
             "-i", seg["clip"],
         ]
 
-        filter_parts.append(
-            f"[{idx}:v]"
-            f"scale=1080:-1:force_original_aspect_ratio=increase,"
-            f"crop=1080:1920,"
-            f"setsar=1[v{idx}]"
-        )
+        filter_parts.append(f"[{idx}:v]{scale_filter(mode)}[v{idx}]")
 
         concat_nodes.append(f"[v{idx}]")
 
     filter_complex = ";".join(filter_parts)
-    concat_filter = f"{''.join(concat_nodes)}concat=n={len(schedule)}:v=1[outv]"
-    full_filter = f"{filter_complex};{concat_filter}"
+    concat_filter = f"{''.join(concat_nodes)}concat=n={len(schedule)}:v=1[{out_label}]"
+    return input_args, f"{filter_complex};{concat_filter}"
+
+
+def split_schedule(schedule, pieces: int = 1, max_inputs: Optional[int] = None):
+    """
+    Splits a schedule at segment boundaries into contiguous runs of roughly
+    equal duration: at least `pieces` runs (fewer if there are fewer
+    segments), and more if needed so no run has over max_inputs segments.
+    """
+    max_inputs = max_inputs or max_open_inputs()
+    n = max(pieces, math.ceil(len(schedule) / max_inputs))
+    n = max(1, min(n, len(schedule)))
+    total = sum(seg["duration"] for seg in schedule)
+
+    runs, current, elapsed = [], [], 0.0
+    for i, seg in enumerate(schedule):
+        current.append(seg)
+        elapsed += seg["duration"]
+        boundary = total * (len(runs) + 1) / n
+        # Segments left must still fill the runs left, even if one long
+        # segment overshoots several duration boundaries
+        starved = len(schedule) - i - 1 <= n - len(runs) - 1
+        # The decoder cap always closes a run; duration only until n runs exist
+        if len(current) >= max_inputs or (len(runs) < n - 1 and (elapsed >= boundary - 1e-6 or starved)):
+            runs.append(current)
+            current = []
+    if current:
+        runs.append(current)
+    return runs
+
+
+def default_chunk_threads(workers: int) -> int:
+    # Split the cores between the chunk encoders instead of letting every
+    # x264 instance spawn a thread per core
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _render_segments(schedule, output_path, mode: RenderMode, encode_args, extra_args=(), start=0.0, srt_path=None):
+    if srt_path:
+        from scripts.captions.captions_engine import build_subtitles_filter
+
+        input_args, graph = build_segment_graph(schedule, out_label="bg", mode=mode)
+        # Shift to the piece's place on the full timeline for the captions,
+        # then back so every piece starts at 0
+        graph += (
+            f";[bg]setpts=PTS+{start:.6f}/TB,{build_subtitles_filter(srt_path)},"
+            f"setpts=PTS-STARTPTS[outv]"
+        )
+    else:
+        input_args, graph = build_segment_graph(schedule, mode=mode)
 
     cmd = [
-        ffmpeg,
+        get_ffmpeg_path(),
         "-y",
         *input_args,
-        "-filter_complex", full_filter,
+        "-filter_complex", graph,
         "-map", "[outv]",
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "18",
-        "-pix_fmt", "yuv420p",
+        *encode_args,
+        *extra_args,
         output_path,
     ]
 
     print("FFmpeg command:", " ".join(cmd))
-    subprocess.run(cmd, check=True)
-    print("Background rendered:", output_path)
+    run_command(cmd, check=True)
+
+
+def render_background(
+    schedule,
+    output_path,
+    mode: RenderMode = FINAL,
+    max_inputs: Optional[int] = None,
+    encode_args=None,
+    workers: int = 1,
+    srt_path: Optional[str] = None,
+):
+    """
+    Renders the scheduled segments to one video.
+
+    At most max_inputs segments (one decoder each, default
+    max_open_inputs()) are open per ffmpeg
+    process: longer schedules are split into pieces, each encoded with the
+    same settings and a shared timescale, and the pieces are joined with
+    concat_copy. Peak memory therefore stays flat however long the video
+    is, and the stream copy adds no generation loss.
+
+    workers > 1 splits the timeline into at least that many pieces of
+    similar duration and encodes them concurrently, each as its own ffmpeg
+    process with closed GOPs and cores / workers x264 threads.
+
+    encode_args: ffmpeg video output args (default: the mode's profile)
+    srt_path: captions to burn in, timed against the full timeline
+    """
+    if not schedule:
+        raise RuntimeError("Schedule empty.")
+
+    encode_args = list(encode_args or video_encode_args(mode))
+    pieces = split_schedule(schedule, workers, max_inputs)
+
+    if len(pieces) == 1:
+        _render_segments(schedule, output_path, mode, encode_args, srt_path=srt_path)
+        print("Background rendered:", output_path)
+        return output_path
+
+    extra_args = ["-video_track_timescale", str(TRACK_TIMESCALE)]
+    if workers > 1:
+        extra_args += ["-flags", "+cgop", "-threads", str(default_chunk_threads(workers))]
+
+    starts = []
+    elapsed = 0.0
+    for piece in pieces:
+        starts.append(elapsed)
+        elapsed += sum(seg["duration"] for seg in piece)
+
+    parts_dir = output_path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    parts = [os.path.join(parts_dir, f"{n:04d}.mp4") for n in range(len(pieces))]
+    try:
+        jobs = [
+            (piece, part, mode, encode_args, extra_args, start, srt_path)
+            for piece, part, start in zip(pieces, parts, starts)
+        ]
+        if workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Each task runs in a copy of this context so its ffmpeg
+            # command is recorded in the active run trace
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, _render_segments, *job)
+                    for job in jobs
+                ]
+                for fut in futures:
+                    fut.result()
+        else:
+            for job in jobs:
+                _render_segments(*job)
+        concat_copy(parts, output_path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    print(f"Background rendered in {len(pieces)} pieces ({workers} parallel):", output_path)
+    return output_path
+
+
+def prerender_background(schedule, output_path, mode: RenderMode = FINAL, max_inputs: Optional[int] = None):
+    """
+    Lossless (x264 CRF 0) background at the mode's size, for compositing a
+    schedule too long to decode in one process. Large on disk; delete it
+    after use.
+    """
+    return render_background(
+        schedule,
+        output_path,
+        mode=mode,
+        max_inputs=max_inputs,
+        encode_args=get_profile("intermediate").args(),
+    )
+
+
+def write_concat_list(paths, list_path):
+    """Writes an FFmpeg concat-demuxer list file for the given media paths."""
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in paths:
+            escaped = os.path.abspath(p).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def concat_copy(paths, output_path):
+    """Joins video files with identical codec parameters without re-encoding (video only)."""
+    list_path = output_path + ".concat.txt"
+    write_concat_list(paths, list_path)
+
+    cmd = [
+        get_ffmpeg_path(),
+        "-y",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", list_path,
+        "-c", "copy",
+        "-an",
+        output_path,
+    ]
+
+    try:
+        run_command(cmd, check=True)
+    finally:
+        os.remove(list_path)
+
+
+def render_background_copy(schedule, output_path):
+    """
+    Builds the background from a segment-pool schedule (see
+    clip_scheduler.build_segment_schedule) with the concat demuxer and
+    stream copy. No decoding or encoding happens.
+    """
+    if not schedule:
+        raise RuntimeError("Schedule empty.")
+
+    paths = [p for seg in schedule for p in seg["segments"]]
+    concat_copy(paths, output_path)
+    print("Background assembled (stream copy):", output_path)
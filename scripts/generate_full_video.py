@@ -1,26 +1,28 @@
 import os
-import sys
+import argparse
 import random
-import subprocess
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-
-from openai import OpenAI
 
 from scripts.story_generator import generate_story
-from scripts.clip_scheduler import build_clip_schedule, SchedulerConfig
-from scripts.ffmpeg_builder import render_background
-
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-
-
-# ------------------------------------------------------
-# ENV / OPENAI
-# ------------------------------------------------------
-
-load_dotenv()
-client = OpenAI()
+from scripts.clip_scheduler import build_clip_schedule, build_segment_schedule, SchedulerConfig
+from scripts.clip_catalog import get_catalog, CLIP_FOLDER
+from scripts.ffmpeg_builder import render_background, render_background_copy, video_encode_args, FINAL, DRAFT
+from scripts.segment_pool import SegmentPool
+from scripts.pipeline.video_assembler import compose_final_video
+from scripts.captions.srt_builder import generate_srt_file
+from scripts.audio.music_engine import analyze_story_tone
+from scripts.audio.music_index import get_music_index
+from scripts.audio.sfx_engine import strip_markers
+from scripts.utils.sheets_cache import get_table
+from scripts.audio.tts_engine import synthesize_speech
+from scripts.story_features import extract_story_features
+from scripts.run_manifest import RunManifest, digest, file_sha256
+from scripts.utils.env import load_env
+from scripts.utils.settings import get_setting
+from scripts.utils.media_probe import get_duration
+from scripts.utils.tracing import run_command, stage, trace_run
 
 
 # ------------------------------------------------------
@@ -28,20 +30,7 @@ client = OpenAI()
 # ------------------------------------------------------
 
 def load_game_library():
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets.readonly",
-        "https://www.googleapis.com/auth/drive.readonly",
-    ]
-
-    creds = ServiceAccountCredentials.from_json_keyfile_name(
-        "config/service_account.json", scope
-    )
-
-    gs = gspread.authorize(creds)
-    sh = gs.open("story-generator")
-    ws = sh.worksheet("game_library")
-
-    rows = ws.get_all_records()
+    rows = get_table("game_library")
 
     game_map = {}
     for r in rows:
@@ -68,34 +57,12 @@ def choose_game(game_map):
 
 
 # ------------------------------------------------------
-# AUDIO LENGTH (FFPROBE)
+# AUDIO LENGTH
 # ------------------------------------------------------
 
-def get_ffprobe_path():
-    ffmpeg = os.getenv("FFMPEG_PATH", "").strip().replace("/", "\\")
-    ffmpeg = ffmpeg.strip('"').strip("'")
-
-    if ffmpeg.lower().endswith("ffmpeg.exe"):
-        return ffmpeg[:-len("ffmpeg.exe")] + "ffprobe.exe"
-
-    return "C:\\ffmpeg\\bin\\ffprobe.exe"
-
-
 def get_audio_duration(path):
-    ffprobe = get_ffprobe_path()
-    cmd = [
-        ffprobe,
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        path,
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    try:
-        return float(result.stdout.strip())
-    except:
-        return 0.0
+    # Read from the MP3/WAV headers; ffprobe only for other formats
+    return get_duration(path)
 
 
 # ------------------------------------------------------
@@ -103,14 +70,11 @@ def get_audio_duration(path):
 # ------------------------------------------------------
 
 def list_clips_for_game(game_id):
-    folder = "assets/gameplay_normalized"
+    folder = CLIP_FOLDER
     if not os.path.isdir(folder):
         return []
-    return sorted([
-        os.path.join(folder, f)
-        for f in os.listdir(folder)
-        if f.lower().startswith(game_id.lower()) and f.lower().endswith(".mp4")
-    ])
+    # Refreshes only clips whose size/mtime changed since the last run
+    return get_catalog(folder).list_clips(prefix=game_id)
 
 
 # ------------------------------------------------------
@@ -123,32 +87,11 @@ def choose_voice_for_story(story_text: str, channel_id: str | None = None) -> st
     This is intentionally simple and biased toward natural, clear voices.
     """
 
-    s = story_text.lower()
-
-    # Very rough gender inference based on relational cues
-    male_cues = ["as a guy", "i'm a guy", "my girlfriend", "my wife", "as a husband", "my son"]
-    female_cues = ["as a girl", "i'm a girl", "my boyfriend", "my husband", "as a wife", "my daughter"]
-
-    if any(c in s for c in male_cues):
-        inferred_gender = "male"
-    elif any(c in s for c in female_cues):
-        inferred_gender = "female"
-    else:
-        inferred_gender = "neutral"
-
-    # Tone inference based on emotion keywords
-    dark_cues = ["terrified", "panicked", "breaking down", "trauma", "stalking", "creepy", "dark", "anxiety"]
-    fun_cues = ["funniest", "laughing", "joked", "ridiculous", "couldn't stop laughing", "hilarious"]
-    warm_cues = ["heartwarming", "kind", "gentle", "sweet", "wholesome", "grateful", "comforting"]
-
-    if any(k in s for k in dark_cues):
-        tone = "dark"
-    elif any(k in s for k in fun_cues):
-        tone = "fun"
-    elif any(k in s for k in warm_cues):
-        tone = "warm"
-    else:
-        tone = "neutral"
+    # Gender and tone come from the shared one-pass classifier, so the
+    # voice always agrees with the music tone for the same story
+    features = extract_story_features(story_text)
+    inferred_gender = features.gender
+    tone = features.tone
 
     # Map (gender, tone) to OpenAI built-in voices
     # Voices: alloy, ash, ballad, coral, echo, fable, nova, onyx, sage, shimmer
@@ -186,37 +129,32 @@ def build_tts_instructions(story_text: str, channel_id: str | None = None) -> st
     Build a short TTS style instruction string based on tone.
     This is optional flavor; keep it simple so it doesn't over-control.
     """
-    s = story_text.lower()
+    return extract_story_features(story_text).instructions
+
+
+# Choose highest-quality model available for offline rendering.
+# If tts-1-hd is not enabled on your account, fall back to gpt-4o-mini-tts.
+TTS_MODEL = "tts-1-hd"  # change to "gpt-4o-mini-tts" if you get model errors
 
-    if any(k in s for k in ["camping", "stalking", "creepy", "we need to leave", "gut feeling"]):
-        return "Tell this like a suspenseful but grounded story, with calm intensity."
-    if any(k in s for k in ["mother-in-law", "karen", "wedding", "family drama"]):
-        return "Tell this with calm, slightly sarcastic humor."
-    if any(k in s for k in ["kid", "my son", "my daughter", "toddler", "classroom"]):
-        return "Tell this with light, playful energy."
-    if any(k in s for k in ["terminal", "cancer", "last time", "funeral"]):
-        return "Tell this slowly and gently, with empathy."
-    # Default
-    return "Tell this like a natural Reddit story narration, casual and conversational."
+# You can tweak speed; 1.7 is quite fast, good for Shorts
+TTS_SPEED = 1.7
 
 
-def tts_generate_mp3(text: str, mp3_path: str, channel_id: str | None = None):
+def tts_generate_mp3(text: str, mp3_path: str, channel_id: str | None = None, chunked: bool = True):
     voice = choose_voice_for_story(text, channel_id=channel_id)
     instructions = build_tts_instructions(text, channel_id=channel_id)
 
-    # Choose highest-quality model available for offline rendering.
-    # If tts-1-hd is not enabled on your account, fall back to gpt-4o-mini-tts.
-    TTS_MODEL = "tts-1-hd"  # change to "gpt-4o-mini-tts" if you get model errors
-
-    with client.audio.speech.with_streaming_response.create(
-        model=TTS_MODEL,
+    # Cached by (text, voice, instructions, model, speed); long stories are
+    # synthesized as concurrent sentence-aligned chunks
+    synthesize_speech(
+        text,
+        mp3_path,
         voice=voice,
-        input=text,
-        # You can tweak speed; 1.7 is quite fast, good for Shorts
-        speed=1.7,
         instructions=instructions,
-    ) as response:
-        response.stream_to_file(mp3_path)
+        model=TTS_MODEL,
+        speed=TTS_SPEED,
+        chunked=chunked,
+    )
 
     print(f"TTS model       = {TTS_MODEL}")
     print(f"TTS voice       = {voice}")
@@ -238,7 +176,7 @@ def mux_audio_video(bg_path, audio_path, final_path):
         "-shortest",
         final_path,
     ]
-    subprocess.run(cmd, check=True)
+    run_command(cmd, check=True)
     print("Merged:", final_path)
 
 
@@ -246,63 +184,461 @@ def mux_audio_video(bg_path, audio_path, final_path):
 # MAIN PIPELINE
 # ------------------------------------------------------
 
-def generate_full_video(channel_id):
-
-    os.makedirs("output", exist_ok=True)
+def new_run_prefix(channel_id):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{channel_id}_{timestamp}"
 
-    print("=== STEP 1: STORY ===")
-    result = generate_story(channel_id)
-    hook = result["hook"]
-    story = result["story"]
-    print("HOOK:", hook)
-
-    print("=== STEP 2: TTS ===")
-    audio_path = f"output/{channel_id}_{timestamp}_AUDIO.mp3"
-    tts_generate_mp3(story, audio_path, channel_id=channel_id)
-
-    print("=== STEP 3: AUDIO LENGTH ===")
-    duration = get_audio_duration(audio_path)
-    print("Length:", duration)
-
-    print("=== STEP 4: GAME ===")
-    game_map = load_game_library()
-    game_id = choose_game(game_map)
-    clips = list_clips_for_game(game_id)
-    print(f"Selected game: {game_id}, clips = {len(clips)}")
-
-    if not clips:
-        raise RuntimeError("No clips found for game.")
-
-    print("=== STEP 5: SCHEDULE ===")
-    config = SchedulerConfig(
-        min_seg=5,
-        max_seg=7,
-        shuffle_clips=True,
-        rollover_strategy="advance",
+
+def story_stage(channel_id, run_prefix=None):
+    """
+    Network-bound: LLM story + hook.
+
+    The story is checked against every story accepted before (MinHash/LSH,
+    see story_dedup); near-duplicates are regenerated or the run is skipped,
+    according to the dedup section of config/settings.yaml.
+    """
+    manifest = RunManifest.load_or_create(run_prefix, channel_id) if run_prefix else None
+    done = manifest.reuse("story") if manifest else None
+    if done:
+        return done["values"]
+
+    enabled = bool(get_setting("dedup.enabled", True))
+    threshold = float(get_setting("dedup.threshold", 0.8))
+    regenerate = get_setting("dedup.on_duplicate", "regenerate") == "regenerate"
+    attempts = max(1, int(get_setting("dedup.max_attempts", 3))) if regenerate else 1
+
+    with stage("story", channel_id=channel_id) as st:
+        for attempt in range(1, attempts + 1):
+            result = generate_story(channel_id)
+            if not enabled:
+                break
+
+            from scripts.story_dedup import get_story_index, story_text, DuplicateStoryError
+
+            duplicate = get_story_index().check_and_add(
+                story_text(result["story"], result["hook"]),
+                run_prefix or new_run_prefix(channel_id),
+                channel_id,
+                threshold=threshold,
+            )
+            if duplicate is None:
+                break
+
+            print(f"Story too similar to {duplicate[0]} ({duplicate[1]:.2f}), attempt {attempt}/{attempts}")
+            st.set(duplicates=attempt)
+            if attempt == attempts:
+                raise DuplicateStoryError(
+                    f"Skipping {channel_id}: story duplicates {duplicate[0]} ({duplicate[1]:.2f})"
+                )
+
+        print("HOOK:", result["hook"])
+        st.set(words=len(result["story"].split()))
+
+    if manifest:
+        manifest.complete("story", values={"story": result["story"], "hook": result["hook"]})
+    return result
+
+
+def narration_stage(story, run_prefix, channel_id=None):
+    """Network-bound: TTS narration. Returns (audio_path, duration)."""
+    manifest = RunManifest.load_or_create(run_prefix, channel_id)
+    inputs = {"story": digest(story)}
+    done = manifest.reuse("tts", inputs)
+    if done:
+        return done["outputs"]["audio"], done["values"]["duration"]
+
+    audio_path = f"output/{run_prefix}_AUDIO.mp3"
+    with stage("tts") as st:
+        # [TAG] SFX markers are timed later, never spoken
+        tts_generate_mp3(strip_markers(story), audio_path, channel_id=channel_id)
+        st.output(audio_path)
+
+    with stage("audio_length") as st:
+        duration = get_audio_duration(audio_path)
+        print("Length:", duration)
+        st.set(duration=duration)
+
+    manifest.complete("tts", inputs, outputs={"audio": audio_path}, values={"duration": duration})
+    return audio_path, duration
+
+
+def schedule_stage(channel_id, duration, run_prefix, use_segment_pool=False, manifest=None):
+    """
+    Game selection and a clip schedule covering `duration` seconds.
+    Returns (schedule, background_path); the background is only set for
+    segment-pool schedules, which are assembled here by stream copy.
+    """
+    manifest = manifest or RunManifest.load_or_create(run_prefix, channel_id)
+    inputs = {"duration": duration, "segment_pool": use_segment_pool}
+    done = manifest.reuse("schedule", inputs)
+    if done:
+        return done["values"]["schedule"], done["outputs"].get("background")
+
+    with stage("game") as st:
+        game_map = load_game_library()
+        game_id = choose_game(game_map)
+        clips = list_clips_for_game(game_id)
+        print(f"Selected game: {game_id}, clips = {len(clips)}")
+        st.set(game_id=game_id, clips=len(clips))
+
+        if not clips:
+            raise RuntimeError("No clips found for game.")
+
+    with stage("schedule") as st:
+        config = SchedulerConfig(
+            min_seg=5,
+            max_seg=7,
+            shuffle_clips=True,
+            rollover_strategy="advance",
+        )
+        background_path = None
+        pool = SegmentPool() if use_segment_pool else None
+        if pool is not None and pool.has_clips(clips):
+            schedule = build_segment_schedule(clips, duration, config, pool)
+            print("Segments:", len(schedule), "(segment pool)")
+
+            background_path = f"output/{run_prefix}_BG.mp4"
+            render_background_copy(schedule, background_path)
+            st.output(background_path)
+        else:
+            schedule = build_clip_schedule(clips, duration, config=config)
+            print("Segments:", len(schedule))
+        st.set(segments=len(schedule))
+
+    manifest.complete(
+        "schedule",
+        inputs,
+        outputs={"background": background_path},
+        values={"game_id": game_id, "schedule": schedule},
     )
-    schedule = build_clip_schedule(clips, duration, config=config)
-    print("Segments:", len(schedule))
+    return schedule, background_path
 
-    print("=== STEP 6: RENDER BG ===")
-    bg_path = f"output/{channel_id}_{timestamp}_BG.mp4"
-    render_background(schedule, bg_path)
 
-    print("=== STEP 7: MERGE ===")
-    final_path = f"output/{channel_id}_{timestamp}_FINAL.mp4"
-    mux_audio_video(bg_path, audio_path, final_path)
+def background_inputs(manifest, mode=FINAL):
+    """Checkpoint inputs of the background_<mode> stage."""
+    return {"schedule": manifest.fingerprint("schedule"), "encode": video_encode_args(mode)}
+
+
+def background_stage(channel_id, schedule, run_prefix, mode=FINAL, chunks=1):
+    """
+    Background for the checkpointed schedule, encoded with the mode's own
+    profile (in `chunks` parallel pieces), so the compose step only
+    overlays captions and encodes.
+    """
+    manifest = RunManifest.load_or_create(run_prefix, channel_id)
+    name = f"background_{mode.name}"
+    inputs = background_inputs(manifest, mode)
+    done = manifest.reuse(name, inputs)
+    if done:
+        return done["outputs"]["background"]
+
+    with stage(name) as st:
+        background_path = f"output/{run_prefix}_BG_{mode.name.upper()}.mp4"
+        render_background(schedule, background_path, mode=mode, workers=chunks)
+        st.output(background_path)
+
+    manifest.complete(name, inputs, outputs={"background": background_path})
+    return background_path
+
+
+# Narration pace at TTS_SPEED: ~2.5 words/s at 1.0x
+WORDS_PER_SECOND = 2.5 * TTS_SPEED
+
+# Margin on the estimate, so the speculative background nearly always
+# covers the real narration (it is cut to length at compose time)
+SPECULATIVE_PAD_RATIO = 0.15
+SPECULATIVE_PAD_SECONDS = 3.0
+
+
+def estimate_narration_duration(story):
+    """Padded narration length predicted from the word count."""
+    words = len(strip_markers(story).split())
+    return round(words / WORDS_PER_SECOND * (1 + SPECULATIVE_PAD_RATIO) + SPECULATIVE_PAD_SECONDS, 3)
+
+
+def speculative_background(channel_id, story, run_prefix, use_segment_pool=False, draft=False, chunks=1):
+    """
+    Schedules and renders the background for the estimated narration length.
+    Runs next to TTS; returns the duration the schedule covers.
+    """
+    estimate = estimate_narration_duration(story)
+    print(f"Speculative background for ~{estimate:.1f}s")
+    with stage("speculative_background") as st:
+        st.set(estimate=estimate)
+        schedule, background_path = schedule_stage(channel_id, estimate, run_prefix, use_segment_pool)
+        if background_path is None:
+            background_stage(channel_id, schedule, run_prefix, DRAFT if draft else FINAL, chunks=chunks)
+    return estimate
+
+
+def render_stage(
+    channel_id,
+    story,
+    audio_path,
+    duration,
+    run_prefix,
+    use_segment_pool=False,
+    draft=False,
+    chunks=1,
+):
+    """
+    CPU-bound: game selection, scheduling, captions, music and the final
+    encode. Takes only plain values so it can run in a worker process.
+
+    Every step is checkpointed in the run manifest; on resume, steps whose
+    inputs and artifacts are unchanged are skipped.
+
+    draft=True encodes a 540x960 proxy (<run>_DRAFT.mp4) instead of the
+    final video. Schedule, captions and soundtrack are the checkpointed
+    ones either way, so promote_draft() renders exactly what was reviewed.
+
+    chunks > 1 encodes the video as that many closed-GOP chunks in
+    parallel ffmpeg processes (see video_assembler.compose_chunked).
+
+    A schedule or background rendered ahead of time for a longer estimated
+    duration (speculative mode) is reused as long as it covers the
+    narration; the compose step cuts it to length.
+    """
+    os.makedirs("output", exist_ok=True)
+    manifest = RunManifest.load_or_create(run_prefix, channel_id)
+
+    with trace_run(run_prefix, final=True):
+        mode = DRAFT if draft else FINAL
+
+        # A schedule made earlier for a longer estimate is kept if it
+        # covers the narration, so draft, final and resumed renders match
+        schedule_duration = duration
+        prior = manifest.data["stages"].get("schedule", {}).get("inputs", {})
+        if prior.get("segment_pool") == use_segment_pool:
+            if prior.get("duration", 0) >= duration:
+                schedule_duration = prior["duration"]
+            elif "duration" in prior:
+                print(f"Narration ({duration:.1f}s) outran the scheduled "
+                      f"{prior['duration']:.1f}s; scheduling again")
+
+        schedule, background_path = schedule_stage(
+            channel_id, schedule_duration, run_prefix, use_segment_pool, manifest=manifest
+        )
+
+        if background_path is None:
+            done = manifest.reuse(f"background_{mode.name}", background_inputs(manifest, mode))
+            if done:
+                background_path = done["outputs"]["background"]
+
+        inputs = {"story": digest(story), "duration": duration}
+        done = manifest.reuse("captions_music", inputs)
+        if done:
+            srt_path = done["outputs"]["captions"]
+            music_path = done["values"]["music"]
+        else:
+            with stage("captions_music") as st:
+                srt_path = f"output/{run_prefix}_CAPTIONS.srt"
+                generate_srt_file(strip_markers(story), duration, srt_path)
+                st.output(srt_path)
+                try:
+                    music_path = get_music_index().choose(analyze_story_tone(story)).path
+                    print("Music:", music_path)
+                except RuntimeError as e:
+                    print("No background music:", e)
+                    music_path = None
+                st.set(music=music_path)
+
+            manifest.complete("captions_music", inputs, outputs={"captions": srt_path}, values={"music": music_path})
+
+        inputs = {
+            "audio": file_sha256(audio_path),
+            "captions_music": manifest.fingerprint("captions_music"),
+            "story": digest(story),
+            "duration": duration,
+        }
+        done = manifest.reuse("mix", inputs)
+        if done:
+            mix_path = done["outputs"]["mix"]
+        else:
+            with stage("mix") as st:
+                from scripts.audio.mixer import mix_narration
+                from scripts.audio.sfx_engine import build_sfx_layer
+
+                music_index = get_music_index() if music_path else None
+                music_track = music_index.find(music_path) if music_index else None
+
+                mix_path = f"output/{run_prefix}_MIX.wav"
+                sfx_layer, sfx_hits = build_sfx_layer(story, duration)
+                mix_narration(
+                    audio_path,
+                    duration,
+                    mix_path,
+                    music_path=music_path,
+                    music_samples=music_index.load_stem(music_track) if music_track else None,
+                    music_gain=music_track.gain if music_track else 1.0,
+                    sfx_layer=sfx_layer,
+                )
+                st.output(mix_path)
+                st.set(sfx_hits=len(sfx_hits))
+
+            manifest.complete("mix", inputs, outputs={"mix": mix_path})
+
+        inputs = {
+            "schedule": manifest.fingerprint("schedule"),
+            "captions_music": manifest.fingerprint("captions_music"),
+            "mix": manifest.fingerprint("mix"),
+        }
+        compose_name = "compose_draft" if draft else "compose"
+        done = manifest.reuse(compose_name, inputs)
+        if done:
+            final_path = done["outputs"]["final"]
+        else:
+            with stage(compose_name) as st:
+                final_path = f"output/{run_prefix}_{'DRAFT' if draft else 'FINAL'}.mp4"
+                compose_final_video(
+                    schedule,
+                    audio_path,
+                    final_path,
+                    duration,
+                    srt_path=srt_path,
+                    background_path=background_path,
+                    mixed_audio_path=mix_path,
+                    mode=mode,
+                    workers=chunks,
+                )
+                st.output(final_path)
+
+            manifest.complete(compose_name, inputs, outputs={"final": final_path})
 
     print("DONE:", final_path)
     return final_path
 
 
+def generate_full_video(
+    channel_id=None,
+    use_segment_pool=False,
+    run_prefix=None,
+    resume=None,
+    draft=False,
+    chunks=1,
+    speculative=False,
+):
+    """
+    Runs every stage for one video. resume: run_id of an earlier run whose
+    manifest is reused; finished stages with intact artifacts are skipped.
+    draft: encode a low-resolution QA proxy instead of the final video.
+    speculative: schedule and render the background for the estimated
+    narration length while TTS runs, instead of after it.
+    """
+    os.makedirs("output", exist_ok=True)
+
+    if resume:
+        manifest = RunManifest.load(resume)
+        run_prefix = resume
+        channel_id = channel_id or manifest.channel_id
+        print(f"Resuming {run_prefix} ({channel_id})")
+    run_prefix = run_prefix or new_run_prefix(channel_id)
+
+    with trace_run(run_prefix, final=True):
+        result = story_stage(channel_id, run_prefix)
+        story = result["story"]
+
+        if speculative:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                # A context copy keeps the background's stages in this trace
+                background = pool.submit(
+                    contextvars.copy_context().run,
+                    speculative_background,
+                    channel_id,
+                    story,
+                    run_prefix,
+                    use_segment_pool,
+                    draft,
+                    chunks,
+                )
+                audio_path, duration = narration_stage(story, run_prefix, channel_id=channel_id)
+                try:
+                    background.result()
+                except Exception as e:
+                    # render_stage schedules again from the real duration
+                    print(f"Speculative background failed: {e}")
+        else:
+            audio_path, duration = narration_stage(story, run_prefix, channel_id=channel_id)
+
+        return render_stage(
+            channel_id,
+            story,
+            audio_path,
+            duration,
+            run_prefix,
+            use_segment_pool=use_segment_pool,
+            draft=draft,
+            chunks=chunks,
+        )
+
+
+# Everything the final render reuses from the reviewed draft
+PROMOTE_STAGES = ("story", "tts", "schedule", "captions_music", "mix")
+
+
+def promote_draft(run_id, chunks=1):
+    """
+    Re-renders an approved draft at full quality. The story, narration,
+    clip schedule, captions and soundtrack must all still be intact in the
+    run's manifest, so the final video matches the draft frame for frame
+    and sample for sample; nothing is regenerated.
+    """
+    manifest = RunManifest.load(run_id)
+    broken = [name for name in PROMOTE_STAGES if not manifest.verify(name)]
+    if broken:
+        raise RuntimeError(
+            f"Cannot promote {run_id}: stages {', '.join(broken)} are missing or changed. "
+            f"Re-run the draft with --resume {run_id} --draft first."
+        )
+
+    print(f"Promoting {run_id} to a full-quality render")
+    use_segment_pool = manifest.data["stages"]["schedule"]["inputs"].get("segment_pool", False)
+    return generate_full_video(resume=run_id, use_segment_pool=use_segment_pool, chunks=chunks)
+
+
 # ------------------------------------------------------
 # CLI ENTRY
 # ------------------------------------------------------
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python -m scripts.generate_full_video <channel_id>")
-        sys.exit(1)
+    load_env()
+    parser = argparse.ArgumentParser(prog="python -m scripts.generate_full_video")
+    parser.add_argument("channel_id", nargs="?")
+    parser.add_argument(
+        "--segment-pool",
+        action="store_true",
+        help="assemble the background from pre-cut segments with stream copy",
+    )
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue a failed run from its last checkpoint")
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        help="render a fast 540x960 proxy for review instead of the final video",
+    )
+    parser.add_argument("--promote", metavar="RUN_ID", help="render an approved draft at full quality")
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="render the background from a word-count estimate while TTS runs",
+    )
+    parser.add_argument(
+        "--chunks",
+        type=int,
+        default=1,
+        help="encode the video as this many parallel chunks (e.g. cores / 4)",
+    )
+    args = parser.parse_args()
 
-    generate_full_video(sys.argv[1])
+    if args.promote:
+        promote_draft(args.promote, chunks=args.chunks)
+    else:
+        if not args.channel_id and not args.resume:
+            parser.error("give a channel_id, --resume RUN_ID or --promote RUN_ID")
+        generate_full_video(
+            args.channel_id,
+            use_segment_pool=args.segment_pool,
+            resume=args.resume,
+            draft=args.draft,
+            chunks=args.chunks,
+            speculative=args.speculative,
+        )
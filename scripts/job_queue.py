@@ -0,0 +1,342 @@
+"""
+Job Queue - SQLite-backed queue of pipeline jobs for any number of workers.
+
+Jobs are claimed with a lease: a worker owns a job until its lease expires,
+and keeps it alive with heartbeats while the job runs. A job whose worker
+died is picked up again once the lease runs out. Failed jobs are retried
+with exponential backoff up to max_attempts. Higher priority runs first;
+the default priority of a channel comes from `queue.priorities` in
+config/settings.yaml.
+
+The database is a plain file, so workers on several hosts can share it
+from a shared filesystem (one with working POSIX locks, e.g. NFSv4).
+
+    python -m scripts.job_queue add storytales:3 --priority 5
+    python -m scripts.job_queue list
+    python -m scripts.job_queue retry 42
+    python -m scripts.worker               # claim and run jobs
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from scripts.utils.settings import get_setting
+
+
+QUEUE_PATH = "data/job_queue.sqlite"
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE = 30.0       # seconds before the first retry, doubled each time
+BACKOFF_MAX = 3600.0
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+# ------------------------------------------------------
+# DATA
+# ------------------------------------------------------
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    channel_id: str
+    payload: Dict[str, Any]
+    priority: int
+    status: str
+    attempts: int
+    max_attempts: int
+    run_id: Optional[str] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[str] = None
+
+
+def channel_priority(channel_id: str) -> int:
+    priorities = get_setting("queue.priorities", {}) or {}
+    return int(priorities.get(channel_id, get_setting("queue.default_priority", 0)))
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based), with +-20% jitter."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# ------------------------------------------------------
+# QUEUE
+# ------------------------------------------------------
+
+class JobQueue:
+    """
+    Every state change is one short transaction. Claims use BEGIN IMMEDIATE
+    so two workers can never take the same job.
+    """
+
+    _COLUMNS = "id, kind, channel_id, payload, priority, status, attempts, max_attempts, run_id, worker, error, result"
+
+    def __init__(self, db_path: str = QUEUE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        # Autocommit mode: transactions are opened explicitly below
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        # Rollback journal, not WAL: WAL needs shared memory between the
+        # processes, which NFS/SMB can't provide to workers on other hosts
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id            INTEGER PRIMARY KEY,
+                kind          TEXT NOT NULL,
+                channel_id    TEXT NOT NULL,
+                payload       TEXT NOT NULL,
+                priority      INTEGER NOT NULL,
+                status        TEXT NOT NULL,
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                max_attempts  INTEGER NOT NULL,
+                run_at        REAL NOT NULL,
+                run_id        TEXT,
+                worker        TEXT,
+                lease_expires REAL,
+                heartbeat     REAL,
+                error         TEXT,
+                result        TEXT,
+                created       REAL NOT NULL,
+                updated       REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, run_at);
+            """
+        )
+
+    def _job(self, row) -> Job:
+        (id_, kind, channel_id, payload, priority, status, attempts,
+         max_attempts, run_id, worker, error, result) = row
+        return Job(
+            id=id_,
+            kind=kind,
+            channel_id=channel_id,
+            payload=json.loads(payload),
+            priority=priority,
+            status=status,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            run_id=run_id,
+            worker=worker,
+            error=error,
+            result=result,
+        )
+
+    def enqueue(
+        self,
+        channel_id: str,
+        kind: str = "video",
+        payload: Optional[Dict[str, Any]] = None,
+        priority: Optional[int] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        run_id: Optional[str] = None,
+    ) -> int:
+        now = time.time()
+        priority = channel_priority(channel_id) if priority is None else priority
+        cur = self.conn.execute(
+            "INSERT INTO jobs (kind, channel_id, payload, priority, status, max_attempts, "
+            "run_at, run_id, created, updated) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (kind, channel_id, json.dumps(payload or {}), priority, max_attempts, now, run_id, now, now),
+        )
+        return cur.lastrowid
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Job]:
+        """
+        Takes the highest-priority job that is due, or whose previous
+        worker's lease has expired. Returns None if nothing is ready.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = self.conn.execute(
+                    f"SELECT {self._COLUMNS} FROM jobs "
+                    "WHERE (status = 'queued' AND run_at <= ?) "
+                    "   OR (status = 'running' AND lease_expires < ?) "
+                    "ORDER BY priority DESC, run_at, id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+
+                job = self._job(row)
+                if job.status != "running":
+                    break
+                if job.attempts < job.max_attempts:
+                    print(f"Job {job.id}: lease of {job.worker} expired, reclaiming")
+                    break
+                # The worker died on the last allowed attempt
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_expires = NULL, updated = ? WHERE id = ?",
+                    (f"lease of {job.worker} expired", now, job.id),
+                )
+
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, "
+                "heartbeat = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker, now + lease_seconds, now, now, job.id),
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        job.status = "running"
+        job.worker = worker
+        job.attempts += 1
+        return job
+
+    def _owned_update(self, job_id: int, worker: str, sql: str, params: tuple) -> bool:
+        # Only the worker holding the lease may change a running job
+        cur = self.conn.execute(
+            f"UPDATE jobs SET {sql}, updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (*params, time.time(), job_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extends the lease. False means the job was taken over."""
+        now = time.time()
+        return self._owned_update(
+            job_id, worker, "lease_expires = ?, heartbeat = ?", (now + lease_seconds, now)
+        )
+
+    def set_run_id(self, job_id: int, worker: str, run_id: str) -> bool:
+        return self._owned_update(job_id, worker, "run_id = ?", (run_id,))
+
+    def complete(self, job_id: int, worker: str, result: str = "") -> bool:
+        return self._owned_update(
+            job_id, worker, "status = 'done', result = ?, error = NULL, lease_expires = NULL", (result,)
+        )
+
+    def fail(self, job: Job, worker: str, error: str, retry: bool = True) -> bool:
+        """
+        Records a failed attempt: requeued with backoff while attempts
+        remain (and retry is True), otherwise marked failed.
+        """
+        if retry and job.attempts < job.max_attempts:
+            delay = backoff_seconds(job.attempts)
+            print(f"Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying in {delay:.0f}s")
+            return self._owned_update(
+                job.id, worker,
+                "status = 'queued', error = ?, run_at = ?, worker = NULL, lease_expires = NULL",
+                (error, time.time() + delay),
+            )
+        print(f"Job {job.id} failed permanently after {job.attempts} attempt(s)")
+        return self._owned_update(
+            job.id, worker, "status = 'failed', error = ?, lease_expires = NULL", (error,)
+        )
+
+    def retry(self, job_id: int) -> bool:
+        """Puts a failed (or stuck) job back in the queue with fresh attempts."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, worker = NULL, "
+            "lease_expires = NULL, updated = ? WHERE id = ? AND status != 'done'",
+            (now, now, job_id),
+        )
+        return cur.rowcount == 1
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self.conn.execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        where, params = ("WHERE status = ?", (status,)) if status else ("", ())
+        rows = self.conn.execute(
+            f"SELECT {self._COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT ?", (*params, limit)
+        )
+        return [self._job(r) for r in rows]
+
+    def counts(self) -> Dict[str, int]:
+        out = {s: 0 for s in STATUSES}
+        for status, n in self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            out[status] = n
+        return out
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scripts.job_queue")
+    parser.add_argument("--db", default=QUEUE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="queue videos: channel_id or channel_id:count")
+    add.add_argument("channels", nargs="+")
+    add.add_argument("--priority", type=int, default=None, help="default: queue.priorities in settings")
+    add.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    add.add_argument("--draft", action="store_true")
+    add.add_argument("--chunks", type=int, default=1)
+    add.add_argument("--segment-pool", action="store_true")
+    add.add_argument("--speculative", action="store_true")
+
+    promote = sub.add_parser("promote", help="queue a full-quality render of an approved draft")
+    promote.add_argument("run_id")
+    promote.add_argument("--priority", type=int, default=None)
+
+    lst = sub.add_parser("list", help="show recent jobs")
+    lst.add_argument("--status", choices=STATUSES)
+    lst.add_argument("--limit", type=int, default=30)
+
+    rt = sub.add_parser("retry", help="requeue a failed job")
+    rt.add_argument("job_id", type=int)
+
+    args = parser.parse_args()
+    queue = JobQueue(args.db)
+
+    if args.command == "add":
+        payload = {
+            "draft": args.draft,
+            "chunks": args.chunks,
+            "segment_pool": args.segment_pool,
+            "speculative": args.speculative,
+        }
+        for spec in args.channels:
+            channel_id, _, count = spec.partition(":")
+            for _ in range(int(count) if count else 1):
+                job_id = queue.enqueue(
+                    channel_id.strip(), payload=payload,
+                    priority=args.priority, max_attempts=args.max_attempts,
+                )
+                print(f"Queued job {job_id}: {channel_id.strip()}")
+
+    elif args.command == "promote":
+        from scripts.run_manifest import RunManifest
+        manifest = RunManifest.load(args.run_id)
+        job_id = queue.enqueue(
+            manifest.channel_id or "", kind="promote", priority=args.priority, run_id=args.run_id,
+        )
+        print(f"Queued job {job_id}: promote {args.run_id}")
+
+    elif args.command == "list":
+        for job in queue.jobs(args.status, args.limit):
+            detail = job.result or (job.error or "").splitlines()[-1:] or ""
+            print(
+                f"  {job.id:>5} {job.status:<8} p{job.priority:<3} {job.kind:<8} {job.channel_id:<24} "
+                f"{job.attempts}/{job.max_attempts} {job.run_id or '':<36} {''.join(detail)[:80]}"
+            )
+        print("  " + ", ".join(f"{k}={v}" for k, v in queue.counts().items()))
+
+    elif args.command == "retry":
+        ok = queue.retry(args.job_id)
+        print(f"Requeued job {args.job_id}" if ok else f"Job {args.job_id} not found or already done")
+        sys.exit(0 if ok else 1)
@@ -1,46 +1,231 @@
 import os
+import sys
+import json
+import time
+import hashlib
+import argparse
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scripts.encoder_profiles import get_profile
+from scripts.ffmpeg_builder import get_ffmpeg_path
+from scripts.utils.tracing import run_command
 
 INPUT_DIR = "assets/gameplay"
 OUTPUT_DIR = "assets/gameplay_normalized"
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, ".normalize_manifest.json")
+REPORT_PATH = os.path.join(OUTPUT_DIR, ".normalize_report.json")
+
+NORMALIZE_FILTER = "scale=1080:-1,crop=1080:1920:0:(in_h-1920)/2"
+
+
+def encoder_params():
+    # Anything that changes the output bytes belongs here: changing it
+    # (including the 'normalize' encoder profile) invalidates every
+    # manifest entry and forces a re-encode.
+    return {"vf": NORMALIZE_FILTER, **get_profile("normalize").params()}
+
+
+# ------------------------------------------------------
+# MANIFEST
+# ------------------------------------------------------
+
+def params_hash(params=None):
+    blob = json.dumps(params or encoder_params(), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
-def normalize_clip(filename):
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ------------------------------------------------------
+# NORMALIZE
+# ------------------------------------------------------
+
+def normalize_clip(filename, threads=0):
     input_path = os.path.join(INPUT_DIR, filename)
     output_path = os.path.join(OUTPUT_DIR, filename)
 
-    # Skip files that disappeared or are not real video
-    if not os.path.isfile(input_path):
-        print(f"Skipping missing or phantom file: {filename}")
-        return
-
     print("Normalizing:", filename)
 
     cmd = [
-        "ffmpeg",
+        get_ffmpeg_path(),
         "-y",
         "-i", input_path,
-        "-vf", "scale=1080:-1,crop=1080:1920:0:(in_h-1920)/2",
-        "-c:v", "libx264",
-        "-preset", "veryfast",
-        "-pix_fmt", "yuv420p",
+        "-vf", NORMALIZE_FILTER,
+        *get_profile("normalize").args(threads=threads),
         "-an",
         output_path
     ]
 
-    subprocess.run(cmd, check=False)  # avoid stopping entire batch
+    # Errors are raised to the caller and collected into the report
+    run_command(cmd, check=True, capture_output=True, text=True)
+    return output_path
+
+
+def process_file(filename, threads=0, entry=None, force=False):
+    """
+    Worker task: hashes the input, skips it if the manifest says the same
+    bytes were already encoded with the same params, otherwise normalizes.
+
+    Returns a result dict with the status, timing and new manifest entry.
+    """
+    started = time.perf_counter()
+    input_path = os.path.join(INPUT_DIR, filename)
+    result = {"file": filename, "status": "ok", "seconds": 0.0, "error": None, "entry": entry}
+
+    # Skip files that disappeared or are not real video
+    if not os.path.isfile(input_path):
+        result["status"] = "missing"
+        return result
+
+    st = os.stat(input_path)
+    entry = entry or {}
+
+    # Reuse the stored hash when size/mtime are unchanged, so untouched
+    # files are not re-read on every run
+    if entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime:
+        digest = entry["input_hash"]
+    else:
+        digest = file_hash(input_path)
+
+    p_hash = params_hash()
+    output_path = os.path.join(OUTPUT_DIR, filename)
+
+    if (
+        not force
+        and entry.get("input_hash") == digest
+        and entry.get("params_hash") == p_hash
+        and os.path.isfile(output_path)
+    ):
+        result["status"] = "skipped"
+        result["entry"] = {**entry, "size": st.st_size, "mtime": st.st_mtime}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    try:
+        normalize_clip(filename, threads=threads)
+        result["entry"] = {
+            "input_hash": digest,
+            "params_hash": p_hash,
+            "output": output_path,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+        }
+    except subprocess.CalledProcessError as e:
+        result["status"] = "failed"
+        # Last lines of ffmpeg's stderr are the ones that explain the failure
+        result["error"] = "\n".join((e.stderr or "").strip().splitlines()[-5:]) or str(e)
+    except OSError as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# ------------------------------------------------------
+# REPORT
+# ------------------------------------------------------
+
+def print_report(results, wall_seconds):
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
 
+    print("\n=== NORMALIZE REPORT ===")
+    for r in sorted(results, key=lambda r: r["seconds"], reverse=True):
+        if r["status"] != "skipped":
+            print(f"  {r['status']:<8} {r['seconds']:>8.2f}s  {r['file']}")
 
-def run():
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    print(f"Total: {len(results)} files ({summary}) in {wall_seconds:.1f}s")
+
+    for r in results:
+        if r["status"] == "failed":
+            print(f"\nFAILED {r['file']}:\n{r['error']}")
+
+
+def write_report(results, wall_seconds, path=REPORT_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "wall_seconds": round(wall_seconds, 3),
+                "files": [{k: v for k, v in r.items() if k != "entry"} for r in results],
+            },
+            f,
+            indent=2,
+        )
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def run(workers=None, threads=None, force=False):
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    files = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".mp4")]
+    files = sorted(f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".mp4"))
+
+    workers = workers or default_workers()
+    # Split the machine between workers instead of letting every ffmpeg
+    # grab all cores
+    threads = threads if threads is not None else max(1, (os.cpu_count() or 1) // workers)
+
+    manifest = load_manifest()
+    results = []
+    started = time.perf_counter()
 
-    for f in files:
-        normalize_clip(f)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(process_file, f, threads, manifest.get(f), force)
+            for f in files
+        ]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            if r["entry"] and r["status"] in ("ok", "skipped"):
+                manifest[r["file"]] = r["entry"]
+                if r["status"] == "ok":
+                    # Persist as we go so a crash doesn't lose finished work
+                    save_manifest(manifest)
 
-    print("DONE — all valid files processed.")
+    save_manifest(manifest)
+    wall = time.perf_counter() - started
+    print_report(results, wall)
+    write_report(results, wall)
+
+    failed = sum(1 for r in results if r["status"] == "failed")
+    print("DONE — all valid files processed." if not failed else f"DONE — {failed} file(s) failed.")
+    return results
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(prog="python -m scripts.normalize_gameplay")
+    parser.add_argument("--workers", type=int, default=None, help="parallel ffmpeg processes (default: cores / 2)")
+    parser.add_argument("--threads", type=int, default=None, help="ffmpeg threads per worker (default: cores / workers)")
+    parser.add_argument("--force", action="store_true", help="re-encode even if the manifest says up to date")
+    args = parser.parse_args()
+
+    results = run(workers=args.workers, threads=args.threads, force=args.force)
+    sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
@@ -1 +1,291 @@
-# Video assembly and rendering pipeline\n# To be implemented\n
\ No newline at end of file
+"""
+Video Assembler - Single-pass compositor for the final video.
+
+Builds one FFmpeg filter_complex covering the gameplay segment concat,
+crop/scale, burned-in captions, narration, ducked background music and SFX,
+then encodes once straight to the final MP4. A soundtrack premixed in-process
+by scripts/audio/mixer.py can be passed instead of the audio inputs. This replaces the chain of
+render_background -> burn_captions_into_video -> normalize/duck music ->
+mux_audio_video, which re-encoded the video twice and the audio three times.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from scripts.ffmpeg_builder import (
+    FINAL,
+    RenderMode,
+    get_ffmpeg_path,
+    max_open_inputs,
+    build_segment_graph,
+    prerender_background,
+    render_background,
+    scale_filter,
+    video_encode_args,
+    audio_encode_args,
+)
+from scripts.captions.captions_engine import build_subtitles_filter
+from scripts.utils.tracing import run_command
+
+
+def build_audio_graph(
+    narration_idx: int,
+    duration: float,
+    music_idx: Optional[int] = None,
+    sfx_inputs: Optional[List[Dict]] = None,
+    music_volume: float = 0.25,
+    fade_duration: float = 2.0,
+) -> str:
+    """
+    Builds the audio half of the filter graph, ending in [outa].
+
+    - narration is the main voice track
+    - music is trimmed (input is looped), faded in/out and ducked under the
+      narration with sidechaincompress
+    - each SFX input is delayed to its timestamp
+
+    sfx_inputs: [{"idx": int, "time": float, "volume": float}]
+    """
+    parts = []
+    mix_nodes = []
+
+    if music_idx is not None:
+        fade_out_start = max(0.0, duration - fade_duration)
+        parts.append(f"[{narration_idx}:a]asplit=2[narr][narrsc]")
+        parts.append(
+            f"[{music_idx}:a]atrim=0:{duration},asetpts=PTS-STARTPTS,"
+            f"volume={music_volume},"
+            f"afade=t=in:d={fade_duration},"
+            f"afade=t=out:st={fade_out_start}:d={fade_duration}[music]"
+        )
+        parts.append(
+            "[music][narrsc]sidechaincompress="
+            "threshold=0.02:ratio=20:attack=200:release=1000[ducked]"
+        )
+        mix_nodes += ["[narr]", "[ducked]"]
+    else:
+        parts.append(f"[{narration_idx}:a]anull[narr]")
+        mix_nodes.append("[narr]")
+
+    for n, sfx in enumerate(sfx_inputs or []):
+        delay_ms = int(round(sfx["time"] * 1000))
+        parts.append(
+            f"[{sfx['idx']}:a]adelay={delay_ms}|{delay_ms},"
+            f"volume={sfx.get('volume', 1.0)}[sfx{n}]"
+        )
+        mix_nodes.append(f"[sfx{n}]")
+
+    if len(mix_nodes) == 1:
+        parts.append(f"{mix_nodes[0]}anull[outa]")
+    else:
+        # duration=first keeps the mix exactly as long as the narration
+        parts.append(
+            f"{''.join(mix_nodes)}amix=inputs={len(mix_nodes)}:"
+            f"duration=first:dropout_transition=0:normalize=0[outa]"
+        )
+
+    return ";".join(parts)
+
+
+def build_audio_inputs(
+    next_idx: int,
+    narration_path: str,
+    duration: float,
+    music_path: Optional[str] = None,
+    sfx_hits: Optional[List[Dict]] = None,
+    music_volume: float = 0.25,
+    mixed_audio_path: Optional[str] = None,
+):
+    """
+    Audio inputs (numbered from next_idx) and the graph ending in [outa].
+    Returns (input_args, audio_graph).
+    """
+    if mixed_audio_path:
+        return ["-i", mixed_audio_path], f"[{next_idx}:a]anull[outa]"
+
+    narration_idx = next_idx
+    input_args = ["-i", narration_path]
+    next_idx += 1
+
+    music_idx = None
+    if music_path:
+        music_idx = next_idx
+        input_args += ["-stream_loop", "-1", "-i", music_path]
+        next_idx += 1
+
+    sfx_inputs = []
+    for hit in sfx_hits or []:
+        input_args += ["-i", hit["path"]]
+        sfx_inputs.append({"idx": next_idx, "time": hit["time"], "volume": hit.get("volume", 1.0)})
+        next_idx += 1
+
+    audio_graph = build_audio_graph(
+        narration_idx,
+        duration,
+        music_idx=music_idx,
+        sfx_inputs=sfx_inputs,
+        music_volume=music_volume,
+    )
+    return input_args, audio_graph
+
+
+def background_slices(background_path: str, duration: float, pieces: int) -> List[Dict]:
+    """
+    The first `duration` seconds of a pre-assembled background as `pieces`
+    schedule entries of equal length, so compose_chunked can encode it in
+    parallel like a clip schedule.
+    """
+    step = duration / pieces
+    return [
+        {"clip": background_path, "in": round(i * step, 6), "duration": round(step, 6)}
+        for i in range(pieces)
+    ]
+
+
+def compose_chunked(
+    schedule,
+    output_path: str,
+    duration: float,
+    audio_args,
+    audio_graph: str,
+    srt_path: Optional[str] = None,
+    mode: RenderMode = FINAL,
+    workers: int = 2,
+):
+    """
+    Parallel variant of the single-pass compose: the video (background plus
+    captions) is encoded as `workers` concurrent closed-GOP chunks joined
+    with stream copy, then the soundtrack is muxed in without touching the
+    video. Still one x264 encode per frame.
+    """
+    video_path = output_path + ".video.mp4"
+    render_background(schedule, video_path, mode=mode, workers=workers, srt_path=srt_path)
+
+    cmd = [
+        get_ffmpeg_path(),
+        "-y",
+        "-i", video_path,
+        *audio_args,
+        "-filter_complex", audio_graph,
+        "-map", "0:v",
+        "-map", "[outa]",
+        "-c:v", "copy",
+        *audio_encode_args(mode),
+        "-t", str(duration),
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+    print("FFmpeg command:", " ".join(cmd))
+    try:
+        run_command(cmd, check=True)
+    finally:
+        if os.path.exists(video_path):
+            os.remove(video_path)
+    print(f"Final video composed ({workers} chunks in parallel):", output_path)
+    return output_path
+
+
+def compose_final_video(
+    schedule,
+    narration_path: str,
+    output_path: str,
+    duration: float,
+    srt_path: Optional[str] = None,
+    music_path: Optional[str] = None,
+    sfx_hits: Optional[List[Dict]] = None,
+    music_volume: float = 0.25,
+    background_path: Optional[str] = None,
+    mixed_audio_path: Optional[str] = None,
+    mode: RenderMode = FINAL,
+    workers: int = 1,
+):
+    """
+    Render the finished video in one FFmpeg invocation and one x264 encode.
+
+    Args:
+        schedule: Output of build_clip_schedule (ignored if background_path is set).
+            Schedules longer than max_open_inputs() (far beyond a normal
+            Short) are prerendered losslessly in bounded groups so decoder
+            memory does not grow with length
+        narration_path: TTS narration audio
+        output_path: Final MP4 path
+        duration: Narration duration in seconds (final video length)
+        srt_path: Optional captions file to burn in
+        music_path: Optional background music track (looped as needed)
+        sfx_hits: Optional [{"path": str, "time": float, "volume": float}]
+        music_volume: Music gain before ducking
+        background_path: Pre-assembled 1080x1920 background (e.g. from the
+            segment pool) used as the single video input
+        mixed_audio_path: Finished soundtrack (e.g. from audio.mixer); when
+            set it is mapped as-is and narration/music/SFX are not mixed here
+        mode: Output size and encoder settings (ffmpeg_builder.FINAL or DRAFT)
+        workers: Encode the video as this many parallel chunks (see
+            compose_chunked); a background_path is cut into that many slices
+    """
+    ffmpeg = get_ffmpeg_path()
+
+    if workers > 1 and (background_path or schedule):
+        audio_args, audio_graph = build_audio_inputs(
+            1, narration_path, duration, music_path, sfx_hits, music_volume, mixed_audio_path
+        )
+        return compose_chunked(
+            background_slices(background_path, duration, workers) if background_path else schedule,
+            output_path, duration, audio_args, audio_graph,
+            srt_path=srt_path, mode=mode, workers=workers,
+        )
+
+    # A very long schedule would open one decoder per segment in this
+    # process; render it in bounded groups to a lossless background first
+    prerendered = None
+    if not background_path and schedule and len(schedule) > max_open_inputs():
+        prerendered = prerender_background(schedule, output_path + ".bg.mp4", mode=mode)
+
+    if prerendered:
+        input_args = ["-i", prerendered]
+        video_graph = "[0:v]null[bg]"
+        next_idx = 1
+    elif background_path:
+        input_args = ["-i", background_path]
+        # Pre-assembled backgrounds are full size; a draft scales them down
+        video_graph = "[0:v]null[bg]" if mode == FINAL else f"[0:v]{scale_filter(mode)}[bg]"
+        next_idx = 1
+    elif schedule:
+        input_args, video_graph = build_segment_graph(schedule, out_label="bg", mode=mode)
+        next_idx = len(schedule)
+    else:
+        raise RuntimeError("Schedule empty.")
+
+    # Captions are drawn on the concatenated background
+    if srt_path:
+        video_graph += f";[bg]{build_subtitles_filter(srt_path)}[outv]"
+    else:
+        video_graph += ";[bg]null[outv]"
+
+    audio_args, audio_graph = build_audio_inputs(
+        next_idx, narration_path, duration, music_path, sfx_hits, music_volume, mixed_audio_path
+    )
+    input_args += audio_args
+
+    cmd = [
+        ffmpeg,
+        "-y",
+        *input_args,
+        "-filter_complex", f"{video_graph};{audio_graph}",
+        "-map", "[outv]",
+        "-map", "[outa]",
+        *video_encode_args(mode),
+        *audio_encode_args(mode),
+        "-t", str(duration),
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+    print("FFmpeg command:", " ".join(cmd))
+    try:
+        run_command(cmd, check=True)
+    finally:
+        if prerendered and os.path.exists(prerendered):
+            os.remove(prerendered)
+    print("Final video composed:", output_path)
+    return output_path
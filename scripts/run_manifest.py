@@ -0,0 +1,197 @@
+"""
+Run Manifest - Per-stage checkpoints for resumable runs.
+
+Each run keeps output/<run_id>/manifest.json. A finished stage records its
+inputs, its output files (with size and SHA-256) and the plain values later
+stages need (story text, duration, schedule, ...). On --resume a stage is
+skipped only if it finished with the same inputs and every output file
+still matches its recorded hash; otherwise it runs again, and because each
+stage's inputs include the fingerprints of the stages it depends on,
+everything downstream of a re-run stage runs again too.
+
+A run can be cancelled through an event (see set_cancel_event): from then
+on reuse() and complete() raise RunCancelled, so the run stops at the next
+stage boundary without recording the stage in progress.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextvars
+from typing import Any, Dict, Optional
+
+
+OUTPUT_DIR = "output"
+MANIFEST_NAME = "manifest.json"
+
+# Stages of one run may finish concurrently (e.g. a speculative background
+# render next to TTS), each through its own RunManifest object
+_write_lock = threading.Lock()
+
+# Event that cancels the run in this context (the worker sets it when its
+# queue lease is lost); copied into stage threads with the rest of the context
+_cancel_event: contextvars.ContextVar = contextvars.ContextVar("run_cancel_event", default=None)
+
+
+class RunCancelled(RuntimeError):
+    """The run was cancelled; no further stage starts or is recorded."""
+
+
+def set_cancel_event(event: Optional[threading.Event]) -> contextvars.Token:
+    """Cancels the current context's run once event is set. Returns the reset token."""
+    return _cancel_event.set(event)
+
+
+def reset_cancel_event(token: contextvars.Token):
+    _cancel_event.reset(token)
+
+
+def check_cancelled(run_id: str = ""):
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise RunCancelled(f"Run {run_id} cancelled" if run_id else "Run cancelled")
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def digest(value: Any) -> str:
+    """Stable short hash of a JSON-serializable value."""
+    blob = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class RunManifest:
+    def __init__(self, run_id: str, channel_id: Optional[str] = None, output_dir: str = OUTPUT_DIR):
+        self.run_id = run_id
+        self.run_dir = os.path.join(output_dir, run_id)
+        self.path = os.path.join(self.run_dir, MANIFEST_NAME)
+        self.data: Dict[str, Any] = {
+            "run_id": run_id,
+            "channel_id": channel_id,
+            "created": time.time(),
+            "stages": {},
+        }
+
+    @classmethod
+    def load_or_create(cls, run_id: str, channel_id: Optional[str] = None, output_dir: str = OUTPUT_DIR) -> "RunManifest":
+        manifest = cls(run_id, channel_id, output_dir)
+        if os.path.isfile(manifest.path):
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                manifest.data = json.load(f)
+            if channel_id and not manifest.data.get("channel_id"):
+                manifest.data["channel_id"] = channel_id
+        return manifest
+
+    @classmethod
+    def load(cls, run_id: str, output_dir: str = OUTPUT_DIR) -> "RunManifest":
+        manifest = cls.load_or_create(run_id, output_dir=output_dir)
+        if not os.path.isfile(manifest.path):
+            raise RuntimeError(f"No manifest for run '{run_id}' at {manifest.path}")
+        return manifest
+
+    @property
+    def channel_id(self) -> Optional[str]:
+        return self.data.get("channel_id")
+
+    def _write(self):
+        os.makedirs(self.run_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # ------------------------------------------------------
+    # STAGES
+    # ------------------------------------------------------
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        """Hash of a finished stage's inputs, outputs and values."""
+        entry = self.data["stages"].get(name)
+        if not entry or entry.get("status") != "done":
+            return None
+        return digest([entry.get("inputs"), entry.get("outputs"), entry.get("values")])
+
+    def _outputs_valid(self, outputs: Dict[str, Dict]) -> bool:
+        for key, out in outputs.items():
+            path = out["path"]
+            if not os.path.isfile(path) or os.path.getsize(path) != out["size"]:
+                print(f"Checkpoint output missing or changed: {path}")
+                return False
+            if file_sha256(path) != out["sha256"]:
+                print(f"Checkpoint output hash mismatch: {path}")
+                return False
+        return True
+
+    def reuse(self, name: str, inputs: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stage entry if it can be skipped:
+        {"outputs": {key: path}, "values": {...}}. None means run it.
+        Raises RunCancelled if the run was cancelled, so no stage starts.
+        """
+        check_cancelled(self.run_id)
+        entry = self.data["stages"].get(name)
+        if not entry or entry.get("status") != "done":
+            return None
+        if entry.get("inputs") != (inputs or {}):
+            print(f"Checkpoint '{name}' inputs changed, re-running")
+            return None
+        if not self._outputs_valid(entry.get("outputs", {})):
+            return None
+
+        print(f"Resumed '{name}' from checkpoint")
+        return {
+            "outputs": {k: o["path"] for k, o in entry.get("outputs", {}).items()},
+            "values": entry.get("values", {}),
+        }
+
+    def verify(self, name: str) -> bool:
+        """True if the stage finished and its output files are intact."""
+        entry = self.data["stages"].get(name)
+        if not entry or entry.get("status") != "done":
+            return False
+        return self._outputs_valid(entry.get("outputs", {}))
+
+    def complete(
+        self,
+        name: str,
+        inputs: Optional[Dict[str, Any]] = None,
+        outputs: Optional[Dict[str, Optional[str]]] = None,
+        values: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Records a finished stage. outputs: {key: path}; None paths are skipped.
+        A cancelled run raises RunCancelled instead of recording anything.
+        """
+        recorded = {}
+        for key, path in (outputs or {}).items():
+            if path:
+                recorded[key] = {
+                    "path": path,
+                    "size": os.path.getsize(path),
+                    "sha256": file_sha256(path),
+                }
+
+        entry = {
+            "status": "done",
+            "finished": time.time(),
+            "inputs": inputs or {},
+            "outputs": recorded,
+            "values": values or {},
+        }
+        with _write_lock:
+            check_cancelled(self.run_id)
+            # Merge into what is on disk so stages recorded meanwhile by
+            # other RunManifest objects are kept
+            if os.path.isfile(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.data["stages"] = json.load(f).get("stages", {})
+            self.data["stages"][name] = entry
+            self._write()
@@ -0,0 +1,189 @@
+"""
+Segment Pool - Keyframe-aligned, pre-cut gameplay segments.
+
+Each normalized clip is cut once into closed-GOP segments of a fixed length
+(1s by default) with a keyframe at the start of every segment. Because all
+segments share codec, resolution, fps and timebase, any run of them can be
+joined with the concat demuxer and `-c copy` - no decode, no x264.
+
+    python -m scripts.segment_pool            # cut new/changed clips
+"""
+
+import os
+import sys
+import csv
+import sqlite3
+import subprocess
+from typing import Dict, List, Optional
+
+from scripts.clip_catalog import CLIP_FOLDER, get_catalog
+from scripts.encoder_profiles import get_profile
+from scripts.ffmpeg_builder import get_ffmpeg_path
+from scripts.utils.tracing import run_command
+
+
+SEGMENT_FOLDER = "assets/gameplay_segments"
+SEGMENT_SECONDS = 1
+SEGMENT_FPS = 30
+INDEX_FILENAME = ".segment_index.sqlite"
+
+
+# ------------------------------------------------------
+# CUTTING
+# ------------------------------------------------------
+
+def cut_clip_into_segments(clip_path: str, out_dir: str, seg_seconds: int = SEGMENT_SECONDS) -> List[Dict]:
+    """
+    Re-encodes one clip into closed-GOP segments with a keyframe every
+    seg_seconds and returns [{"path", "start", "duration"}] in order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    list_path = os.path.join(out_dir, "segments.csv")
+
+    cmd = [
+        get_ffmpeg_path(),
+        "-y",
+        "-i", clip_path,
+        "-an",
+        "-r", str(SEGMENT_FPS),
+        *get_profile("segments").args(),
+        "-g", str(SEGMENT_FPS * seg_seconds),
+        "-keyint_min", str(SEGMENT_FPS * seg_seconds),
+        "-sc_threshold", "0",
+        "-flags", "+cgop",
+        "-force_key_frames", f"expr:gte(t,n_forced*{seg_seconds})",
+        "-video_track_timescale", "15360",
+        "-f", "segment",
+        "-segment_time", str(seg_seconds),
+        "-reset_timestamps", "1",
+        "-segment_list", list_path,
+        "-segment_list_type", "csv",
+        os.path.join(out_dir, "%05d.mp4"),
+    ]
+    run_command(cmd, check=True, capture_output=True)
+
+    segments = []
+    with open(list_path, newline="", encoding="utf-8") as f:
+        for name, start, end in csv.reader(f):
+            segments.append({
+                "path": os.path.join(out_dir, name),
+                "start": float(start),
+                "duration": float(end) - float(start),
+            })
+
+    os.remove(list_path)
+    return segments
+
+
+# ------------------------------------------------------
+# INDEX
+# ------------------------------------------------------
+
+class SegmentPool:
+    """
+    Index of pre-cut segments, keyed by source clip path. A clip is re-cut
+    only when its size or mtime changes.
+    """
+
+    def __init__(self, folder: str = SEGMENT_FOLDER, seg_seconds: int = SEGMENT_SECONDS):
+        self.folder = folder
+        self.seg_seconds = seg_seconds
+        os.makedirs(folder, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(folder, INDEX_FILENAME), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                clip    TEXT PRIMARY KEY,
+                size    INTEGER NOT NULL,
+                mtime   REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                clip     TEXT NOT NULL,
+                idx      INTEGER NOT NULL,
+                start    REAL NOT NULL,
+                duration REAL NOT NULL,
+                path     TEXT NOT NULL,
+                PRIMARY KEY (clip, idx)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def _segment_dir(self, clip_path: str) -> str:
+        stem = os.path.splitext(os.path.basename(clip_path))[0]
+        return os.path.join(self.folder, stem)
+
+    def add_clip(self, clip_path: str, force: bool = False) -> int:
+        """Cuts a clip if it is new or changed. Returns segments written."""
+        st = os.stat(clip_path)
+        row = self.conn.execute(
+            "SELECT size, mtime FROM sources WHERE clip = ?", (clip_path,)
+        ).fetchone()
+        if row == (st.st_size, st.st_mtime) and not force:
+            return 0
+
+        print("Segmenting:", clip_path)
+        segments = cut_clip_into_segments(clip_path, self._segment_dir(clip_path), self.seg_seconds)
+
+        with self.conn:
+            self.conn.execute("DELETE FROM segments WHERE clip = ?", (clip_path,))
+            self.conn.executemany(
+                "INSERT INTO segments VALUES (?, ?, ?, ?, ?)",
+                [
+                    (clip_path, i, seg["start"], seg["duration"], seg["path"])
+                    for i, seg in enumerate(segments)
+                ],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                (clip_path, st.st_size, st.st_mtime),
+            )
+        return len(segments)
+
+    def segments_for(self, clip_path: str) -> List[str]:
+        """
+        Returns the paths of the clip's full-length segments in order.
+        The trailing partial segment is left out so every run is exact.
+        """
+        min_duration = self.seg_seconds - 0.05
+        return [
+            path for (path,) in self.conn.execute(
+                "SELECT path FROM segments WHERE clip = ? AND duration >= ? ORDER BY idx",
+                (clip_path, min_duration),
+            )
+        ]
+
+    def has_clips(self, clips: List[str]) -> bool:
+        return any(self.segments_for(c) for c in clips)
+
+    def close(self):
+        self.conn.close()
+
+
+def build_segment_pool(
+    clip_folder: str = CLIP_FOLDER,
+    pool: Optional[SegmentPool] = None,
+) -> SegmentPool:
+    """Cuts every catalogued clip that is not yet (or no longer) in the pool."""
+    pool = pool or SegmentPool()
+    catalog = get_catalog(clip_folder)
+
+    written = 0
+    for clip in catalog.list_clips():
+        try:
+            written += pool.add_clip(clip)
+        except subprocess.CalledProcessError as e:
+            print(f"Segmenting failed for {clip}: {e}")
+
+    print(f"Segment pool ready: {written} new segments")
+    return pool
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    build_segment_pool(sys.argv[1] if len(sys.argv) > 1 else CLIP_FOLDER)
@@ -1,30 +1,182 @@
+import re
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
-def select_primary_reference(all_scripts: List[Dict[str, Any]], channel_identity: str):
-    # filter by channel_identity match inside tone_keywords or summary
-    aligned = []
-    identity_lower = channel_identity.lower()
-
-    for r in all_scripts:
-        tone = r.get("tone_keywords", "").lower()
-        summ = r.get("summary", "").lower()
-        if identity_lower in tone or identity_lower in summ:
-            aligned.append(r)
+TOP_K = 20
+TOKEN_RE = re.compile(r"\w+")
 
-    # fallback: top 20 by virality score
-    pool = aligned if aligned else sorted(
-        all_scripts, key=lambda r: r.get("virality_forecast_score", 0), reverse=True
-    )[:20]
 
+def weight(r: Dict[str, Any]) -> float:
     # weighted selection by virality score × (1 / ratio)
-    def weight(r):
-        v = float(r.get("virality_forecast_score", 0))
-        ratio = float(r.get("views_to_likes_ratio", 1))
-        return max(v / (ratio + 1e-6), 0.01)
+    v = float(r.get("virality_forecast_score", 0))
+    ratio = float(r.get("views_to_likes_ratio", 1))
+    return max(v / (ratio + 1e-6), 0.01)
+
+
+# ------------------------------------------------------
+# ALIAS SAMPLER
+# ------------------------------------------------------
+
+class AliasSampler:
+    """
+    Vose's alias method: O(n) setup, O(1) weighted draws. Draws have the
+    same distribution as random.choices(items, weights=weights).
+    """
+
+    def __init__(self, items: List[Any], weights: List[float]):
+        n = len(items)
+        if n == 0:
+            raise ValueError("AliasSampler needs at least one item")
+
+        self.items = items
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to float error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random) -> Any:
+        i = int(rng.random() * len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+# ------------------------------------------------------
+# TEMPLATE INDEX
+# ------------------------------------------------------
+
+class TemplateIndex:
+    """
+    Built once from load_source_scripts().
+
+    - inverted index: token of tone_keywords/summary -> script ids
+    - top-K script ids by virality_forecast_score (the last-resort fallback)
+    - alias samplers over the weight() of each candidate pool, built once
+      per pool and memoized per channel identity
+
+    Matching keeps the original rule: a script is aligned when the lowercased
+    channel identity is a substring of its tone_keywords or summary. The
+    inverted index narrows the candidates to scripts containing every token
+    of the identity, and the substring test runs on those only.
+
+    When nothing matches literally (the usual case for full identity
+    paragraphs), the pool is the top-K most similar scripts from the
+    hashed TF-IDF index in template_retrieval instead of the global top-K.
+    """
+
+    def __init__(self, scripts: List[Dict[str, Any]], top_k: int = TOP_K, use_retrieval: bool = True):
+        self.scripts = scripts
+        self.top_k = top_k
+        self.use_retrieval = use_retrieval
+        self.texts = [
+            (r.get("tone_keywords", "").lower(), r.get("summary", "").lower())
+            for r in scripts
+        ]
+
+        self.postings: Dict[str, set] = {}
+        for i, (tone, summ) in enumerate(self.texts):
+            for token in set(TOKEN_RE.findall(tone)) | set(TOKEN_RE.findall(summ)):
+                self.postings.setdefault(token, set()).add(i)
+
+        ranked = sorted(
+            range(len(scripts)),
+            key=lambda i: scripts[i].get("virality_forecast_score", 0),
+            reverse=True,
+        )
+        self.top_ids = ranked[:top_k]
+        self.top_sampler = self._sampler(self.top_ids) if self.top_ids else None
 
-    return random.choices(pool, weights=[weight(r) for r in pool], k=1)[0]
+        self._aligned: Dict[str, Optional[AliasSampler]] = {}
+
+    def _sampler(self, ids: List[int]) -> AliasSampler:
+        return AliasSampler(ids, [weight(self.scripts[i]) for i in ids])
+
+    def aligned_ids(self, channel_identity: str) -> List[int]:
+        identity_lower = channel_identity.lower()
+        tokens = TOKEN_RE.findall(identity_lower)
+
+        # Tokens at the edges of the identity may be partial words, so only
+        # inner tokens must exist whole; without any, check every script
+        inner = tokens[1:-1]
+        if inner:
+            candidates = set.intersection(*(self.postings.get(t, set()) for t in inner))
+        else:
+            candidates = range(len(self.scripts))
+
+        return sorted(
+            i for i in candidates
+            if identity_lower in self.texts[i][0] or identity_lower in self.texts[i][1]
+        )
+
+    def retrieved_ids(self, channel_identity: str) -> List[int]:
+        """Top-K scripts by TF-IDF cosine similarity to the identity."""
+        from scripts.template_retrieval import get_retrieval_index
+
+        index, _ = get_retrieval_index("source_scripts", self.scripts)
+        ids, scores = index.search([channel_identity], self.top_k)
+        return [int(i) for i, score in zip(ids[0], scores[0]) if score > 0]
+
+    def primary_sampler(self, channel_identity: str) -> Optional[AliasSampler]:
+        if channel_identity not in self._aligned:
+            ids = self.aligned_ids(channel_identity)
+            if not ids and self.use_retrieval and channel_identity.strip():
+                ids = self.retrieved_ids(channel_identity)
+            self._aligned[channel_identity] = self._sampler(ids) if ids else None
+        return self._aligned[channel_identity] or self.top_sampler
+
+    def select_primary(self, channel_identity: str, rng=random) -> Dict[str, Any]:
+        sampler = self.primary_sampler(channel_identity)
+        if sampler is None:
+            raise RuntimeError("No source scripts to select from.")
+        return self.scripts[sampler.sample(rng)]
+
+    def select_supporting(self, count: int = 3, rng=random) -> List[Dict[str, Any]]:
+        if len(self.scripts) <= count:
+            return self.scripts
+        return rng.sample(self.scripts, count)
+
+    def select_references(self, channel_identity: str, rng=random):
+        return self.select_primary(channel_identity, rng), self.select_supporting(3, rng)
+
+
+_index: Optional[TemplateIndex] = None
+
+
+def get_template_index(all_scripts: Optional[List[Dict[str, Any]]] = None) -> TemplateIndex:
+    """
+    Process-wide index. Rebuilt only when a different script list is passed;
+    with no argument it is built from load_source_scripts() on first use.
+    """
+    global _index
+    if all_scripts is None:
+        if _index is None:
+            from scripts.source_script_loader import load_source_scripts
+            _index = TemplateIndex(load_source_scripts())
+    elif _index is None or _index.scripts is not all_scripts:
+        _index = TemplateIndex(all_scripts)
+    return _index
+
+
+# ------------------------------------------------------
+# SELECTION
+# ------------------------------------------------------
+
+def select_primary_reference(all_scripts: List[Dict[str, Any]], channel_identity: str):
+    # aligned by channel_identity in tone_keywords or summary, else the
+    # 20 most similar scripts, else top 20 by virality score;
+    # weighted by virality × (1 / ratio)
+    return get_template_index(all_scripts).select_primary(channel_identity)
 
 
 def select_supporting_references(all_scripts: List[Dict[str, Any]], count=3):
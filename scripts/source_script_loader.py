@@ -1,8 +1,8 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import unicodedata
 
+from scripts.utils.sheets_cache import get_table
+
 
 def normalize(v: Any) -> str:
     if v is None:
@@ -14,22 +14,20 @@ def normalize(v: Any) -> str:
     return v.strip()
 
 
-def get_client():
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets.readonly",
-        "https://www.googleapis.com/auth/drive.readonly",
-    ]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(
-        "config/service_account.json", scope
-    )
-    return gspread.authorize(creds)
+# (raw sheet rows, cleaned rows) of the last load
+_loaded: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = None
 
 
 def load_source_scripts() -> List[Dict[str, Any]]:
-    gc = get_client()
-    sheet = gc.open("story-generator")
-    ws = sheet.worksheet("source_scripts")
-    rows = ws.get_all_records()
+    """
+    Cleaned source_scripts rows. The same list is returned until the sheet
+    snapshot changes, so the template and retrieval indexes built on it are
+    reused across selections; treat it as read-only.
+    """
+    global _loaded
+    rows = get_table("source_scripts")
+    if _loaded is not None and _loaded[0] is rows:
+        return _loaded[1]
 
     cleaned = []
     for r in rows:
@@ -48,4 +46,8 @@ def load_source_scripts() -> List[Dict[str, Any]]:
 
         cleaned.append(out)
 
+    # Backup CSVs are re-read into new lists; unchanged content keeps the old one
+    if _loaded is not None and _loaded[1] == cleaned:
+        cleaned = _loaded[1]
+    _loaded = (rows, cleaned)
     return cleaned
@@ -0,0 +1,206 @@
+"""
+Story Dedup - MinHash/LSH index of every story the pipeline has accepted.
+
+A story (plus its hook) is reduced to word 5-gram shingles and a 128-value
+MinHash signature. Signatures are split into LSH bands whose hashes are kept
+in SQLite with an index, so finding near-duplicates is one indexed lookup
+per band no matter how many past stories there are. Candidates are then
+confirmed with the signature's estimated Jaccard similarity.
+
+    python -m scripts.story_dedup          # index stats
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+INDEX_PATH = "data/story_index.sqlite"
+NUM_PERM = 128
+BANDS = 16               # 16 bands x 8 rows: candidate threshold ~0.71
+SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.8
+
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1729)   # fixed: signatures must be stable across runs
+_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+class DuplicateStoryError(RuntimeError):
+    """Raised when no sufficiently new story could be generated."""
+
+
+# ------------------------------------------------------
+# SIGNATURES
+# ------------------------------------------------------
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature (uint32) of the text's shingles."""
+    sh = shingles(text)
+    if sh.size == 0:
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    # (a*x + b) mod p for every permutation/shingle pair in one operation.
+    # a spans the full field so small shingle hashes are not favoured; the
+    # uint64 product wraps, which only adds mixing
+    hashed = (np.outer(_A, sh) + _B[:, None]) % _PRIME
+    return (hashed.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def _band_keys(sig: np.ndarray, bands: int = BANDS) -> List[int]:
+    rows = len(sig) // bands
+    keys = []
+    for b in range(bands):
+        digest = hashlib.blake2b(sig[b * rows:(b + 1) * rows].tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def story_text(story: str, hook: str = "") -> str:
+    return f"{hook}\n{story}" if hook else story
+
+
+# ------------------------------------------------------
+# INDEX
+# ------------------------------------------------------
+
+class StoryIndex:
+    """Persistent LSH index. Safe to share between threads and processes."""
+
+    def __init__(self, db_path: str = INDEX_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode: check_and_add opens its transaction explicitly
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS stories (
+                id         INTEGER PRIMARY KEY,
+                run_id     TEXT NOT NULL,
+                channel_id TEXT NOT NULL,
+                created    REAL NOT NULL,
+                signature  BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band     INTEGER NOT NULL,
+                key      INTEGER NOT NULL,
+                story_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, key);
+            """
+        )
+
+    def _query(self, sig: np.ndarray, threshold: float) -> List[Tuple[str, float]]:
+        candidates = set()
+        for band, key in enumerate(_band_keys(sig)):
+            for (story_id,) in self.conn.execute(
+                "SELECT story_id FROM bands WHERE band = ? AND key = ?", (band, key)
+            ):
+                candidates.add(story_id)
+
+        matches = []
+        for story_id in candidates:
+            run_id, blob = self.conn.execute(
+                "SELECT run_id, signature FROM stories WHERE id = ?", (story_id,)
+            ).fetchone()
+            sim = similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+            if sim >= threshold:
+                matches.append((run_id, sim))
+        return sorted(matches, key=lambda m: -m[1])
+
+    def _add(self, sig: np.ndarray, run_id: str, channel_id: str):
+        # Runs inside the caller's transaction
+        cur = self.conn.execute(
+            "INSERT INTO stories (run_id, channel_id, created, signature) VALUES (?, ?, ?, ?)",
+            (run_id, channel_id, time.time(), sig.tobytes()),
+        )
+        self.conn.executemany(
+            "INSERT INTO bands VALUES (?, ?, ?)",
+            [(band, key, cur.lastrowid) for band, key in enumerate(_band_keys(sig))],
+        )
+
+    def find_similar(self, text: str, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+        """[(run_id, similarity)] of past stories at or above threshold, best first."""
+        sig = minhash(text)
+        with self._lock:
+            return self._query(sig, threshold)
+
+    def check_and_add(
+        self,
+        text: str,
+        run_id: str,
+        channel_id: str = "",
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Atomically checks a story and records it if it is new.
+        Returns the closest (run_id, similarity) duplicate, or None if added.
+
+        The lookup and the insert share one BEGIN IMMEDIATE transaction, so
+        two processes (e.g. queue workers) can't both accept the same story.
+        """
+        sig = minhash(text)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                matches = self._query(sig, threshold)
+                if not matches:
+                    self._add(sig, run_id, channel_id)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return matches[0] if matches else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+_index: Optional[StoryIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_story_index(db_path: str = INDEX_PATH) -> StoryIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = StoryIndex(db_path)
+        return _index
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    index = StoryIndex(sys.argv[1] if len(sys.argv) > 1 else INDEX_PATH)
+    print(f"Story index: {index.db_path} ({index.count()} stories)")
@@ -0,0 +1,153 @@
+"""
+Story Features - One-pass keyword classifier shared by voice, TTS style and
+music tone selection.
+
+All cue lists live here and are compiled once into a single trie-shaped
+regex. A story is lowercased and scanned once; the result carries inferred
+gender, tone, TTS instruction category and per-cue hit counts. Matching keeps
+the old `cue in text` substring semantics (cues inside longer words and
+overlapping cues both count), so every module classifies a story the same way.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+# ------------------------------------------------------
+# CUES
+# ------------------------------------------------------
+
+MALE_CUES = ["as a guy", "i'm a guy", "my girlfriend", "my wife", "as a husband", "my son"]
+FEMALE_CUES = ["as a girl", "i'm a girl", "my boyfriend", "my husband", "as a wife", "my daughter"]
+
+# Tone cues (checked in this order: dark, fun, warm)
+TONE_CUES = {
+    "dark": ["terrified", "panicked", "breaking down", "trauma", "stalking", "creepy", "dark", "anxiety", "horror", "scared"],
+    "fun": ["funniest", "laughing", "joked", "ridiculous", "couldn't stop laughing", "hilarious", "funny", "comedy"],
+    "warm": ["heartwarming", "kind", "gentle", "sweet", "wholesome", "grateful", "comforting", "touching", "emotional"],
+}
+
+# TTS delivery categories (first match wins) and their instruction text
+INSTRUCTION_RULES: List[Tuple[str, List[str], str]] = [
+    ("suspense", ["camping", "stalking", "creepy", "we need to leave", "gut feeling"],
+     "Tell this like a suspenseful but grounded story, with calm intensity."),
+    ("sarcastic", ["mother-in-law", "karen", "wedding", "family drama"],
+     "Tell this with calm, slightly sarcastic humor."),
+    ("playful", ["kid", "my son", "my daughter", "toddler", "classroom"],
+     "Tell this with light, playful energy."),
+    ("gentle", ["terminal", "cancer", "last time", "funeral"],
+     "Tell this slowly and gently, with empathy."),
+]
+DEFAULT_INSTRUCTION = ("default", "Tell this like a natural Reddit story narration, casual and conversational.")
+
+INSTRUCTIONS = {cat: text for cat, _, text in INSTRUCTION_RULES}
+INSTRUCTIONS[DEFAULT_INSTRUCTION[0]] = DEFAULT_INSTRUCTION[1]
+
+
+# ------------------------------------------------------
+# MATCHER
+# ------------------------------------------------------
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Builds a regex equivalent to `w1|w2|...` but factored as a trie, so each
+    text position costs one branch per character instead of one per cue.
+    Optional tails are greedy, so the longest cue at a position wins.
+    """
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if ends_here else body
+
+    return build(trie)
+
+
+class CueMatcher:
+    """Counts occurrences of every cue in a single regex pass."""
+
+    def __init__(self, cues: List[str]):
+        self.cues = sorted(set(cues))
+        # Zero-width lookahead so overlapping cues are all seen; the
+        # first-character class rejects most positions cheaply
+        first_chars = re.escape("".join(sorted({c[0] for c in self.cues})))
+        self.regex = re.compile(f"(?=[{first_chars}])(?=({_trie_pattern(self.cues)}))")
+        # The regex reports the longest cue at each position; any shorter
+        # cue that is a prefix of it matched there as well
+        self.prefixes = {
+            cue: [other for other in self.cues if other != cue and cue.startswith(other)]
+            for cue in self.cues
+        }
+
+    def count(self, text_lower: str) -> Counter:
+        hits = Counter()
+        for m in self.regex.finditer(text_lower):
+            cue = m.group(1)
+            hits[cue] += 1
+            for p in self.prefixes[cue]:
+                hits[p] += 1
+        return hits
+
+
+_ALL_CUES = (
+    MALE_CUES
+    + FEMALE_CUES
+    + [c for cues in TONE_CUES.values() for c in cues]
+    + [c for _, cues, _ in INSTRUCTION_RULES for c in cues]
+)
+MATCHER = CueMatcher(_ALL_CUES)
+
+
+# ------------------------------------------------------
+# FEATURES
+# ------------------------------------------------------
+
+@dataclass(frozen=True)
+class StoryFeatures:
+    gender: str                  # 'male', 'female' or 'neutral'
+    tone: str                    # 'dark', 'fun', 'warm' or 'neutral'
+    instruction_category: str    # key into INSTRUCTIONS
+    hits: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def instructions(self) -> str:
+        return INSTRUCTIONS[self.instruction_category]
+
+    def group_hits(self, cues: List[str]) -> int:
+        return sum(self.hits.get(c, 0) for c in cues)
+
+
+def _first_group(hits: Counter, groups, default: str) -> str:
+    for name, cues in groups:
+        if any(hits.get(c) for c in cues):
+            return name
+    return default
+
+
+@lru_cache(maxsize=256)
+def extract_story_features(story_text: str) -> StoryFeatures:
+    """
+    Scans the story once and classifies it. Cached, so the voice, TTS-style
+    and music selectors share one scan per story.
+    """
+    hits = MATCHER.count(story_text.lower())
+
+    gender = _first_group(hits, [("male", MALE_CUES), ("female", FEMALE_CUES)], "neutral")
+    tone = _first_group(hits, TONE_CUES.items(), "neutral")
+    category = _first_group(
+        hits, [(cat, cues) for cat, cues, _ in INSTRUCTION_RULES], DEFAULT_INSTRUCTION[0]
+    )
+
+    return StoryFeatures(gender=gender, tone=tone, instruction_category=category, hits=dict(hits))
@@ -1,13 +1,9 @@
 import random
 from typing import List, Dict, Any
 
-from openai import OpenAI
-
 from scripts.source_script_loader import load_source_scripts
 from scripts.source_script_index import select_references
 
-client = OpenAI()
-
 # ---------------- CONFIG ----------------
 
 MIN_WORDS = 400
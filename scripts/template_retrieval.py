@@ -0,0 +1,256 @@
+"""
+Template Retrieval - Offline similarity search over viral templates.
+
+Rows of source_scripts, story_blueprints and hook_patterns are embedded with
+hashed TF-IDF (unigrams + bigrams, signed feature hashing, L2-normalized).
+The vectors are stored per table as a float32 matrix in cache/templates/
+and memory-mapped, so opening an index costs nothing. A batch of channel
+profiles is matched with one matrix product and argpartition top-k. No
+network and no model download are needed.
+
+An index is rebuilt only when the text of its table changes.
+
+    python -m scripts.template_retrieval                 # build all indexes
+    python -m scripts.template_retrieval reddit_karma_files
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scripts.utils.sheets_cache import get_table
+
+
+INDEX_DIR = "cache/templates"
+DIM = 2048
+ROW_CHUNK = 65536       # rows scored per matmul, bounds memory on huge tables
+FORMAT_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Columns embedded per table
+TABLE_FIELDS = {
+    "source_scripts": [
+        "title", "summary", "key_hook", "tone_keywords", "story_arc_type",
+        "emotional_payoff", "delivery_style", "archetype_tag", "Content_Category",
+        "comment_emotion_type",
+    ],
+    "story_blueprints": [
+        "title", "archetype_tag", "tone_keywords", "story_arc_type",
+        "emotional_payoff", "delivery_style", "most_similar_channel",
+    ],
+    "hook_patterns": [
+        "title", "story_type", "tone_keywords", "most_similar_channel",
+    ],
+}
+
+# channels.csv columns that make up a channel's query profile
+CHANNEL_FIELDS = [
+    "channel_identity", "tone_style", "core_emotions", "primary_story_arcs",
+    "content_category", "target_audience", "example_video_concepts",
+]
+
+
+# ------------------------------------------------------
+# EMBEDDING
+# ------------------------------------------------------
+
+def tokenize(text: str) -> List[str]:
+    words = TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _bucket(token: str, dim: int) -> Tuple[int, float]:
+    # crc32 is stable across processes (unlike hash()); the top bit picks
+    # the sign so colliding features tend to cancel instead of pile up
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+
+def term_counts(texts: List[str], dim: int = DIM) -> np.ndarray:
+    """Signed hashed term counts, one row per text."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for token in tokenize(text):
+            b, sign = _bucket(token, dim)
+            out[i, b] += sign
+    return out
+
+
+def compute_idf(counts: np.ndarray) -> np.ndarray:
+    df = np.count_nonzero(counts, axis=0)
+    n = counts.shape[0]
+    return (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+
+
+def embed(counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Sublinear TF × IDF, L2-normalized rows."""
+    tf = np.sign(counts) * np.log1p(np.abs(counts))
+    vecs = tf * idf
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vecs / norms).astype(np.float32)
+
+
+# ------------------------------------------------------
+# INDEX
+# ------------------------------------------------------
+
+def row_text(row: Dict, fields: List[str]) -> str:
+    return " ".join(str(row.get(f) or "") for f in fields)
+
+
+class RetrievalIndex:
+    """Memory-mapped embedding matrix for one table."""
+
+    def __init__(self, name: str, texts: List[str], dim: int = DIM, index_dir: str = INDEX_DIR):
+        self.name = name
+        self.dim = dim
+        self.matrix_path = os.path.join(index_dir, f"{name}.f32")
+        self.meta_path = os.path.join(index_dir, f"{name}.json")
+
+        fingerprint = hashlib.sha1(
+            json.dumps([FORMAT_VERSION, dim, texts], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+        meta = self._read_meta()
+        if meta is None or meta.get("fingerprint") != fingerprint:
+            meta = self._build(texts, fingerprint, index_dir)
+
+        self.rows = meta["rows"]
+        self.idf = np.asarray(meta["idf"], dtype=np.float32)
+        self.matrix = (
+            np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(self.rows, dim))
+            if self.rows else np.zeros((0, dim), dtype=np.float32)
+        )
+
+    def _read_meta(self) -> Optional[Dict]:
+        if not (os.path.isfile(self.meta_path) and os.path.isfile(self.matrix_path)):
+            return None
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _build(self, texts: List[str], fingerprint: str, index_dir: str) -> Dict:
+        print(f"Building retrieval index '{self.name}' ({len(texts)} rows)...")
+        os.makedirs(index_dir, exist_ok=True)
+
+        counts = term_counts(texts, self.dim)
+        idf = compute_idf(counts) if len(texts) else np.ones(self.dim, dtype=np.float32)
+
+        tmp = f"{self.matrix_path}.{os.getpid()}.tmp"
+        embed(counts, idf).tofile(tmp)
+        os.replace(tmp, self.matrix_path)
+
+        meta = {"fingerprint": fingerprint, "rows": len(texts), "dim": self.dim, "idf": idf.tolist()}
+        tmp = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+        return meta
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        return embed(term_counts(queries, self.dim), self.idf)
+
+    def search(self, queries: List[str], k: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched top-k cosine search.
+        Returns (ids, scores), each (len(queries), min(k, rows)), best first.
+        """
+        k = min(k, self.rows)
+        if k == 0 or not queries:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+
+        q = self.embed_queries(queries)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+
+        # Score the matrix in row chunks and keep a running top-k
+        for start in range(0, self.rows, ROW_CHUNK):
+            block = np.asarray(self.matrix[start:start + ROW_CHUNK])
+            scores = q @ block.T
+            kk = min(k, scores.shape[1])
+            part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            best_ids = np.concatenate([best_ids, part + start], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            if best_ids.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_ids = np.take_along_axis(best_ids, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+_indexes: Dict[str, Tuple[RetrievalIndex, List[Dict]]] = {}
+
+
+def _table_rows(name: str) -> List[Dict]:
+    if name == "source_scripts":
+        from scripts.source_script_loader import load_source_scripts
+        return load_source_scripts()
+    return get_table(name)
+
+
+def get_retrieval_index(name: str, rows: Optional[List[Dict]] = None) -> Tuple[RetrievalIndex, List[Dict]]:
+    """
+    Process-wide (index, rows) for a table. Pass rows to index an already
+    loaded list (rebuilt when a different list is passed).
+    """
+    cached = _indexes.get(name)
+    if cached is not None and (rows is None or cached[1] is rows):
+        return cached
+
+    rows = _table_rows(name) if rows is None else rows
+    texts = [row_text(r, TABLE_FIELDS[name]) for r in rows]
+    _indexes[name] = (RetrievalIndex(name, texts), rows)
+    return _indexes[name]
+
+
+# ------------------------------------------------------
+# CHANNEL MATCHING
+# ------------------------------------------------------
+
+def channel_profile(channel_id: str) -> str:
+    """Query text for a channel: its identity plus tone/emotion columns."""
+    for row in get_table("channels"):
+        if str(row.get("channel_id", "")).strip() == channel_id:
+            return row_text(row, CHANNEL_FIELDS)
+    return channel_id
+
+
+def retrieve(name: str, queries: List[str], k: int = 20, rows: Optional[List[Dict]] = None) -> List[List[Tuple[Dict, float]]]:
+    """For each query, the top-k [(row, score)] of a table with score > 0."""
+    index, rows = get_retrieval_index(name, rows)
+    ids, scores = index.search(queries, k)
+    return [
+        [(rows[i], float(s)) for i, s in zip(row_ids, row_scores) if s > 0]
+        for row_ids, row_scores in zip(ids, scores)
+    ]
+
+
+def retrieve_for_channel(channel_id: str, k: int = 20) -> Dict[str, List[Tuple[Dict, float]]]:
+    """Top-k source scripts, blueprints and hook patterns for one channel."""
+    query = channel_profile(channel_id)
+    return {name: retrieve(name, [query], k)[0] for name in TABLE_FIELDS}
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for name, hits in retrieve_for_channel(sys.argv[1], k=5).items():
+            print(f"\n{name}:")
+            for row, score in hits:
+                print(f"  {score:.3f}  {str(row.get('title', ''))[:90]}")
+    else:
+        for name in TABLE_FIELDS:
+            index, rows = get_retrieval_index(name)
+            print(f"{name}: {index.rows} rows x {index.dim} -> {index.matrix_path}")
@@ -0,0 +1,37 @@
+"""
+Environment helpers: .env loading and lazily constructed API clients.
+
+Nothing here imports an SDK at module import time, so the scheduler,
+ffmpeg builder and other utility commands start without paying for
+openai/dotenv imports or client setup.
+"""
+
+import threading
+
+_env_loaded = False
+_openai_client = None
+_lock = threading.Lock()
+
+
+def load_env():
+    """Loads .env into os.environ once per process."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+def get_openai_client():
+    """Shared OpenAI client, created on first use."""
+    global _openai_client
+    if _openai_client is None:
+        load_env()
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI()
+    return _openai_client
@@ -4,7 +4,7 @@ import sys
 from datetime import datetime
 
 def setup_logger(name, log_file=None, level=logging.INFO):
-    \"\"\"Set up logger with file and console handlers\"\"\"
+    """Set up logger with file and console handlers (safe to call repeatedly)"""
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
@@ -12,15 +12,21 @@ def setup_logger(name, log_file=None, level=logging.INFO):
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # Console handler (added once per logger)
+    if not any(getattr(h, "_pipeline_console", False) for h in logger.handlers):
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        console_handler._pipeline_console = True
+        logger.addHandler(console_handler)
 
-    # File handler (optional)
+    # File handler (optional, added once per file)
     if log_file:
+        existing = {getattr(h, "baseFilename", None) for h in logger.handlers}
         file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        if file_handler.baseFilename in existing:
+            file_handler.close()
+        else:
+            file_handler.setFormatter(formatter)
+            logger.addHandler(file_handler)
 
     return logger
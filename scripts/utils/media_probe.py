@@ -0,0 +1,545 @@
+"""
+Media Probe - Duration, stream info and keyframes read straight from file headers.
+
+MP4/MOV (moov: mvhd, mdhd, hdlr, stsd, stts, ctts, stss, elst), MP3
+(frame header plus Xing/Info or VBRI, CBR estimate otherwise) and WAV
+(RIFF fmt/data) are parsed in process from a memory-mapped file, so
+probing costs a few page reads instead of an ffprobe process. Anything
+else (fragmented MP4, ADTS AAC, Ogg, RF64, ...) falls back to ffprobe.
+
+    python -m scripts.utils.media_probe <file> [--keyframes]
+"""
+
+import os
+import sys
+import mmap
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+class UnsupportedMedia(Exception):
+    """The in-process parser can't read this file; ffprobe should."""
+
+
+# ------------------------------------------------------
+# DATA
+# ------------------------------------------------------
+
+@dataclass
+class StreamInfo:
+    kind: str                   # "video" or "audio"
+    codec: str                  # ffprobe codec_name where known
+    duration: float = 0.0
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0            # average frame rate
+    sample_rate: int = 0
+    channels: int = 0
+    keyframes: List[float] = field(default_factory=list)   # pts seconds, video only
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    format: str                 # "mp4", "mp3", "wav" or ffprobe's format_name
+    duration: float
+    streams: List[StreamInfo] = field(default_factory=list)
+
+    def first(self, kind: str) -> Optional[StreamInfo]:
+        for s in self.streams:
+            if s.kind == kind:
+                return s
+        return None
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        return self.first("video")
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        return self.first("audio")
+
+
+# ------------------------------------------------------
+# MP4
+# ------------------------------------------------------
+
+# sample entry fourcc -> ffprobe codec_name
+MP4_CODECS = {
+    "avc1": "h264", "avc3": "h264",
+    "hvc1": "hevc", "hev1": "hevc",
+    "vp09": "vp9", "av01": "av1",
+    "mp4v": "mpeg4", "mp4a": "aac",
+    ".mp3": "mp3", "Opus": "opus",
+    "ac-3": "ac3", "ec-3": "eac3",
+    "alac": "alac", "fLaC": "flac",
+}
+
+CONTAINER_BOXES = {"moov", "trak", "mdia", "minf", "stbl", "edts"}
+
+
+def _boxes(buf, start: int, end: int):
+    """Yields (type, payload_start, box_end) for the boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise UnsupportedMedia("truncated box header")
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise UnsupportedMedia(f"bad box size at offset {pos}")
+        yield kind.decode("latin-1"), pos + header, pos + size
+        pos += size
+
+
+def _find(buf, start: int, end: int, kind: str):
+    for k, s, e in _boxes(buf, start, end):
+        if k == kind:
+            return s, e
+    return None
+
+
+def _children(buf, start: int, end: int) -> Dict[str, tuple]:
+    """First box of each type under a container; nested containers flattened."""
+    out = {}
+    for kind, s, e in _boxes(buf, start, end):
+        out.setdefault(kind, (s, e))
+        if kind in CONTAINER_BOXES:
+            for sub, span in _children(buf, s, e).items():
+                out.setdefault(sub, span)
+    return out
+
+
+def _full_box(buf, span) -> tuple:
+    """(version, payload_start) of a full box."""
+    return buf[span[0]], span[0] + 4
+
+
+def _pairs(buf, span) -> List[tuple]:
+    """The (count, value) entry table of an stts/ctts box."""
+    version, pos = _full_box(buf, span)
+    n = struct.unpack_from(">I", buf, pos)[0]
+    # ctts v1 offsets are signed; v0 offsets are read signed too, as ffmpeg does
+    flat = struct.unpack_from(f">{2 * n}i", buf, pos + 4)
+    return list(zip(flat[0::2], flat[1::2]))
+
+
+def _edit_shift(buf, span, movie_scale: int, media_scale: int) -> float:
+    """Seconds added to media pts by the edit list (empty edits minus media_time)."""
+    version, pos = _full_box(buf, span)
+    n = struct.unpack_from(">I", buf, pos)[0]
+    pos += 4
+    shift = 0.0
+    for _ in range(n):
+        if version == 1:
+            seg_duration, media_time = struct.unpack_from(">Qq", buf, pos)
+            pos += 20
+        else:
+            seg_duration, media_time = struct.unpack_from(">Ii", buf, pos)
+            pos += 12
+        if media_time == -1:
+            shift += seg_duration / float(movie_scale or 1)
+            continue
+        return shift - media_time / float(media_scale or 1)
+    return shift
+
+
+def _keyframe_times(buf, stbl: Dict[str, tuple], timescale: int, shift: float) -> List[float]:
+    stts = _pairs(buf, stbl["stts"])
+    ctts = _pairs(buf, stbl["ctts"]) if "ctts" in stbl else []
+
+    if "stss" in stbl:
+        _, pos = _full_box(buf, stbl["stss"])
+        n = struct.unpack_from(">I", buf, pos)[0]
+        sync = sorted(struct.unpack_from(f">{n}I", buf, pos + 4))
+    else:
+        # No sync table: every sample is a keyframe
+        sync = range(1, sum(count for count, _ in stts) + 1)
+
+    # Walk both run-length tables alongside the sorted sample numbers
+    times = []
+    t_idx = c_idx = 0
+    t_first, t_dts = 1, 0          # first sample number / dts of the current stts run
+    c_first = 1
+    for sample in sync:
+        while t_idx < len(stts) and sample >= t_first + stts[t_idx][0]:
+            t_dts += stts[t_idx][0] * stts[t_idx][1]
+            t_first += stts[t_idx][0]
+            t_idx += 1
+        if t_idx >= len(stts):
+            break
+        dts = t_dts + (sample - t_first) * stts[t_idx][1]
+
+        offset = 0
+        while c_idx < len(ctts) and sample >= c_first + ctts[c_idx][0]:
+            c_first += ctts[c_idx][0]
+            c_idx += 1
+        if c_idx < len(ctts):
+            offset = ctts[c_idx][1]
+
+        times.append(round((dts + offset) / float(timescale) + shift, 6))
+    return times
+
+
+def _mp4_track(buf, trak, movie_scale: int, keyframes: bool) -> Optional[StreamInfo]:
+    boxes = _children(buf, *trak)
+    if not {"mdhd", "hdlr", "stsd", "stts"} <= boxes.keys():
+        return None
+
+    handler = bytes(buf[boxes["hdlr"][0] + 8:boxes["hdlr"][0] + 12]).decode("latin-1")
+    kind = {"vide": "video", "soun": "audio"}.get(handler)
+    if kind is None:
+        return None
+
+    version, pos = _full_box(buf, boxes["mdhd"])
+    if version == 1:
+        timescale, duration = struct.unpack_from(">IQ", buf, pos + 16)
+    else:
+        timescale, duration = struct.unpack_from(">II", buf, pos + 8)
+    if not timescale:
+        raise UnsupportedMedia("track without a timescale")
+
+    # First sample description: 4 (count) + size(4) + fourcc(4) + 6 reserved + 2 ref index
+    _, pos = _full_box(buf, boxes["stsd"])
+    fourcc = bytes(buf[pos + 8:pos + 12]).decode("latin-1")
+    entry = pos + 4 + 16
+    stream = StreamInfo(kind=kind, codec=MP4_CODECS.get(fourcc, fourcc), duration=duration / float(timescale))
+
+    stts = _pairs(buf, boxes["stts"])
+    samples = sum(count for count, _ in stts)
+    ticks = sum(count * delta for count, delta in stts)
+
+    if kind == "video":
+        stream.width, stream.height = struct.unpack_from(">HH", buf, entry + 16)
+        stream.fps = samples * timescale / float(ticks) if ticks else 0.0
+        if keyframes:
+            shift = _edit_shift(buf, boxes["elst"], movie_scale, timescale) if "elst" in boxes else 0.0
+            stream.keyframes = _keyframe_times(buf, boxes, timescale, shift)
+    else:
+        stream.channels = struct.unpack_from(">H", buf, entry + 8)[0]
+        stream.sample_rate = struct.unpack_from(">I", buf, entry + 16)[0] >> 16
+        if stream.sample_rate == 0 or timescale > 0xFFFF:
+            # The entry's 16.16 rate field can't hold 96k; the media
+            # timescale is the sample rate in audio tracks ffmpeg writes
+            stream.sample_rate = timescale
+    return stream
+
+
+def _probe_mp4(buf, path: str, keyframes: bool) -> MediaInfo:
+    moov = _find(buf, 0, len(buf), "moov")
+    if moov is None:
+        raise UnsupportedMedia("no moov box")
+    if _find(buf, *moov, "mvex") is not None:
+        raise UnsupportedMedia("fragmented MP4")
+
+    mvhd = _find(buf, *moov, "mvhd")
+    if mvhd is None:
+        raise UnsupportedMedia("no mvhd box")
+    version, pos = _full_box(buf, mvhd)
+    if version == 1:
+        movie_scale, movie_duration = struct.unpack_from(">IQ", buf, pos + 16)
+    else:
+        movie_scale, movie_duration = struct.unpack_from(">II", buf, pos + 8)
+
+    streams = []
+    for kind, s, e in _boxes(buf, *moov):
+        if kind == "trak":
+            track = _mp4_track(buf, (s, e), movie_scale, keyframes)
+            if track is not None:
+                streams.append(track)
+
+    duration = movie_duration / float(movie_scale) if movie_scale else 0.0
+    if not duration and streams:
+        duration = max(s.duration for s in streams)
+    return MediaInfo(path=path, format="mp4", duration=duration, streams=streams)
+
+
+# ------------------------------------------------------
+# MP3
+# ------------------------------------------------------
+
+# Bitrates (kbps) by [MPEG-1?][layer][index]
+MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MP3_CODECS = {1: "mp1", 2: "mp2", 3: "mp3"}
+
+
+def _mp3_header(buf, pos: int) -> Optional[dict]:
+    if pos + 4 > len(buf):
+        return None
+    h = struct.unpack_from(">I", buf, pos)[0]
+    if (h >> 21) & 0x7FF != 0x7FF:
+        return None
+    version = (h >> 19) & 3          # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((h >> 17) & 3)      # 1, 2, 3
+    bitrate_idx = (h >> 12) & 0xF
+    rate_idx = (h >> 10) & 3
+    if version == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_idx] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_idx]
+    padding = (h >> 9) & 1
+    mono = ((h >> 6) & 3) == 3
+
+    if layer == 1:
+        spf = 384
+        size = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        spf = 1152 if (layer == 2 or mpeg1) else 576
+        size = spf // 8 * bitrate // sample_rate + padding
+    return {
+        "mpeg1": mpeg1, "layer": layer, "bitrate": bitrate, "sample_rate": sample_rate,
+        "channels": 1 if mono else 2, "spf": spf, "size": size,
+    }
+
+
+def _probe_mp3(buf, path: str) -> MediaInfo:
+    start = 0
+    if bytes(buf[:3]) == b"ID3" and len(buf) >= 10:
+        size = buf[6] << 21 | buf[7] << 14 | buf[8] << 7 | buf[9]
+        start = 10 + size + (10 if buf[5] & 0x10 else 0)
+    end = len(buf) - (128 if bytes(buf[-128:-125]) == b"TAG" else 0)
+
+    # First frame whose successor also lines up, so stray sync bytes are skipped
+    pos = start
+    limit = min(end, start + 65536)
+    frame = None
+    while pos < limit:
+        pos = buf.find(b"\xff", pos, limit)
+        if pos < 0:
+            break
+        frame = _mp3_header(buf, pos)
+        if frame and (pos + frame["size"] >= end or _mp3_header(buf, pos + frame["size"])):
+            break
+        frame = None
+        pos += 1
+    if frame is None:
+        raise UnsupportedMedia("no MPEG audio frame")
+
+    rate, spf = frame["sample_rate"], frame["spf"]
+    stream = StreamInfo(
+        kind="audio", codec=MP3_CODECS[frame["layer"]],
+        sample_rate=rate, channels=frame["channels"],
+    )
+
+    # Xing/Info sits after the side info of the first frame, VBRI 32 bytes in
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["mpeg1"] else (17 if frame["channels"] == 2 else 9)
+    xing = pos + 4 + side_info
+    frames = None
+    if bytes(buf[xing:xing + 4]) in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", buf, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", buf, xing + 8)[0]
+    elif bytes(buf[pos + 36:pos + 40]) == b"VBRI":
+        frames = struct.unpack_from(">I", buf, pos + 36 + 14)[0]
+
+    if frames:
+        stream.duration = frames * spf / float(rate)
+    else:
+        # CBR: the audio bytes at the first frame's bitrate, as ffmpeg estimates it
+        stream.duration = (end - pos) * 8.0 / frame["bitrate"]
+    return MediaInfo(path=path, format="mp3", duration=stream.duration, streams=[stream])
+
+
+# ------------------------------------------------------
+# WAV
+# ------------------------------------------------------
+
+WAV_FORMATS = {1: "pcm", 3: "pcm_f", 6: "pcm_alaw", 7: "pcm_mulaw"}
+
+
+def _wav_codec(fmt: int, bits: int) -> str:
+    if fmt == 1:
+        return "pcm_u8" if bits == 8 else f"pcm_s{bits}le"
+    if fmt == 3:
+        return f"pcm_f{bits}le"
+    return WAV_FORMATS.get(fmt, f"wav_0x{fmt:04x}")
+
+
+def _probe_wav(buf, path: str) -> MediaInfo:
+    pos = 12
+    fmt = None
+    data_size = None
+    while pos + 8 <= len(buf):
+        kind, size = struct.unpack_from("<4sI", buf, pos)
+        body = pos + 8
+        if kind == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", buf, body)
+            if fmt[0] == 0xFFFE and size >= 40:
+                # WAVE_FORMAT_EXTENSIBLE: the real format leads the subformat GUID
+                fmt = (struct.unpack_from("<H", buf, body + 24)[0],) + fmt[1:]
+        elif kind == b"data":
+            # Streamed writers leave the size at 0 or 0xFFFFFFFF
+            data_size = min(size, len(buf) - body) if size else len(buf) - body
+            break
+        pos = body + size + (size & 1)
+
+    if fmt is None or data_size is None:
+        raise UnsupportedMedia("WAV without fmt/data chunks")
+
+    codec, channels, sample_rate, byte_rate, _, bits = fmt
+    if not byte_rate:
+        raise UnsupportedMedia("WAV without a byte rate")
+    stream = StreamInfo(
+        kind="audio", codec=_wav_codec(codec, bits),
+        duration=data_size / float(byte_rate),
+        sample_rate=sample_rate, channels=channels,
+    )
+    return MediaInfo(path=path, format="wav", duration=stream.duration, streams=[stream])
+
+
+# ------------------------------------------------------
+# FFPROBE FALLBACK
+# ------------------------------------------------------
+
+def get_ffprobe_path() -> str:
+    """ffprobe next to FFMPEG_PATH when that is set, else ffprobe on PATH."""
+    from scripts.utils.env import load_env
+
+    load_env()
+    ffmpeg = os.getenv("FFMPEG_PATH", "").strip().strip('"').strip("'")
+    folder, name = os.path.split(ffmpeg)
+    stem, ext = os.path.splitext(name)
+    if stem.lower() == "ffmpeg":
+        candidate = os.path.join(folder, "ffprobe" + ext)
+        if not folder or os.path.isfile(candidate):
+            return candidate
+    return "ffprobe"
+
+
+def _parse_rate(rate: str) -> float:
+    """Parses an ffprobe rational like '30000/1001' into a float."""
+    try:
+        num, _, den = rate.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def ffprobe(path: str, keyframes: bool = False) -> MediaInfo:
+    """The same MediaInfo via ffprobe, for formats parsed nowhere else."""
+    from scripts.utils.tracing import run_command
+
+    ffprobe_bin = get_ffprobe_path()
+    cmd = [ffprobe_bin, "-v", "quiet", "-print_format", "json", "-show_streams", "-show_format", path]
+    result = run_command(cmd, capture_output=True, text=True)
+    info = json.loads(result.stdout or "{}")
+    fmt = info.get("format", {})
+
+    streams = []
+    for s in info.get("streams", []):
+        kind = s.get("codec_type")
+        if kind not in ("video", "audio"):
+            continue
+        streams.append(StreamInfo(
+            kind=kind,
+            codec=s.get("codec_name", ""),
+            duration=_float(s.get("duration") or fmt.get("duration")),
+            width=int(s.get("width", 0) or 0),
+            height=int(s.get("height", 0) or 0),
+            fps=_parse_rate(s.get("avg_frame_rate") or s.get("r_frame_rate") or "0/1") if kind == "video" else 0.0,
+            sample_rate=int(s.get("sample_rate", 0) or 0),
+            channels=int(s.get("channels", 0) or 0),
+        ))
+
+    video = next((s for s in streams if s.kind == "video"), None)
+    if keyframes and video is not None:
+        # Packet flags carry the keyframe marker, so no frames are decoded here
+        kf_cmd = [
+            ffprobe_bin, "-v", "quiet",
+            "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            path,
+        ]
+        kf_result = run_command(kf_cmd, capture_output=True, text=True)
+        for line in (kf_result.stdout or "").splitlines():
+            pts, _, flags = line.partition(",")
+            if "K" in flags:
+                try:
+                    video.keyframes.append(float(pts))
+                except ValueError:
+                    continue
+
+    return MediaInfo(
+        path=path,
+        format=fmt.get("format_name", ""),
+        duration=_float(fmt.get("duration")),
+        streams=streams,
+    )
+
+
+# ------------------------------------------------------
+# ENTRY POINTS
+# ------------------------------------------------------
+
+def _parse(buf, path: str, keyframes: bool) -> MediaInfo:
+    head = bytes(buf[:12])
+    if head[4:8] == b"ftyp" or head[4:8] in (b"moov", b"mdat", b"free", b"wide"):
+        return _probe_mp4(buf, path, keyframes)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _probe_wav(buf, path)
+    if head[:3] == b"ID3" or (head[0] == 0xFF and head[1] & 0xE0 == 0xE0) or path.lower().endswith(".mp3"):
+        return _probe_mp3(buf, path)
+    raise UnsupportedMedia("unrecognized container")
+
+
+def probe(path: str, keyframes: bool = False) -> MediaInfo:
+    """
+    Duration and streams of a media file; with keyframes=True the first
+    video stream also lists its keyframe pts. Parsed in process where
+    possible, through ffprobe otherwise.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise UnsupportedMedia("empty file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return _parse(buf, path, keyframes)
+    except (UnsupportedMedia, struct.error, IndexError, ValueError):
+        return ffprobe(path, keyframes=keyframes)
+
+
+def get_duration(path: str) -> float:
+    """Container duration in seconds (0.0 if unreadable)."""
+    try:
+        return probe(path).duration
+    except (OSError, ValueError):
+        return 0.0
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    from dataclasses import asdict
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m scripts.utils.media_probe <file> [--keyframes]")
+        sys.exit(1)
+    result = probe(sys.argv[1], keyframes="--keyframes" in sys.argv[2:])
+    print(json.dumps(asdict(result), indent=2))
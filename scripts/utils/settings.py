@@ -0,0 +1,37 @@
+"""
+Settings - Read-once access to config/settings.yaml.
+
+    get_setting("audio.loudness_target", -14)
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+SETTINGS_PATH = "config/settings.yaml"
+
+_settings: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def load_settings(path: str = SETTINGS_PATH) -> Dict[str, Any]:
+    """Parses the settings file once per process; missing file means {}."""
+    with _lock:
+        if path not in _settings:
+            data = {}
+            if os.path.isfile(path):
+                import yaml
+                with open(path, "r", encoding="utf-8") as f:
+                    data = yaml.safe_load(f) or {}
+            _settings[path] = data
+        return _settings[path]
+
+
+def get_setting(key: str, default: Any = None, path: str = SETTINGS_PATH) -> Any:
+    """Looks up a dotted key such as 'audio.loudness_target'."""
+    node: Any = load_settings(path)
+    for part in key.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return default
+        node = node[part]
+    return node
@@ -0,0 +1,152 @@
+"""
+Sheets Cache - Local snapshots of Google Sheets worksheets.
+
+Every worksheet read goes through get_table(), which serves rows from a
+local snapshot in data/sheets_cache/ while it is younger than the TTL. Stale
+snapshots are still served immediately and refreshed in a background thread.
+gspread is authorized at most once per process.
+
+Offline mode (SHEETS_OFFLINE=1 or offline=True) never touches the network:
+it reads the snapshot, or the CSV exports in data/sheets_backup/ when no
+snapshot exists, so renders keep going when Sheets is slow or down.
+"""
+
+import os
+import csv
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from scripts.utils.env import load_env
+
+
+SPREADSHEET_NAME = "story-generator"
+CREDENTIALS_PATH = "config/service_account.json"
+CACHE_DIR = "data/sheets_cache"
+BACKUP_DIR = "data/sheets_backup"
+DEFAULT_TTL = 15 * 60  # seconds
+
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.readonly",
+]
+
+_client = None
+_client_lock = threading.Lock()
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_memory: Dict[str, Dict[str, Any]] = {}
+
+
+# ------------------------------------------------------
+# CLIENT
+# ------------------------------------------------------
+
+def get_client():
+    """Authorized gspread client, created once per process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_PATH, SCOPE)
+            _client = gspread.authorize(creds)
+        return _client
+
+
+def is_offline() -> bool:
+    load_env()
+    return os.getenv("SHEETS_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+
+
+# ------------------------------------------------------
+# SNAPSHOTS
+# ------------------------------------------------------
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, f"{name}.json")
+
+
+def _read_snapshot(name: str) -> Optional[Dict[str, Any]]:
+    path = _snapshot_path(name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_snapshot(name: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    snap = {"fetched_at": time.time(), "rows": rows}
+
+    # Write-then-rename so a reader (or a killed refresh thread) never
+    # leaves a half-written snapshot behind
+    tmp = f"{_snapshot_path(name)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snap, f, ensure_ascii=False)
+    os.replace(tmp, _snapshot_path(name))
+    return snap
+
+
+def _read_backup(name: str) -> List[Dict[str, Any]]:
+    path = os.path.join(BACKUP_DIR, f"{name}.csv")
+    if not os.path.isfile(path):
+        raise RuntimeError(f"No snapshot or backup available for sheet '{name}'")
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def fetch_table(name: str) -> List[Dict[str, Any]]:
+    """Reads a worksheet from Google Sheets and stores a fresh snapshot."""
+    ws = get_client().open(SPREADSHEET_NAME).worksheet(name)
+    rows = ws.get_all_records()
+    _memory[name] = _write_snapshot(name, rows)
+    return rows
+
+
+def _refresh_in_background(name: str):
+    with _refresh_lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+
+    def worker():
+        try:
+            fetch_table(name)
+        except Exception as e:
+            print(f"Sheets refresh failed for '{name}' (serving stale snapshot): {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(name)
+
+    threading.Thread(target=worker, name=f"sheets-refresh-{name}", daemon=True).start()
+
+
+def get_table(name: str, ttl: float = DEFAULT_TTL, offline: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Returns all records of a worksheet as a list of dicts.
+
+    - fresh snapshot (age < ttl): served from memory/disk
+    - stale snapshot: served immediately, refreshed in the background
+    - no snapshot: fetched synchronously (falls back to the CSV backup)
+    - offline: snapshot, else CSV backup; never hits the network
+    """
+    offline = is_offline() if offline is None else offline
+
+    snap = _memory.get(name) or _read_snapshot(name)
+    if snap is not None:
+        _memory[name] = snap
+        if not offline and time.time() - snap["fetched_at"] > ttl:
+            _refresh_in_background(name)
+        return snap["rows"]
+
+    if offline:
+        return _read_backup(name)
+
+    try:
+        return fetch_table(name)
+    except Exception as e:
+        print(f"Sheets fetch failed for '{name}', using CSV backup: {e}")
+        return _read_backup(name)
@@ -0,0 +1,284 @@
+"""
+Tracing - Per-stage and per-subprocess instrumentation for pipeline runs.
+
+A RunTrace collects one event per stage (wall time, own and child CPU from
+rusage, output file sizes, status) and one per subprocess (command, exit
+status, child CPU, bytes written). Each run writes output/traces/<run_id>.json
+(optionally a Chrome trace, viewable in chrome://tracing or Perfetto) and
+appends a one-line summary to a rolling metrics.jsonl.
+
+Pipeline code records through module-level helpers that no-op when no trace
+is active:
+
+    with trace_run(run_id, final=True):
+        with stage("tts") as st:
+            run_command(cmd, check=True)
+            st.output(mp3_path)
+"""
+
+import os
+import json
+import time
+import subprocess
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from scripts.utils.logger import setup_logger
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, so traces carry no CPU times
+    resource = None
+
+
+TRACE_DIR = "output/traces"
+METRICS_FILENAME = "metrics.jsonl"
+METRICS_MAX_LINES = 5000
+
+log = setup_logger("pipeline")
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("current_stage", default=None)
+
+
+def _rusage(who: str):
+    return resource.getrusage(getattr(resource, who)) if resource is not None else None
+
+
+def _cpu_delta(after, before) -> Optional[float]:
+    """CPU seconds between two rusage snapshots (None without resource)."""
+    if after is None or before is None:
+        return None
+    return round((after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime), 4)
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+# ------------------------------------------------------
+# TRACE
+# ------------------------------------------------------
+
+class StageHandle:
+    """Yielded by stage(); lets the stage register the files it produced."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.outputs: List[str] = []
+        self.attrs: Dict[str, Any] = {}
+
+    def output(self, path: str):
+        self.outputs.append(path)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class RunTrace:
+    def __init__(self, run_id: str, trace_dir: str = TRACE_DIR):
+        self.run_id = run_id
+        self.trace_dir = trace_dir
+        self.path = os.path.join(trace_dir, f"{run_id}.json")
+        self.events: List[Dict[str, Any]] = []
+        self.status = "running"
+
+    @classmethod
+    def load_or_create(cls, run_id: str, trace_dir: str = TRACE_DIR) -> "RunTrace":
+        """Continues a trace another process started (e.g. batch render workers)."""
+        trace = cls(run_id, trace_dir)
+        if os.path.isfile(trace.path):
+            with open(trace.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            trace.events = data.get("events", [])
+            trace.status = data.get("status", "running")
+        return trace
+
+    def add(self, event: Dict[str, Any]):
+        event.setdefault("pid", os.getpid())
+        self.events.append(event)
+
+    def stage_summary(self) -> Dict[str, float]:
+        return {e["name"]: e["wall_s"] for e in self.events if e["type"] == "stage"}
+
+    def write(self, chrome: Optional[bool] = None):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"run_id": self.run_id, "status": self.status, "events": self.events}, f, indent=2)
+
+        chrome = os.getenv("TRACE_CHROME", "") == "1" if chrome is None else chrome
+        if chrome:
+            self.write_chrome_trace()
+
+    def write_chrome_trace(self) -> str:
+        """Chrome trace-event format: one complete ("X") event per stage/subprocess."""
+        events = []
+        for e in self.events:
+            name = e["name"] if e["type"] == "stage" else os.path.basename(e["cmd"][0])
+            events.append({
+                "name": name,
+                "cat": e["type"],
+                "ph": "X",
+                "ts": int(e["start"] * 1e6),
+                "dur": int(e["wall_s"] * 1e6),
+                "pid": e["pid"],
+                "tid": 0 if e["type"] == "stage" else 1,
+                "args": {k: v for k, v in e.items() if k not in ("name", "start", "end", "pid")},
+            })
+
+        path = os.path.join(self.trace_dir, f"{self.run_id}.chrome.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def append_metrics(self):
+        """Appends one summary line to the rolling metrics file."""
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, METRICS_FILENAME)
+
+        stages = [e for e in self.events if e["type"] == "stage"]
+        procs = [e for e in self.events if e["type"] == "subprocess"]
+        line = json.dumps({
+            "run_id": self.run_id,
+            "status": self.status,
+            "finished_at": time.time(),
+            "wall_s": round(max((e["end"] for e in stages), default=0) - min((e["start"] for e in stages), default=0), 3),
+            "stages": self.stage_summary(),
+            "subprocesses": len(procs),
+            "subprocess_cpu_s": round(sum(e["cpu_children_s"] or 0.0 for e in procs), 3),
+        })
+
+        lines = []
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        lines = (lines + [line])[-METRICS_MAX_LINES:]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+# ------------------------------------------------------
+# HELPERS
+# ------------------------------------------------------
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_run(run_id: str, final: bool = False):
+    """
+    Activates the trace for run_id in this context. Nested calls for the same
+    run are no-ops. The trace file is written on exit; metrics are appended
+    when the run finishes (final=True) or fails.
+    """
+    active = _current_trace.get()
+    if active is not None and active.run_id == run_id:
+        yield active
+        return
+
+    trace = RunTrace.load_or_create(run_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.status = "failed"
+        trace.write()
+        trace.append_metrics()
+        raise
+    else:
+        if final:
+            trace.status = "done"
+        trace.write()
+        if final:
+            trace.append_metrics()
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """Times a pipeline stage; records into the active trace if there is one."""
+    handle = StageHandle(name)
+    handle.set(**attrs)
+    trace = _current_trace.get()
+    token = _current_stage.set(name)
+
+    start = time.time()
+    self_before = _rusage("RUSAGE_SELF")
+    child_before = _rusage("RUSAGE_CHILDREN")
+    log.info(f"[{trace.run_id if trace else '-'}] stage {name} started")
+
+    status, error = "ok", None
+    try:
+        yield handle
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_stage.reset(token)
+        end = time.time()
+        self_after = _rusage("RUSAGE_SELF")
+        child_after = _rusage("RUSAGE_CHILDREN")
+        log.info(f"[{trace.run_id if trace else '-'}] stage {name} {status} in {end - start:.2f}s")
+
+        if trace is not None:
+            trace.add({
+                "type": "stage",
+                "name": name,
+                "start": start,
+                "end": end,
+                "wall_s": round(end - start, 4),
+                "cpu_self_s": _cpu_delta(self_after, self_before),
+                "cpu_children_s": _cpu_delta(child_after, child_before),
+                "outputs": {p: _file_size(p) for p in handle.outputs},
+                "status": status,
+                "error": error,
+                **handle.attrs,
+            })
+
+
+def run_command(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() that records the command, exit status, child CPU time
+    and output size (last argument, if it is a file) into the active trace.
+
+    Child CPU comes from the RUSAGE_CHILDREN delta, which is exact for the
+    sequential commands of one run and approximate when several runs share
+    a process.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return subprocess.run(cmd, **kwargs)
+
+    start = time.time()
+    child_before = _rusage("RUSAGE_CHILDREN")
+    returncode = None
+    try:
+        result = subprocess.run(cmd, **kwargs)
+        returncode = result.returncode
+        return result
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+        raise
+    finally:
+        end = time.time()
+        child_after = _rusage("RUSAGE_CHILDREN")
+        # ffprobe's last argument is its input, not something it wrote
+        last = str(cmd[-1]) if cmd and "ffprobe" not in os.path.basename(str(cmd[0])) else ""
+        trace.add({
+            "type": "subprocess",
+            "stage": _current_stage.get(),
+            "cmd": [str(c) for c in cmd],
+            "start": start,
+            "end": end,
+            "wall_s": round(end - start, 4),
+            "cpu_children_s": _cpu_delta(child_after, child_before),
+            "returncode": returncode,
+            "output_bytes": _file_size(last) if last else None,
+        })
@@ -0,0 +1,214 @@
+"""
+Worker - Claims jobs from the job queue and runs them.
+
+Start one per render slot, on as many hosts as share the queue file:
+
+    python -m scripts.worker
+    python -m scripts.worker --once          # run one job and exit
+    python -m scripts.worker --max-jobs 20
+
+While a job runs, a background thread renews its lease. If the lease is
+lost (e.g. the worker stalled past it and another worker took the job),
+the run is cancelled at its next stage boundary and nothing more is
+recorded for it. A retried job resumes its run from the manifest
+checkpoints of the earlier attempt, so only the stages that had not
+finished run again. SIGTERM/SIGINT finish the
+current job before exiting.
+"""
+
+import os
+import sys
+import time
+import signal
+import sqlite3
+import socket
+import argparse
+import threading
+import traceback
+
+from scripts.job_queue import JobQueue, Job, QUEUE_PATH, DEFAULT_LEASE_SECONDS
+from scripts.run_manifest import RunCancelled, set_cancel_event, reset_cancel_event
+from scripts.utils.env import load_env
+
+
+POLL_SECONDS = 5.0
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ------------------------------------------------------
+# HEARTBEAT
+# ------------------------------------------------------
+
+class Heartbeat(threading.Thread):
+    """
+    Renews a job's lease every lease/3 seconds until stopped. `lost` is set
+    when another worker holds the lease, or when renewals keep failing
+    (e.g. the queue file stays locked) until the lease has run out; it is
+    the cancel event of the job's run.
+    """
+
+    def __init__(self, db_path: str, job_id: int, worker: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.job_id = job_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # SQLite connections stay in the thread that opened them
+        queue = JobQueue(self.db_path)
+        expires = time.time() + self.lease_seconds
+        try:
+            while not self._stop_event.wait(self.lease_seconds / 3):
+                try:
+                    renewed = queue.heartbeat(self.job_id, self.worker, self.lease_seconds)
+                except sqlite3.OperationalError as e:
+                    if time.time() < expires:
+                        print(f"Job {self.job_id}: lease renewal failed ({e}), retrying")
+                        continue
+                    print(f"Job {self.job_id}: lease expired without renewal ({e}), cancelling")
+                    self.lost.set()
+                    return
+                if not renewed:
+                    print(f"Job {self.job_id}: lease lost to another worker, cancelling")
+                    self.lost.set()
+                    return
+                expires = time.time() + self.lease_seconds
+        finally:
+            queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ------------------------------------------------------
+# EXECUTION
+# ------------------------------------------------------
+
+def execute(job: Job, queue: JobQueue, worker: str) -> str:
+    """Runs one job and returns its output path."""
+    # Imported here so the worker starts (and polls) without loading the
+    # whole pipeline
+    from scripts.generate_full_video import generate_full_video, promote_draft, new_run_prefix
+    from scripts.run_manifest import RunManifest
+
+    if job.kind == "promote":
+        return promote_draft(job.run_id, chunks=int(job.payload.get("chunks", 1)))
+
+    if job.kind != "video":
+        raise ValueError(f"Unknown job kind '{job.kind}'")
+
+    run_id = job.run_id
+    if not run_id:
+        run_id = f"{new_run_prefix(job.channel_id)}_job{job.id}"
+        queue.set_run_id(job.id, worker, run_id)
+
+    # A retry continues from the checkpoints of the failed attempt
+    resume = run_id if os.path.isfile(RunManifest(run_id).path) else None
+    return generate_full_video(
+        job.channel_id,
+        use_segment_pool=bool(job.payload.get("segment_pool")),
+        run_prefix=run_id,
+        resume=resume,
+        draft=bool(job.payload.get("draft")),
+        chunks=int(job.payload.get("chunks", 1)),
+        speculative=bool(job.payload.get("speculative")),
+    )
+
+
+def run_job(job: Job, queue: JobQueue, worker: str, lease_seconds: float) -> bool:
+    from scripts.story_dedup import DuplicateStoryError
+
+    print(f"\n=== Job {job.id}: {job.kind} {job.channel_id} (attempt {job.attempts}/{job.max_attempts}) ===")
+    heartbeat = Heartbeat(queue.db_path, job.id, worker, lease_seconds)
+    heartbeat.start()
+    token = set_cancel_event(heartbeat.lost)
+    try:
+        result = execute(job, queue, worker)
+    except RunCancelled:
+        # The job belongs to another worker now; leave its state to them
+        heartbeat.stop()
+        print(f"Job {job.id}: stopped after losing its lease")
+        return False
+    except DuplicateStoryError as e:
+        # Regenerating already failed inside the run; retrying won't help
+        heartbeat.stop()
+        queue.fail(job, worker, str(e), retry=False)
+        return False
+    except Exception:
+        heartbeat.stop()
+        queue.fail(job, worker, traceback.format_exc())
+        return False
+    finally:
+        reset_cancel_event(token)
+
+    heartbeat.stop()
+    if heartbeat.lost.is_set() or not queue.complete(job.id, worker, str(result)):
+        print(f"Job {job.id}: finished after its lease was lost; result not recorded")
+        return False
+    print(f"Job {job.id} done: {result}")
+    return True
+
+
+def work(
+    db_path: str = QUEUE_PATH,
+    once: bool = False,
+    max_jobs: int = 0,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_seconds: float = POLL_SECONDS,
+) -> int:
+    """Claim/run loop. Returns the number of jobs that failed."""
+    worker = worker_name()
+    queue = JobQueue(db_path)
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Worker {worker}: stopping after the current job")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"Worker {worker} polling {db_path}")
+    done = failed = 0
+    while not stopping.is_set():
+        job = queue.claim(worker, lease_seconds)
+        if job is None:
+            if once:
+                break
+            stopping.wait(poll_seconds)
+            continue
+
+        if not run_job(job, queue, worker, lease_seconds):
+            failed += 1
+        done += 1
+        if once or (max_jobs and done >= max_jobs):
+            break
+
+    queue.close()
+    print(f"Worker {worker} exiting: {done} job(s), {failed} failed")
+    return failed
+
+
+# ------------------------------------------------------
+# CLI ENTRY
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    load_env()
+    parser = argparse.ArgumentParser(prog="python -m scripts.worker")
+    parser.add_argument("--db", default=QUEUE_PATH)
+    parser.add_argument("--once", action="store_true", help="run at most one job, then exit")
+    parser.add_argument("--max-jobs", type=int, default=0, help="exit after this many jobs")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between polls when idle")
+    args = parser.parse_args()
+
+    failed = work(args.db, once=args.once, max_jobs=args.max_jobs, lease_seconds=args.lease, poll_seconds=args.poll)
+    sys.exit(1 if failed else 0)
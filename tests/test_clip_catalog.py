@@ -0,0 +1,29 @@
+import os
+
+from scripts import clip_catalog
+from scripts.clip_catalog import ClipCatalog, ClipInfo
+
+
+def test_refresh_drops_clips_that_become_unreadable(monkeypatch, tmp_path):
+    folder = tmp_path / "clips"
+    folder.mkdir()
+    for name in ("game_001.mp4", "game_002.mp4"):
+        (folder / name).write_bytes(b"\0" * 16)
+
+    monkeypatch.setattr(clip_catalog, "probe_clip", lambda path: ClipInfo(path=path, duration=20.0))
+    catalog = ClipCatalog(str(folder), db_path=str(tmp_path / "catalog.sqlite"))
+    assert catalog.refresh() == 2
+    assert catalog.list_clips() == [str(folder / "game_001.mp4"), str(folder / "game_002.mp4")]
+
+    def probe_clip(path):
+        if path.endswith("game_002.mp4"):
+            raise ValueError("moov box truncated")
+        return ClipInfo(path=path, duration=20.0)
+
+    monkeypatch.setattr(clip_catalog, "probe_clip", probe_clip)
+    (folder / "game_002.mp4").write_bytes(b"\0" * 8)
+    os.utime(folder / "game_002.mp4", (0, 0))
+
+    assert catalog.refresh() == 0
+    assert catalog.list_clips() == [str(folder / "game_001.mp4")]
+    assert catalog.get(str(folder / "game_002.mp4")) is None
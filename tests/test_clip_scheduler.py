@@ -0,0 +1,60 @@
+import struct
+
+from scripts.clip_catalog import ClipCatalog
+from scripts.clip_scheduler import SchedulerConfig, build_clip_schedule, get_clip_duration
+
+
+def _box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _full_box(kind, payload):
+    return _box(kind, b"\0\0\0\0" + payload)
+
+
+def write_mp4(path, seconds, fps=30, timescale=15360):
+    """Header-only MP4 with one 1080x1920 H.264 track (no media data)."""
+    frames = int(seconds * fps)
+    delta = timescale // fps
+    entry = b"\0" * 6 + struct.pack(">H", 1) + b"\0" * 16 + struct.pack(">HH", 1080, 1920) + b"\0" * 50
+    stbl = _box(b"stbl", (
+        _full_box(b"stsd", struct.pack(">I", 1) + _box(b"avc1", entry))
+        + _full_box(b"stts", struct.pack(">III", 1, frames, delta))
+        + _full_box(b"stss", struct.pack(">II", 1, 1))
+    ))
+    mdia = _box(b"mdia", (
+        _full_box(b"mdhd", struct.pack(">IIII", 0, 0, timescale, frames * delta) + b"\0" * 4)
+        + _full_box(b"hdlr", b"\0" * 4 + b"vide" + b"\0" * 13)
+        + _box(b"minf", stbl)
+    ))
+    mvhd = _full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, int(seconds * 1000)) + b"\0" * 80)
+    with open(path, "wb") as f:
+        f.write(_box(b"ftyp", b"isom\0\0\0\0") + _box(b"moov", mvhd + _box(b"trak", mdia)))
+
+
+def test_get_clip_duration_reads_mp4_headers(tmp_path):
+    clip = tmp_path / "game_001.mp4"
+    write_mp4(clip, 20)
+
+    assert get_clip_duration(str(clip)) == 20.0
+
+
+def test_get_clip_duration_is_zero_for_missing_or_corrupt_clips(tmp_path):
+    corrupt = tmp_path / "game_002.mp4"
+    corrupt.write_bytes(b"\0\0\0\x18ftypisom" + b"\xff" * 64)
+
+    assert get_clip_duration(str(tmp_path / "missing.mp4")) == 0.0
+    assert get_clip_duration(str(corrupt)) == 0.0
+
+
+def test_schedule_skips_unreadable_clips(tmp_path):
+    good = tmp_path / "game_001.mp4"
+    write_mp4(good, 60)
+    missing = str(tmp_path / "game_404.mp4")
+    # An empty catalog, so both clips are probed directly
+    catalog = ClipCatalog(str(tmp_path / "catalog"), db_path=str(tmp_path / "catalog.sqlite"))
+
+    schedule = build_clip_schedule([str(good), missing], 30, SchedulerConfig(), catalog=catalog)
+
+    assert schedule
+    assert {seg["clip"] for seg in schedule} == {str(good)}
@@ -0,0 +1,39 @@
+from scripts.ffmpeg_builder import split_schedule
+
+
+def _schedule(durations):
+    return [{"clip": f"clip_{i}.mp4", "start": 0.0, "duration": d} for i, d in enumerate(durations)]
+
+
+def test_split_schedule_caps_inputs_with_uneven_durations():
+    schedule = _schedule([7.0] * 11 + [5.0] * 13)
+
+    runs = split_schedule(schedule, pieces=1, max_inputs=12)
+
+    assert all(len(run) <= 12 for run in runs)
+    assert [seg for run in runs for seg in run] == schedule
+
+
+def test_split_schedule_keeps_requested_pieces():
+    schedule = _schedule([3.0] * 8)
+
+    runs = split_schedule(schedule, pieces=4, max_inputs=12)
+
+    assert [len(run) for run in runs] == [2, 2, 2, 2]
+
+
+def test_split_schedule_keeps_pieces_around_a_long_segment():
+    schedule = _schedule([2.0, 2.0, 40.0, 2.0, 2.0])
+
+    runs = split_schedule(schedule, pieces=5, max_inputs=12)
+
+    assert [len(run) for run in runs] == [1, 1, 1, 1, 1]
+
+
+def test_split_schedule_never_returns_fewer_runs_than_pieces():
+    for durations in ([1.0, 1.0, 1.0, 1.0, 100.0], [100.0, 1.0, 1.0, 1.0, 1.0], [5.0, 30.0, 1.0, 1.0, 30.0, 1.0]):
+        schedule = _schedule(durations)
+        for pieces in range(1, len(schedule) + 1):
+            runs = split_schedule(schedule, pieces=pieces, max_inputs=12)
+            assert len(runs) == pieces
+            assert [seg for run in runs for seg in run] == schedule
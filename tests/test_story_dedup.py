@@ -0,0 +1,36 @@
+import multiprocessing
+
+from scripts.story_dedup import StoryIndex
+
+STORY = (
+    "I found out my roommate had been renting my parking spot to strangers "
+    "for a year, so I waited until the next payment and towed every car."
+)
+
+
+def _check(db_path, run_id, barrier, results):
+    index = StoryIndex(db_path)
+    barrier.wait()
+    results.put((run_id, index.check_and_add(STORY, run_id, "test")))
+    index.close()
+
+
+def test_check_and_add_accepts_a_story_once_across_processes(tmp_path):
+    db_path = str(tmp_path / "story_index.sqlite")
+    StoryIndex(db_path).close()
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(2)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_check, args=(db_path, f"run{i}", barrier, results)) for i in range(2)]
+    for p in procs:
+        p.start()
+    outcomes = dict(results.get(timeout=60) for _ in procs)
+    for p in procs:
+        p.join(timeout=60)
+
+    accepted = [run_id for run_id, duplicate in outcomes.items() if duplicate is None]
+    assert len(accepted) == 1
+    rejected = [duplicate for duplicate in outcomes.values() if duplicate is not None]
+    assert rejected[0][0] == accepted[0]
+    assert StoryIndex(db_path).count() == 1
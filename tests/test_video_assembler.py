@@ -0,0 +1,52 @@
+from scripts.pipeline import video_assembler
+
+
+def _schedule(count, seconds=7.0):
+    return [
+        {"clip": f"clip_{i}.mp4", "in": 0.0, "out": seconds, "duration": seconds, "timeline_start": i * seconds}
+        for i in range(count)
+    ]
+
+
+def test_short_schedule_composes_in_one_pass(monkeypatch, tmp_path):
+    commands = []
+    monkeypatch.setattr(video_assembler, "run_command", lambda cmd, **kwargs: commands.append(cmd))
+
+    def no_prerender(*args, **kwargs):
+        raise AssertionError("a Short-length schedule must not be prerendered")
+
+    monkeypatch.setattr(video_assembler, "prerender_background", no_prerender)
+
+    schedule = _schedule(30)
+    video_assembler.compose_final_video(
+        schedule,
+        "narration.mp3",
+        str(tmp_path / "final.mp4"),
+        210.0,
+        mixed_audio_path="mix.wav",
+    )
+
+    assert len(commands) == 1
+    clip_inputs = [arg for arg in commands[0] if str(arg).startswith("clip_")]
+    assert len(clip_inputs) == len(schedule)
+
+
+def test_prebuilt_background_is_chunked_by_workers(monkeypatch, tmp_path):
+    chunked = []
+    monkeypatch.setattr(video_assembler, "compose_chunked", lambda schedule, *args, **kwargs: chunked.append(schedule))
+
+    video_assembler.compose_final_video(
+        [],
+        "narration.mp3",
+        str(tmp_path / "final.mp4"),
+        90.0,
+        background_path="background.mp4",
+        mixed_audio_path="mix.wav",
+        workers=3,
+    )
+
+    assert [(seg["clip"], seg["in"], seg["duration"]) for seg in chunked[0]] == [
+        ("background.mp4", 0.0, 30.0),
+        ("background.mp4", 30.0, 30.0),
+        ("background.mp4", 60.0, 30.0),
+    ]
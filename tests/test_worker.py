@@ -0,0 +1,32 @@
+import sqlite3
+
+from scripts import worker
+
+
+class LockedQueue:
+    """JobQueue whose file stays locked: every renewal fails."""
+
+    attempts = 0
+
+    def __init__(self, db_path):
+        pass
+
+    def heartbeat(self, job_id, worker, lease_seconds):
+        LockedQueue.attempts += 1
+        raise sqlite3.OperationalError("database is locked")
+
+    def close(self):
+        pass
+
+
+def test_heartbeat_retries_locked_queue_until_lease_expires(monkeypatch):
+    monkeypatch.setattr(worker, "JobQueue", LockedQueue)
+
+    heartbeat = worker.Heartbeat("queue.sqlite", 1, "test", lease_seconds=0.3)
+    heartbeat.start()
+
+    assert heartbeat.lost.wait(timeout=5)
+    heartbeat.join(timeout=5)
+    assert not heartbeat.is_alive()
+    # Renewed every lease/3 seconds: the lease ran out on the third failure
+    assert LockedQueue.attempts >= 2